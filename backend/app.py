@@ -13,13 +13,16 @@ import json
 import os
 import signal
 import sys
+import threading
+import time
 from pathlib import Path
 from functools import wraps
 from blockchain_service import blockchain_bp
 from models.blockchain import blockchain
-from kafka_service import kafka_bp
+from kafka_service import kafka_bp, file_freshness
 from models.mock_model import outbreak_predictor
 from utils.logger import logger
+from middleware.conditional import conditional_get, mark_uncacheable
 from utils.security import add_security_headers, validate_json_content_type, sanitize_input
 from utils.auth import generate_token, verify_token, require_auth, require_role, hash_password, verify_password
 from utils.verification import generate_verification_token, generate_otp, get_verification_expiry
@@ -30,6 +33,9 @@ from models.region import Region, INDIA_STATES
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from services.chatbot_engine import chatbot_engine
+from services.downsampling import DownsampledSeries
+from services.lead_lag import lead_lag_cache, DEFAULT_MAX_LAG
+from services.audit_writer import audit_writer
 
 app = Flask(__name__)
 app.config['JSON_SORT_KEYS'] = False
@@ -68,6 +74,7 @@ def signal_handler(sig, frame):
     global shutdown_flag
     logger.info("Shutdown signal received, gracefully shutting down...")
     shutdown_flag = True
+    audit_writer.stop()
     sys.exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
@@ -99,8 +106,9 @@ def after_request(response):
     # Add security headers
     response = add_security_headers(response)
     
-    # Force JSON content-type for all API routes
-    if request.path.startswith('/api/') or request.path.startswith('/admin/'):
+    # Force JSON content-type for all API routes; event streams must pass through unread
+    if (request.path.startswith('/api/') or request.path.startswith('/admin/')) \
+            and response.mimetype != 'text/event-stream':
         # Always set JSON content-type for API routes
         if response.content_type and 'application/json' not in response.content_type:
             try:
@@ -162,6 +170,18 @@ def get_db_connection():
         logger.warning(f"Database connection failed: {e}. Using mock mode.")
         return None
 
+def get_request_db_connection():
+    """One connection per request, shared by the helpers it calls; a failed attempt is not retried"""
+    if '_db_conn' not in g:
+        g._db_conn = get_db_connection()
+    return g._db_conn
+
+@app.teardown_appcontext
+def close_request_db_connection(exc):
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.close()
+
 # Register blueprints
 app.register_blueprint(blockchain_bp)
 app.register_blueprint(kafka_bp)
@@ -169,6 +189,38 @@ app.register_blueprint(kafka_bp)
 # Data paths
 DATA_DIR = Path(__file__).parent.parent / "data"
 
+# Pre-aggregated chart tiers, refreshed from the tail of each data file
+wastewater_tiers = DownsampledSeries(DATA_DIR / "wastewater_demo.csv", "viral_load")
+pharmacy_tiers = DownsampledSeries(DATA_DIR / "otc_demo.csv", "sales_index")
+
+def parse_iso_arg(name):
+    """Parse an optional ISO date/datetime query parameter, as naive local time like the data it filters"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        # An offset such as ...Z would otherwise fail every comparison with the naive data times
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def downsampled_response(series):
+    """Serve a tiered aggregate when the client passes a points= budget"""
+    points = request.args.get('points', type=int)
+    if not points or not series.path.exists():
+        return None
+    result = series.query(
+        points,
+        region=request.args.get('region'),
+        since=parse_iso_arg('since'),
+        until=parse_iso_arg('until')
+    )
+    result['mode'] = 'live'
+    return jsonify(result)
+
 # ============================================================================
 # Authentication & User Management Endpoints
 # ============================================================================
@@ -768,10 +820,12 @@ def health_check():
 @app.route('/api/patients', methods=['GET'])
 @limiter.limit("60 per minute")
 @require_auth
+@conditional_get(DATA_DIR / "patients_demo.jsonl")
 def get_patients():
     """Get all patients with risk assessment - uses mock data if file not found"""
     try:
         patients_file = DATA_DIR / "patients_demo.jsonl"
+        file_freshness.observe_read('fever-oracle-patients', patients_file)
         if not patients_file.exists():
             # Return mock patient data
             import random
@@ -812,7 +866,7 @@ def get_patients():
         })
     except Exception as e:
         # Return mock data on error
-        import random
+        mark_uncacheable()
         return jsonify({
             "patients": [{
                 "id": "PT-2847",
@@ -835,10 +889,10 @@ def get_patients():
 def get_patient(patient_id):
     """Get specific patient by ID - uses mock data if not found"""
     try:
-        # Log access to blockchain
+        # Log access to blockchain (mined in the background)
         try:
             user_id = request.headers.get('X-User-ID', 'anonymous')
-            blockchain.add_audit_log(
+            audit_writer.submit(
                 event_type='data_access',
                 user_id=user_id,
                 action='view_patient',
@@ -876,9 +930,15 @@ def get_patient(patient_id):
         return jsonify({"error": str(e), "mode": "mock"}), 500
 
 @app.route('/api/wastewater', methods=['GET'])
+@conditional_get(DATA_DIR / "wastewater_demo.csv")
 def get_wastewater():
     """Get wastewater viral load data - uses mock data if file not found"""
     try:
+        file_freshness.observe_read('fever-oracle-wastewater', DATA_DIR / "wastewater_demo.csv")
+        downsampled = downsampled_response(wastewater_tiers)
+        if downsampled is not None:
+            return downsampled
+        
         wastewater_file = DATA_DIR / "wastewater_demo.csv"
         if not wastewater_file.exists():
             # Return mock wastewater data
@@ -915,7 +975,7 @@ def get_wastewater():
         })
     except Exception as e:
         # Return mock data on error
-        import random
+        mark_uncacheable()
         return jsonify({
             "data": [{
                 "date": datetime.now().isoformat().split('T')[0],
@@ -929,9 +989,15 @@ def get_wastewater():
         }), 200
 
 @app.route('/api/pharmacy', methods=['GET'])
+@conditional_get(DATA_DIR / "otc_demo.csv")
 def get_pharmacy():
     """Get pharmacy OTC sales data - uses mock data if file not found"""
     try:
+        file_freshness.observe_read('fever-oracle-pharmacy', DATA_DIR / "otc_demo.csv")
+        downsampled = downsampled_response(pharmacy_tiers)
+        if downsampled is not None:
+            return downsampled
+        
         pharmacy_file = DATA_DIR / "otc_demo.csv"
         if not pharmacy_file.exists():
             # Return mock pharmacy data
@@ -968,7 +1034,7 @@ def get_pharmacy():
         })
     except Exception as e:
         # Return mock data on error
-        import random
+        mark_uncacheable()
         return jsonify({
             "data": [{
                 "date": datetime.now().isoformat().split('T')[0],
@@ -1007,13 +1073,106 @@ def get_outbreak_predictions():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/analysis/lead-lag', methods=['GET'])
+def get_lead_lag():
+    """Per-region lead of wastewater viral load over OTC sales and patient fevers"""
+    try:
+        max_lag = min(max(request.args.get('max_lag', DEFAULT_MAX_LAG, type=int), 1), 60)
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        return jsonify(lead_lag_cache.get(max_lag, force=refresh))
+    except Exception as e:
+        logger.error("Error computing lead-lag analysis", extra={"error": str(e)}, exc_info=True)
+        return jsonify({"error": str(e), "pairs": {}}), 500
+
+def fetch_detected_alerts(severity=None, limit=100):
+    """Load alerts raised by the streaming anomaly detector, or None if the database is unavailable"""
+    conn = get_request_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        query = """
+            SELECT id, alert_type, severity, region_name, title, message, source,
+                   confidence, metadata, created_at
+            FROM alerts
+        """
+        params = []
+        if severity:
+            query += " WHERE severity = %s"
+            params.append(severity)
+        query += " ORDER BY created_at DESC LIMIT %s"
+        params.append(limit)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.rollback()  # end the read transaction; the connection stays open for the request
+    except Exception as e:
+        logger.warning(f"Could not load alerts from database: {e}")
+        conn.rollback()
+        return None
+    
+    alerts = []
+    for row in rows:
+        metadata = row.get('metadata') or {}
+        alerts.append({
+            "id": str(row['id']),
+            "severity": row['severity'],
+            "region": row.get('region_name') or '',
+            "message": row['message'],
+            "title": row['title'],
+            "timestamp": row['created_at'].isoformat() if row['created_at'] else None,
+            "source": row.get('source') or row['alert_type'],
+            "confidence": row.get('confidence') or 0,
+            "affectedPopulation": metadata.get('affected_population', 0),
+            "trend": "increasing" if row['alert_type'] in ('spike', 'threshold') else "stable"
+        })
+    return alerts
+
+# Polls within this window reuse the last version instead of querying for it, at the cost of
+# a change showing up to this much later
+ALERTS_VERSION_TTL_SECONDS = 2.0
+_alerts_version = {'value': None, 'at': float('-inf')}
+_alerts_version_lock = threading.Lock()
+
+def alerts_store_version():
+    """Changes whenever any writer adds, removes or acknowledges an alert; None without a database"""
+    with _alerts_version_lock:
+        if time.monotonic() - _alerts_version['at'] < ALERTS_VERSION_TTL_SECONDS:
+            return _alerts_version['value']
+    # The request's own connection, which get_alerts reuses (or, if the database is down, does not retry)
+    conn = get_request_db_connection()
+    version = None
+    if conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT count(*), max(created_at), max(acknowledged_at) FROM alerts")
+            version = repr(cursor.fetchone())
+            cursor.close()
+            conn.rollback()
+        except Exception as e:
+            logger.warning(f"Could not read alerts version: {e}")
+            conn.rollback()
+    with _alerts_version_lock:
+        _alerts_version.update(value=version, at=time.monotonic())
+    return version
+
 @app.route('/api/alerts', methods=['GET'])
+@conditional_get(version=alerts_store_version)
 def get_alerts():
     """Get all alerts - shared data source for both portals"""
     try:
         severity = request.args.get('severity')
         
-        # Centralized alerts data - used by both public and admin portals
+        detected = fetch_detected_alerts(severity)
+        if detected is not None:
+            return jsonify({
+                "alerts": detected,
+                "count": len(detected),
+                "mode": "live"
+            })
+        
+        # Database unavailable - centralized demo alerts used by both public and admin portals
+        mark_uncacheable()
         alerts = [
             {
                 "id": "CI-001",
@@ -1077,7 +1236,8 @@ def get_alerts():
         
         return jsonify({
             "alerts": alerts,
-            "count": len(alerts)
+            "count": len(alerts),
+            "mode": "mock"
         })
     except Exception as e:
         logger.error("Error getting alerts", extra={"error": str(e)}, exc_info=True)
@@ -1300,6 +1460,19 @@ def get_admin_hotspots():
                 "trend": "stable"
             },
         ]
+        
+        # Replace the default lead times with the measured wastewater lead where one is significant
+        for hotspot in hotspots:
+            hotspot["lead_time_source"] = "default"
+            try:
+                measured = lead_lag_cache.lead_time_days(hotspot["area"])
+            except Exception as e:
+                logger.warning(f"Lead-lag lookup failed: {e}")
+                measured = None
+            if measured is not None:
+                hotspot["lead_time_days"] = measured
+                hotspot["lead_time_source"] = "measured"
+        
         return jsonify({"hotspots": hotspots, "count": len(hotspots)})
     except Exception as e:
         logger.error("Error getting admin hotspots", extra={"error": str(e)}, exc_info=True)
@@ -1404,9 +1577,9 @@ def model_predict():
         prediction = outbreak_predictor.predict(wastewater_data, pharmacy_data)
         prediction['mode'] = 'mock' if use_mock else 'live'
         
-        # Log to blockchain
+        # Log to blockchain (mined in the background)
         try:
-            blockchain.add_audit_log(
+            audit_writer.submit(
                 event_type='model_prediction',
                 user_id='system',
                 action='predict_outbreak',
@@ -0,0 +1,242 @@
+"""
+Blockchain micro-benchmarks
+Mining throughput, append latency, verification, audit-trail queries and memory per block,
+written as one JSON document so runs can be diffed across commits
+
+Chains are built in memory or on a block log in a temporary directory; the
+application's data/blockchain is never opened. Progress and log lines go to
+stderr, so stdout carries only the report.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Sequence
+import gc
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from models.block_log import BlockLog
+from models.blockchain import Blockchain, BlockchainNode
+from models.mining import MiningEngine
+
+FULL = {
+    'difficulties': [1, 2, 3, 4, 5],
+    'mining_seconds': 2.0,
+    'append_samples': 500,
+    'verify_lengths': [100, 1000, 10000],
+    'query_entries': [1000, 10000, 100000],
+    'memory_blocks': 2000,
+}
+QUICK = {
+    'difficulties': [1, 2, 3],
+    'mining_seconds': 0.5,
+    'append_samples': 100,
+    'verify_lengths': [100, 1000],
+    'query_entries': [1000, 10000],
+    'memory_blocks': 500,
+}
+USERS = 1000  # distinct user ids in generated audit entries
+RESOURCES = 10
+
+
+def percentiles(samples: Sequence[float]) -> Dict:
+    """Nearest-rank p50/p95/p99 plus mean and max, in milliseconds"""
+    ordered = sorted(samples)
+    rank = lambda p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 4),
+        'p50_ms': round(rank(50) * 1000, 4),
+        'p95_ms': round(rank(95) * 1000, 4),
+        'p99_ms': round(rank(99) * 1000, 4),
+        'max_ms': round(ordered[-1] * 1000, 4),
+    }
+
+
+def audit_entry(i: int) -> Dict:
+    return Blockchain.build_audit_entry(
+        'data_access', f"user-{i % USERS}", 'read', f"resource-{i % RESOURCES}", {'seq': i}
+    )
+
+
+def build_chain(entries: int, batch_size: int = 100) -> Blockchain:
+    """In-memory chain without proof of work; verification and queries cost the same either way"""
+    chain = Blockchain(difficulty=0, batch_size=batch_size, mining_enabled=False)
+    chain.add_transactions([audit_entry(i) for i in range(entries)])
+    return chain
+
+
+def bench_mining(difficulties: List[int], seconds: float) -> List[Dict]:
+    """Blocks and hashes per second at each difficulty, mining for a fixed wall time"""
+    results = []
+    engine = MiningEngine()
+    for difficulty in difficulties:
+        blocks, hashes, started = 0, engine.hashes, time.perf_counter()
+        while blocks == 0 or time.perf_counter() - started < seconds:
+            node = BlockchainNode(previous_hash='0' * 64, transactions=[audit_entry(blocks)], index=blocks + 1)
+            node.mine_block(difficulty, engine)
+            blocks += 1
+        elapsed = time.perf_counter() - started
+        results.append({
+            'difficulty': difficulty,
+            'blocks': blocks,
+            'seconds': round(elapsed, 3),
+            'blocks_per_second': round(blocks / elapsed, 2),
+            'hashes_per_second': round((engine.hashes - hashes) / elapsed, 1),
+        })
+    return results
+
+
+def bench_append(samples: int, difficulty: int = 2) -> Dict:
+    """add_audit_log latency, in memory and on the block log"""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for storage, log in (('memory', None), ('block_log', BlockLog(Path(directory)))):
+            chain = Blockchain(difficulty=difficulty, log=log)
+            latencies = []
+            for i in range(samples):
+                started = time.perf_counter()
+                chain.add_audit_log('data_access', f"user-{i % USERS}", 'read', 'resource')
+                latencies.append(time.perf_counter() - started)
+            results[storage] = dict(percentiles(latencies), difficulty=difficulty)
+            if log:
+                log.close()
+    return results
+
+
+def bench_verify(lengths: List[int]) -> List[Dict]:
+    """Full re-verification and the incremental check of one new block, by chain length"""
+    results = []
+    for length in lengths:
+        chain = build_chain(length - 1, batch_size=1)
+        started = time.perf_counter()
+        valid = chain.deep_verify()
+        full = time.perf_counter() - started
+        chain.add_transactions([audit_entry(length)])
+        started = time.perf_counter()
+        chain.verify_chain()
+        incremental = time.perf_counter() - started
+        results.append({
+            'blocks': len(chain.chain),
+            'valid': valid,
+            'full_ms': round(full * 1000, 3),
+            'full_blocks_per_second': round(length / full, 1),
+            'incremental_ms': round(incremental * 1000, 4),
+        })
+    return results
+
+
+def bench_audit_trail(sizes: List[int], repeats: int = 20) -> List[Dict]:
+    """Query time by chain size and by how many entries the filter matches"""
+    results = []
+    for entries in sizes:
+        chain = build_chain(entries)
+        queries = {
+            'one_user': {'user_id': 'user-7'},
+            'one_resource': {'resource': 'resource-3'},
+            'user_and_resource': {'user_id': 'user-7', 'resource': 'resource-7'},
+            'no_match': {'user_id': 'nobody'},
+            'unfiltered_limit_100': {'limit': 100},
+        }
+        for name, kwargs in queries.items():
+            timings, matched = [], 0
+            for _ in range(repeats):
+                started = time.perf_counter()
+                matched = len(chain.get_audit_trail(**kwargs))
+                timings.append(time.perf_counter() - started)
+            results.append(dict(percentiles(timings), entries=entries, query=name, matched=matched,
+                                selectivity=round(matched / entries, 6)))
+    return results
+
+
+def bench_memory(blocks: int) -> List[Dict]:
+    """Bytes held per block in an in-memory chain, indexes included, by entries per block"""
+    results = []
+    for batch_size in (1, 10, 100):
+        entries = [audit_entry(i) for i in range(blocks * batch_size)]
+        chain = Blockchain(difficulty=0, batch_size=batch_size, mining_enabled=False)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        chain.add_transactions(entries)
+        del entries
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        results.append({
+            'entries_per_block': batch_size,
+            'blocks': blocks,
+            'bytes_per_block': round(held / blocks, 1),
+            'bytes_per_entry': round(held / (blocks * batch_size), 1),
+        })
+    return results
+
+
+def logs_to_stderr():
+    """Send the application logger's output to stderr instead of stdout"""
+    try:
+        from utils.logger import logger
+    except ImportError:
+        return
+    for handler in logger.handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(sys.stderr)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=Path(__file__).parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(settings: Dict, only: List[str] = None) -> Dict:
+    suites = {
+        'mining': lambda: bench_mining(settings['difficulties'], settings['mining_seconds']),
+        'append': lambda: bench_append(settings['append_samples']),
+        'verify': lambda: bench_verify(settings['verify_lengths']),
+        'audit_trail': lambda: bench_audit_trail(settings['query_entries']),
+        'memory': lambda: bench_memory(settings['memory_blocks']),
+    }
+    report = {
+        'benchmark': 'blockchain',
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': settings,
+        'results': {},
+    }
+    for name, suite in suites.items():
+        if only and name not in only:
+            continue
+        started = time.perf_counter()
+        report['results'][name] = suite()
+        print(f"{name}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return report
+
+
+if __name__ == '__main__':
+    # From backend/: python -m benchmarks.blockchain_bench [--quick] [--only mining verify] [-o out.json]
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Blockchain micro-benchmarks for Fever Oracle')
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes for a fast smoke run')
+    parser.add_argument('--only', nargs='+', choices=['mining', 'append', 'verify', 'audit_trail', 'memory'],
+                        help='Run only these suites')
+    parser.add_argument('-o', '--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    logs_to_stderr()
+    report = json.dumps(run(QUICK if args.quick else FULL, args.only), indent=2)
+    if args.output:
+        Path(args.output).write_text(report + '\n')
+    else:
+        print(report)
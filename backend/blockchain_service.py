@@ -4,10 +4,15 @@ Blockchain service API endpoints
 
 from flask import Blueprint, jsonify, request
 from models.blockchain import blockchain, privacy_blockchain
+from services.audit_writer import audit_writer
+from services.chain_verifier import chain_verifier
 from datetime import datetime
 
 blockchain_bp = Blueprint('blockchain', __name__)
 
+DEFAULT_AUDIT_TRAIL_LIMIT = 100
+MAX_AUDIT_TRAIL_LIMIT = 1000
+
 @blockchain_bp.route('/api/blockchain/info', methods=['GET'])
 def get_blockchain_info():
     """Get blockchain information"""
@@ -15,9 +20,12 @@ def get_blockchain_info():
         # Ensure blockchain is initialized
         if not blockchain.chain:
             blockchain.chain = [blockchain.create_genesis_block()]
-            blockchain._cache_valid = False  # Reset cache
+            blockchain._verified_height = 0  # Reset verification
+            blockchain._verified_hash = blockchain.chain[0].hash
         
         info = blockchain.get_chain_info()
+        info['audit_queue'] = audit_writer.get_metrics()
+        info['deep_verification'] = chain_verifier.get_status()
         return jsonify(info)
     except Exception as e:
         import traceback
@@ -39,37 +47,84 @@ def add_audit_log():
         resource = data.get('resource', '')
         metadata = data.get('metadata', {})
         
-        block = blockchain.add_audit_log(event_type, user_id, action, resource, metadata)
+        # Batched into the next block by the background writer
+        entry_id = audit_writer.submit(event_type, user_id, action, resource, metadata)
+        if entry_id is None:
+            return jsonify({"error": "Audit queue is full, retry later"}), 503
         return jsonify({
             "success": True,
-            "block": block.to_dict()
-        })
+            "entry_id": entry_id,
+            "status": "queued"
+        }), 202
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _parse_time_arg(name):
+    """ISO 8601 query parameter as naive local time, like audit entry timestamps; ValueError if malformed"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
 @blockchain_bp.route('/api/blockchain/audit-trail', methods=['GET'])
 def get_audit_trail():
-    """Get audit trail from blockchain"""
+    """Get audit trail from blockchain, newest first; ?order=asc pages forward from the oldest"""
     try:
         user_id = request.args.get('user_id')
         resource = request.args.get('resource')
+        event_type = request.args.get('event_type')
+        limit = max(1, min(request.args.get('limit', DEFAULT_AUDIT_TRAIL_LIMIT, type=int), MAX_AUDIT_TRAIL_LIMIT))
+        cursor = request.args.get('cursor', type=int)
+        order = request.args.get('order', 'desc').lower()
+        if order not in ('asc', 'desc'):
+            return jsonify({"error": "order must be asc or desc"}), 400
+        try:
+            since, until = _parse_time_arg('since'), _parse_time_arg('until')
+        except ValueError:
+            return jsonify({"error": "since and until must be ISO 8601 timestamps"}), 400
         
-        audit_logs = blockchain.get_audit_trail(user_id, resource)
+        audit_logs = blockchain.get_audit_trail(user_id, resource, event_type,
+                                                since=since, until=until, limit=limit, cursor=cursor,
+                                                newest_first=order == 'desc')
         return jsonify({
             "audit_logs": audit_logs,
-            "count": len(audit_logs)
+            "count": len(audit_logs),
+            "next_cursor": audit_logs[-1]['cursor'] if len(audit_logs) == limit else None
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@blockchain_bp.route('/api/blockchain/proof/<entry_id>', methods=['GET'])
+def get_inclusion_proof(entry_id):
+    """Get a Merkle inclusion proof for a single audit entry, anchored at the next anchor block"""
+    try:
+        checkpoint = request.args.get('checkpoint', type=int)
+        anchors = request.args.get('anchors', type=int)
+        try:
+            proof = blockchain.get_inclusion_proof(entry_id, checkpoint, anchor_count=anchors)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if proof is None:
+            return jsonify({"error": "Entry not found or not yet mined", "entry_id": entry_id}), 404
+        return jsonify(proof)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @blockchain_bp.route('/api/blockchain/verify', methods=['GET'])
 def verify_blockchain():
-    """Verify blockchain integrity"""
+    """Verify blockchain integrity; ?deep=true also starts a full re-verification in the background"""
     try:
         is_valid = blockchain.verify_chain()
+        if request.args.get('deep', 'false').lower() == 'true':
+            chain_verifier.trigger()
         return jsonify({
             "is_valid": is_valid,
-            "chain_length": len(blockchain.chain)
+            "chain_length": len(blockchain.chain),
+            "verified_height": blockchain._verified_height,
+            "deep_verification": chain_verifier.get_status()
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -83,11 +138,15 @@ def add_data_hash():
         data_hash = data.get('data_hash')
         data_type = data.get('data_type', 'unknown')
         
-        block = blockchain.add_data_hash(data_id, data_hash, data_type)
+        # Mined by the same writer as audit entries, never inline under the log lock
+        entry = blockchain.build_data_hash_entry(data_id, data_hash, data_type)
+        if not audit_writer.enqueue(entry):
+            return jsonify({"error": "Audit queue is full, retry later"}), 503
         return jsonify({
             "success": True,
-            "block": block.to_dict()
-        })
+            "entry_id": entry['entry_id'],
+            "status": "queued"
+        }), 202
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
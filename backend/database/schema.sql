@@ -111,7 +111,7 @@ CREATE INDEX IF NOT EXISTS idx_outbreak_cases_date ON outbreak_cases(date);
 -- Alerts table
 CREATE TABLE IF NOT EXISTS alerts (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    alert_type VARCHAR(50) NOT NULL, -- 'outbreak', 'spike', 'supply', 'personal'
+    alert_type VARCHAR(50) NOT NULL, -- 'outbreak', 'spike', 'threshold', 'supply', 'personal'
     severity VARCHAR(20) NOT NULL CHECK (severity IN ('high', 'medium', 'low')),
     region_id UUID REFERENCES regions(id),
     fever_type_id UUID REFERENCES fever_types(id),
@@ -129,6 +129,15 @@ CREATE INDEX IF NOT EXISTS idx_alerts_target_role ON alerts(target_role);
 CREATE INDEX IF NOT EXISTS idx_alerts_user_id ON alerts(user_id);
 CREATE INDEX IF NOT EXISTS idx_alerts_created_at ON alerts(created_at);
 
+-- Columns for alerts raised by the streaming anomaly detector
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS source VARCHAR(100);
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS region_name VARCHAR(255);
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS confidence INTEGER; -- 0-100
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS metadata JSONB;
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS dedup_key VARCHAR(255);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_dedup_key ON alerts(dedup_key);
+
 -- Medication demand forecasts for pharma
 CREATE TABLE IF NOT EXISTS medication_demands (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -0,0 +1,64 @@
+"""
+Gunicorn configuration
+Starts the single chain writer process before the workers fork, so every worker
+forwards audit events to it instead of mining a chain of its own
+"""
+
+from pathlib import Path
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+# Threads keep long-lived /api/stream/events connections from pinning whole workers. Each open
+# stream still holds one, so a worker admits at most stream.max_clients_per_worker in
+# config/kafka_topics.json (half of these threads if unset) and answers 503 past that
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+timeout = 120
+graceful_timeout = 30
+accesslog = '-'
+errorlog = '-'
+
+CHAIN_WRITER_SOCKET_ENV = 'CHAIN_WRITER_SOCKET'
+CHAIN_WRITER_START_TIMEOUT = 30.0
+
+_chain_writer = None
+
+
+def _wait_for_socket(path: str, process: subprocess.Popen, timeout_seconds: float) -> bool:
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def on_starting(server):
+    global _chain_writer
+    path = os.environ.setdefault(CHAIN_WRITER_SOCKET_ENV,
+                                 os.path.join(tempfile.gettempdir(), 'fever-oracle-chain-writer.sock'))
+    _chain_writer = subprocess.Popen([sys.executable, '-m', 'services.chain_writer', path],
+                                     cwd=Path(__file__).parent)
+    if _wait_for_socket(path, _chain_writer, CHAIN_WRITER_START_TIMEOUT):
+        server.log.info("Chain writer started (pid %s) on %s", _chain_writer.pid, path)
+    else:
+        # Workers fall back to mining locally under the block log lock
+        server.log.warning("Chain writer did not come up on %s", path)
+
+
+def on_exit(server):
+    if _chain_writer is None or _chain_writer.poll() is not None:
+        return
+    _chain_writer.terminate()
+    try:
+        _chain_writer.wait(timeout=graceful_timeout)
+    except subprocess.TimeoutExpired:
+        _chain_writer.kill()
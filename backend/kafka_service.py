@@ -2,18 +2,31 @@
 Kafka service for monitoring and real-time data access
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from functools import lru_cache
 import json
 import threading
 from datetime import datetime, timedelta
 from collections import defaultdict
 import os
+import tempfile
+import time
 from pathlib import Path
 
+from services.codec import MessageCodec, SchemaError
+from services.consumer_lag import DEFAULT_LAG_INTERVAL_SECONDS, ConsumerLagMonitor
+from services.event_stream import DEFAULT_CLIENT_QUEUE_SIZE, DEFAULT_HEARTBEAT_SECONDS, EventBroker
+from services.latency import (DEFAULT_WINDOW_SECONDS, FileFreshness, LatencyRecorder,
+                              load_summary, merge_summaries)
+from services.leader import FileLeaderElection
+from services.monitor_spool import MonitorSpool
+from services.rate_counter import SlidingWindowCounter
+from services.stream_aggregator import DEFAULT_ALLOWED_LATENESS_SECONDS, DEFAULT_WINDOWS, StreamAggregator
+from services.topic_buffers import DEFAULT_BUFFER_SIZE, TopicBuffers
+
 # Try to import Kafka, but handle gracefully if not available
 try:
-    from kafka import KafkaConsumer
+    from kafka import KafkaConsumer, KafkaProducer, TopicPartition
     from kafka.errors import KafkaError
     KAFKA_AVAILABLE = True
 except ImportError:
@@ -27,6 +40,7 @@ KAFKA_BOOTSTRAP_SERVERS = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092')
 
 # Load Kafka topics configuration
 CONFIG_DIR = Path(__file__).parent / "config"
+DATA_DIR = Path(__file__).parent.parent / "data"
 KAFKA_CONFIG_FILE = CONFIG_DIR / "kafka_topics.json"
 
 @lru_cache(maxsize=1)
@@ -60,26 +74,123 @@ kafka_stats = {
         'total_messages': 0,
         'last_message_time': None,
         'status': 'idle',
-        'message_times': []  # Track message timestamps for rate calculation
+        'counter': SlidingWindowCounter(60)  # messages in each of the last 60 seconds
     }),
     'total_throughput': 0,
-    'consumer_lag': 0
+    'consumer_lag': 0,
+    'consumer_connected': False,
+    'role': None  # 'leader' runs the consumers, a 'follower' mirrors the leader's snapshot
 }
 
+DEFAULT_TOPICS = [
+    'fever-oracle-wastewater',
+    'fever-oracle-pharmacy',
+    'fever-oracle-patients',
+    'fever-oracle-vitals',
+    'fever-oracle-alerts',
+    'fever-oracle-outbreak'
+]
+PARTITION_REFRESH_SECONDS = 60
+DEFAULT_LATEST_LIMIT = 20
+
+# The monitor reads every partition without a consumer group, so nothing is committed under this
+# name; its lag is measured from the positions it records as it reads
+MONITOR_GROUP = 'fever-oracle-monitor'
+monitor_positions = {}  # (topic, partition) -> next offset the monitor will read
+
+message_codec = MessageCodec(load_kafka_config().get('serialization', {}).get('format', 'json'))
+topic_buffers = TopicBuffers(load_kafka_config().get('buffers', {}).get('size', DEFAULT_BUFFER_SIZE))
+lag_monitor = ConsumerLagMonitor(
+    KAFKA_BOOTSTRAP_SERVERS,
+    groups=[group['name'] for group in load_kafka_config().get('consumer_groups', []) if group['name'] != MONITOR_GROUP]
+        or ['fever-oracle-consumers'],
+    topics=[topic['name'] for topic in load_kafka_config().get('topics', [])] or DEFAULT_TOPICS,
+    interval_seconds=load_kafka_config().get('lag', {}).get('interval_seconds', DEFAULT_LAG_INTERVAL_SECONDS),
+    positions={MONITOR_GROUP: lambda: dict(monitor_positions)}
+)
+_stream_config = load_kafka_config().get('stream', {})
+
+def _replay_messages(after: int):
+    """Buffered messages newer than a stream client's last event id, the same on every worker"""
+    return [(sequence, topic.replace('fever-oracle-', ''), value)
+            for sequence, topic, _, value in topic_buffers.entries_after(after)]
+
+# Every open stream pins a gunicorn thread; by default half of them stay free for ordinary requests
+STREAM_MAX_CLIENTS = _stream_config.get('max_clients_per_worker') \
+    or max(1, int(os.getenv('GUNICORN_THREADS', '16')) // 2)
+STREAM_FULL_RETRY_SECONDS = _stream_config.get('full_retry_seconds', 10)
+
+event_broker = EventBroker(
+    client_queue_size=_stream_config.get('client_queue_size', DEFAULT_CLIENT_QUEUE_SIZE),
+    heartbeat_seconds=_stream_config.get('heartbeat_seconds', DEFAULT_HEARTBEAT_SECONDS),
+    replay=_replay_messages,
+    max_clients=STREAM_MAX_CLIENTS
+)
+STATS_EVENT_INTERVAL_SECONDS = 1.0
+
+# broker_to_monitor and disk_to_api are measured here; the persistence consumer writes its stages to LATENCY_FILE
+pipeline_latency = LatencyRecorder(load_kafka_config().get('latency', {}).get('window_seconds', DEFAULT_WINDOW_SECONDS))
+file_freshness = FileFreshness(pipeline_latency)
+LATENCY_FILE = DATA_DIR / "pipeline_latency.json"
+_published_stats = {}  # topic -> last stats sent to stream clients
+
+# Only one process per host consumes; the others read what it publishes here
+MONITOR_DIR = Path(os.getenv('KAFKA_MONITOR_DIR', Path(tempfile.gettempdir()) / 'fever-oracle-kafka-monitor'))
+SNAPSHOT_FILE = MONITOR_DIR / 'snapshot.json'
+SNAPSHOT_INTERVAL_SECONDS = load_kafka_config().get('monitor', {}).get('snapshot_interval_seconds', 1.0)
+SNAPSHOT_STALE_SECONDS = max(10.0, SNAPSHOT_INTERVAL_SECONDS * 10)
+leader_election = FileLeaderElection(MONITOR_DIR / 'leader.lock')
+# Unchanged stats are still rewritten this often, so followers can tell a live leader from a dead one
+monitor_spool = MonitorSpool(MONITOR_DIR, SNAPSHOT_FILE, heartbeat_seconds=SNAPSHOT_STALE_SECONDS / 3)
+
+_aggregation_config = load_kafka_config().get('aggregation', {})
+AGGREGATES_TOPIC = _aggregation_config.get('output_topic', 'fever-oracle-aggregates')
+AGGREGATE_CHECKPOINT_SECONDS = _aggregation_config.get('checkpoint_interval_seconds', 30)
+_aggregate_producer = None
+
+def _emit_aggregate(result):
+    """Publish one closed window to the aggregates topic"""
+    global _aggregate_producer
+    if not _aggregation_config.get('emit', True):
+        return
+    try:
+        if _aggregate_producer is None:
+            _aggregate_producer = KafkaProducer(
+                bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+                key_serializer=lambda k: k.encode('utf-8')
+            )
+        payload, headers = message_codec.encode(AGGREGATES_TOPIC, result)
+        # One key per window instance, so a window emitted again after a crash replaces itself under compaction
+        key = f"{result['window']}:{result['start']}:{result['topic']}:{result['region']}"
+        _aggregate_producer.send(AGGREGATES_TOPIC, key=key, value=payload, headers=headers)
+    except Exception:
+        _aggregate_producer = None  # reconnect on the next window
+        raise
+
+def _flush_aggregates():
+    """Wait for emitted windows to reach the broker, so none is checkpointed as closed but never sent"""
+    if _aggregate_producer is None:
+        return
+    try:
+        _aggregate_producer.flush(timeout=10)
+    except Exception:
+        pass  # the checkpoint still goes ahead; a window lost here was counted in emit_failed or is in flight
+
+stream_aggregator = StreamAggregator(
+    _aggregation_config.get('windows', DEFAULT_WINDOWS),
+    allowed_lateness_seconds=_aggregation_config.get('allowed_lateness_seconds', DEFAULT_ALLOWED_LATENESS_SECONDS),
+    checkpoint_path=DATA_DIR / 'stream_aggregates.json',
+    emit=_emit_aggregate
+)
+
 def calculate_throughput():
     """Calculate messages per minute for each topic"""
+    if kafka_stats['role'] == 'follower':
+        return  # the leader's counters arrive with its snapshot
     now = datetime.now()
-    one_minute_ago = now - timedelta(minutes=1)
     
-    for topic_name, stats in kafka_stats['topics'].items():
-        # Filter messages from last minute
-        stats['message_times'] = [
-            t for t in stats['message_times'] 
-            if t > one_minute_ago
-        ]
-        
-        # Calculate messages per minute
-        stats['messages_per_minute'] = len(stats['message_times'])
+    for topic_name, stats in list(kafka_stats['topics'].items()):
+        stats['messages_per_minute'] = stats['counter'].total()
         
         # Determine status
         if stats['messages_per_minute'] > 0:
@@ -93,8 +204,256 @@ def calculate_throughput():
         s['messages_per_minute'] for s in kafka_stats['topics'].values()
     )
 
+def _deserialize(raw: bytes):
+    try:
+        return message_codec.decode(raw)  # JSON or schema-prefixed binary, told apart by the first byte
+    except (UnicodeDecodeError, ValueError, SchemaError):
+        return None  # skipped rather than stopping the monitor
+
+def _monitor_topics():
+    config = load_kafka_config()
+    topics = [topic['name'] for topic in config.get('topics', [])] or DEFAULT_TOPICS
+    # Our own output; consuming it would feed aggregates back into the buffers and counters
+    return [topic for topic in topics if topic != AGGREGATES_TOPIC]
+
+def _assign_partitions(consumer):
+    """Assign every partition of the monitored topics, starting new ones a buffer's length back"""
+    partitions = {
+        TopicPartition(topic, partition)
+        for topic in _monitor_topics()
+        for partition in (consumer.partitions_for_topic(topic) or ())
+    }
+    added = partitions - consumer.assignment()
+    if not added:
+        return
+    consumer.assign(list(partitions))
+    # Warm the ring buffers with recent history instead of waiting for new messages,
+    # going further back if the aggregator's checkpoint has not yet covered that far
+    beginning = consumer.beginning_offsets(list(added))
+    end = consumer.end_offsets(list(added))
+    for tp in added:
+        start = end[tp] - topic_buffers.capacity
+        resume = stream_aggregator.next_offset(tp.topic, tp.partition)
+        if resume is not None:
+            start = min(start, resume)
+        consumer.seek(tp, max(beginning[tp], start))
+        monitor_positions[(tp.topic, tp.partition)] = max(beginning[tp], start)
+
+def _is_aggregate(value) -> bool:
+    """Window aggregates published before they had a topic of their own"""
+    return isinstance(value, dict) and value.get('type') == 'window_aggregate'
+
+def _record_message(message, live_since_ms: int):
+    monitor_positions[(message.topic, message.partition)] = message.offset + 1
+    if message.value is None or _is_aggregate(message.value):
+        return
+    sequence = topic_buffers.append(message.topic, message.timestamp, message.value)
+    stream_aggregator.process(message.topic, message.partition, message.offset, message.timestamp, message.value)
+    if message.timestamp < live_since_ms:
+        return  # replayed history fills the buffers but does not count as throughput
+    pipeline_latency.observe(message.topic, 'broker_to_monitor', time.time() * 1000 - message.timestamp)
+    now = datetime.now()
+    stats = kafka_stats['topics'][message.topic]
+    stats['total_messages'] += 1
+    stats['last_message_time'] = now
+    stats['counter'].add()
+    event_broker.publish('message', message.topic.replace('fever-oracle-', ''), message.value, sequence)
+
+def _topic_stats(stats) -> dict:
+    return {key: stats[key] for key in ('messages_per_minute', 'total_messages', 'status')}
+
+def _stats_event(topics: dict) -> dict:
+    return {
+        'topics': topics,
+        'total_throughput': kafka_stats['total_throughput'],
+        'consumer_lag': lag_monitor.get_report()['total_lag']
+    }
+
+def _publish_stats_delta():
+    """Send stream clients only the topic stats that changed since the last stats event"""
+    delta = {}
+    for topic, stats in list(kafka_stats['topics'].items()):
+        current = _topic_stats(stats)
+        if _published_stats.get(topic) != current:
+            delta[topic.replace('fever-oracle-', '')] = current
+            _published_stats[topic] = current
+    if delta:
+        event_broker.publish('stats', 'stats', _stats_event(delta))
+
+def _initial_stream_events():
+    """Every topic's current stats, so a stream client needs no separate stats request"""
+    topics = {topic.replace('fever-oracle-', ''): _topic_stats(stats)
+              for topic, stats in list(kafka_stats['topics'].items()) if topic != AGGREGATES_TOPIC}
+    return [('stats', 'stats', _stats_event(topics))]
+
+def _run_monitor():
+    """Long-lived consume loop; reconnects with backoff if the broker goes away"""
+    from utils.logger import logger
+    backoff = 1
+    while True:
+        consumer = None
+        try:
+            # No consumer group: the leader reads every partition
+            consumer = KafkaConsumer(
+                bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+                value_deserializer=_deserialize,
+                group_id=None,
+                enable_auto_commit=False,
+                api_version=(0, 10, 1)
+            )
+            live_since_ms = int(time.time() * 1000)
+            kafka_stats['consumer_connected'] = True
+            backoff = 1
+            next_assignment = next_stats_event = 0.0
+            while True:
+                if time.monotonic() >= next_assignment:
+                    _assign_partitions(consumer)  # picks up topics created after startup
+                    next_assignment = time.monotonic() + PARTITION_REFRESH_SECONDS
+                if not consumer.assignment():
+                    time.sleep(1)
+                    continue
+                for messages in consumer.poll(timeout_ms=1000).values():
+                    for message in messages:
+                        _record_message(message, live_since_ms)
+                calculate_throughput()
+                if time.monotonic() >= next_stats_event:
+                    _publish_stats_delta()
+                    next_stats_event = time.monotonic() + STATS_EVENT_INTERVAL_SECONDS
+        except Exception as e:
+            kafka_stats['consumer_connected'] = False
+            logger.warning("Kafka monitor disconnected", extra={"error": str(e), "retry_seconds": backoff})
+        finally:
+            if consumer:
+                try:
+                    consumer.close()
+                except:
+                    pass
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 60)
+
+def _spool_base():
+    """Full buffers and closed windows, the first record of every spool generation"""
+    return {'buffers': topic_buffers.export(), 'aggregates': list(stream_aggregator.results)}
+
+def _start_spool() -> int:
+    """Open a new spool generation; returns the newest buffer sequence it already covers"""
+    base = _spool_base()
+    monitor_spool.start(f"{os.getpid()}-{time.time()}", base)
+    sequences = [entries[-1][0] for entries in base['buffers'].values() if entries]
+    return max(sequences + [0])
+
+def _write_snapshot(leader_id: str, spooled_sequence: int, closed) -> int:
+    """
+    Spool messages and windows that are new since the last tick, then publish stats if they changed
+
+    Returns the newest spooled buffer sequence. Followers read the stats file
+    only when it is replaced, and the spool only past where they left off.
+    """
+    if monitor_spool.full:
+        spooled_sequence = _start_spool()
+        closed = []  # already in the new generation's base
+    entries = topic_buffers.entries_after(spooled_sequence)
+    monitor_spool.append([{'message': list(entry)} for entry in entries]
+                         + [{'aggregate': result} for result in closed])
+    if entries:
+        spooled_sequence = entries[-1][0]
+    monitor_spool.publish({
+        'leader': leader_id,
+        'consumer_connected': kafka_stats['consumer_connected'],
+        'total_throughput': kafka_stats['total_throughput'],
+        'topics': {
+            topic: {
+                'messages_per_minute': stats['messages_per_minute'],
+                'total_messages': stats['total_messages'],
+                'status': stats['status'],
+                'last_message_time': stats['last_message_time'].isoformat() if stats['last_message_time'] else None
+            }
+            for topic, stats in list(kafka_stats['topics'].items())
+        },
+        'lag': lag_monitor.get_report(),
+        'aggregation': stream_aggregator.get_metrics(),
+        # Only the monitor's own stage; every worker measures disk_to_api for the reads it serves
+        'monitor_latency': {topic: {'broker_to_monitor': stages['broker_to_monitor']}
+                            for topic, stages in pipeline_latency.summary().items() if 'broker_to_monitor' in stages}
+    })
+    return spooled_sequence
+
+def _apply_snapshot(snapshot) -> bool:
+    """Mirror the leader's stats, then fold in the spool records this worker has not seen; False to retry"""
+    for topic, values in snapshot['topics'].items():
+        stats = kafka_stats['topics'][topic]
+        stats.update(values)
+        stats['last_message_time'] = datetime.fromisoformat(values['last_message_time']) \
+            if values['last_message_time'] else None
+    kafka_stats['total_throughput'] = snapshot['total_throughput']
+    kafka_stats['consumer_connected'] = snapshot['consumer_connected'] \
+        and time.time() - snapshot['written_at'] < SNAPSHOT_STALE_SECONDS
+    lag_monitor.load_report(snapshot['lag'])
+    kafka_stats['aggregation'] = snapshot.get('aggregation')
+    kafka_stats['monitor_latency'] = snapshot.get('monitor_latency')
+    event_broker.epoch = snapshot.get('leader')  # message ids carry the leader's buffer sequences
+    
+    records = monitor_spool.read_new(snapshot)
+    for record in records or ():
+        if 'message' in record:
+            sequence, topic, timestamp_ms, value = record['message']
+            topic_buffers.append(topic, timestamp_ms, value, sequence=sequence)
+            # New since this worker last looked: re-publish to its stream clients
+            event_broker.publish('message', topic.replace('fever-oracle-', ''), value, sequence)
+        elif 'aggregate' in record:
+            stream_aggregator.add_results([record['aggregate']])
+        elif 'base' in record:
+            # A new generation: the leader changed or rotated its spool, so its state replaces ours
+            topic_buffers.load(record['base']['buffers'])
+            stream_aggregator.load_results(record['base']['aggregates'])
+    _publish_stats_delta()
+    return records is not None
+
+def _run_coordinator():
+    """Become the monitor leader if no other local worker is, otherwise follow its snapshot"""
+    from utils.logger import logger
+    leader_id = None
+    next_aggregate_checkpoint = 0.0
+    spooled_sequence = 0
+    last_mtime = None
+    while True:
+        try:
+            if leader_election.try_acquire():
+                if kafka_stats['role'] != 'leader':
+                    kafka_stats['role'] = 'leader'
+                    topic_buffers.clear()  # the consumer refills them; mirrored entries would repeat
+                    stream_aggregator.restore()  # before the consumer picks its start offsets
+                    spooled_sequence = _start_spool()
+                    leader_id = f"{os.getpid()}-{time.time()}"
+                    event_broker.epoch = leader_id
+                    threading.Thread(target=_run_monitor, name='kafka-monitor', daemon=True).start()
+                    lag_monitor.start()
+                    next_aggregate_checkpoint = time.monotonic() + AGGREGATE_CHECKPOINT_SECONDS
+                    logger.info("Kafka monitor leader elected", extra={"pid": os.getpid()})
+                closed = stream_aggregator.close_windows()
+                # Right after windows close, not only on the timer: a restart from an older checkpoint
+                # would reopen them, and the replayed messages would close and emit them again
+                if closed or time.monotonic() >= next_aggregate_checkpoint:
+                    if closed:
+                        _flush_aggregates()
+                    stream_aggregator.checkpoint()
+                    next_aggregate_checkpoint = time.monotonic() + AGGREGATE_CHECKPOINT_SECONDS
+                spooled_sequence = _write_snapshot(leader_id, spooled_sequence, closed)
+            else:
+                kafka_stats['role'] = 'follower'
+                mtime = SNAPSHOT_FILE.stat().st_mtime_ns if SNAPSHOT_FILE.exists() else None
+                if mtime is not None and mtime != last_mtime:
+                    snapshot = monitor_spool.read_stats()
+                    if snapshot and _apply_snapshot(snapshot):
+                        last_mtime = mtime
+                elif mtime is not None and time.time() - mtime / 1e9 >= SNAPSHOT_STALE_SECONDS:
+                    kafka_stats['consumer_connected'] = False
+        except Exception as e:
+            logger.warning("Kafka monitor coordination failed", extra={"error": str(e)})
+        time.sleep(SNAPSHOT_INTERVAL_SECONDS)
+
 def start_kafka_monitor():
-    """Start monitoring Kafka topics"""
+    """Start monitoring Kafka topics; one worker consumes and shares its view with the rest"""
     if not KAFKA_AVAILABLE:
         try:
             from utils.logger import logger
@@ -103,74 +462,13 @@ def start_kafka_monitor():
             pass
         return
     
+    thread = threading.Thread(target=_run_coordinator, name='kafka-monitor-coordinator', daemon=True)
+    thread.start()
     try:
-        consumer = KafkaConsumer(
-            bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
-            value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-            auto_offset_reset='latest',
-            enable_auto_commit=True,
-            group_id='fever-oracle-monitor',
-            consumer_timeout_ms=1000,
-            api_version=(0, 10, 1)
-        )
-        
-        config = load_kafka_config()
-        topics = [topic['name'] for topic in config.get('topics', [])]
-        
-        if not topics:
-            topics = [
-                'fever-oracle-wastewater',
-                'fever-oracle-pharmacy',
-                'fever-oracle-patients',
-                'fever-oracle-vitals',
-                'fever-oracle-alerts',
-                'fever-oracle-outbreak'
-            ]
-        
-        consumer.subscribe(topics)
-        
-        def consume():
-            try:
-                for message in consumer:
-                    topic = message.topic
-                    now = datetime.now()
-                    
-                    kafka_stats['topics'][topic]['total_messages'] += 1
-                    kafka_stats['topics'][topic]['last_message_time'] = now
-                    kafka_stats['topics'][topic]['message_times'].append(now)
-                    
-                    # Keep only last 100 timestamps
-                    if len(kafka_stats['topics'][topic]['message_times']) > 100:
-                        kafka_stats['topics'][topic]['message_times'] = \
-                            kafka_stats['topics'][topic]['message_times'][-100:]
-                    
-                    calculate_throughput()
-            except Exception as e:
-                try:
-                    from utils.logger import logger
-                    logger.error("Error in Kafka monitor", extra={"error": str(e)}, exc_info=True)
-                except:
-                    pass
-            finally:
-                try:
-                    consumer.close()
-                except:
-                    pass
-        
-        thread = threading.Thread(target=consume, daemon=True)
-        thread.start()
-        try:
-            from utils.logger import logger
-            logger.info("Kafka monitor started")
-        except:
-            pass
-    except Exception as e:
-        # Logger will be imported if needed
-        try:
-            from utils.logger import logger
-            logger.warning("Could not start Kafka monitor", extra={"error": str(e)})
-        except:
-            pass  # Fallback if logger not available
+        from utils.logger import logger
+        logger.info("Kafka monitor started")
+    except:
+        pass
 
 @kafka_bp.route('/api/kafka/stats', methods=['GET'])
 def get_kafka_stats():
@@ -180,7 +478,7 @@ def get_kafka_stats():
         
         # Get default topics from config
         config = load_kafka_config()
-        default_topics = [topic['name'] for topic in config.get('topics', [])]
+        default_topics = [topic['name'] for topic in config.get('topics', []) if topic['name'] != AGGREGATES_TOPIC]
         
         if not default_topics:
             default_topics = [
@@ -227,10 +525,25 @@ def get_kafka_stats():
                     topic['status'] = 'active' if topic['messages_per_minute'] > 0 else 'idle'
             kafka_stats['total_throughput'] = sum(t['messages_per_minute'] for t in topics_list)
         
+        lag = lag_monitor.get_report()
+        kafka_stats['consumer_lag'] = lag['total_lag']
+        consumer_latency = load_summary(LATENCY_FILE) or {}
+        local_latency = pipeline_latency.summary()
+        
         return jsonify({
             'topics': topics_list,
             'total_throughput': kafka_stats['total_throughput'],
             'consumer_lag': kafka_stats['consumer_lag'],
+            'consumer_groups': lag['groups'],
+            'lag_sampled_at': lag['sampled_at'],
+            'lag_error': lag['error'],
+            'pipeline_latency': {
+                'topics': merge_summaries(consumer_latency.get('topics'),
+                                          kafka_stats.get('monitor_latency') if kafka_stats['role'] == 'follower' else None,
+                                          local_latency),
+                'consumer_written_at': consumer_latency.get('written_at'),
+                'window_seconds': pipeline_latency.window_seconds
+            },
             'kafka_available': KAFKA_AVAILABLE,
             'bootstrap_servers': KAFKA_BOOTSTRAP_SERVERS,
             'mode': 'mock' if not KAFKA_AVAILABLE else 'live'
@@ -258,72 +571,32 @@ def get_kafka_stats():
 
 @kafka_bp.route('/api/kafka/latest-data', methods=['GET'])
 def get_latest_kafka_data():
-    """Get latest data from Kafka topics with mock data fallback - always returns JSON"""
+    """Latest buffered messages per topic, optionally only those newer than ?since"""
     # Generate mock data if Kafka is not available
-    if not KAFKA_AVAILABLE:
+    if not KAFKA_AVAILABLE or not kafka_stats['consumer_connected']:
         return _get_mock_kafka_data()
     
     try:
-        consumer = None
-        try:
-            consumer = KafkaConsumer(
-                bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                auto_offset_reset='latest',
-                consumer_timeout_ms=2000,
-                enable_auto_commit=False,
-                api_version=(0, 10, 1)
-            )
-            
-            topics_param = request.args.get('topics', 'wastewater,pharmacy')
-            topics_list = [t.strip() for t in topics_param.split(',')]
-            
-            topic_map = {
-                'wastewater': 'fever-oracle-wastewater',
-                'pharmacy': 'fever-oracle-pharmacy',
-                'patients': 'fever-oracle-patients',
-                'vitals': 'fever-oracle-vitals',
-                'alerts': 'fever-oracle-alerts',
-                'outbreak': 'fever-oracle-outbreak'
-            }
-            
-            subscribed_topics = [topic_map.get(t, f'fever-oracle-{t}') for t in topics_list]
-            consumer.subscribe(subscribed_topics)
-            
-            latest_data = {}
-            message_count = 0
-            max_messages = 20  # Get up to 20 messages per topic
-            
-            try:
-                for message in consumer:
-                    topic = message.topic.replace('fever-oracle-', '')
-                    if topic not in latest_data:
-                        latest_data[topic] = []
-                    latest_data[topic].append(message.value)
-                    message_count += 1
-                    if message_count >= max_messages * len(subscribed_topics):
-                        break
-            except Exception as e:
-                # Timeout is expected when no new messages
-                pass
-        except KafkaError as e:
-            # Kafka connection error - return mock data
-            return _get_mock_kafka_data()
-        except Exception as e:
-            # On any error, return mock data
-            return _get_mock_kafka_data()
-        finally:
-            if consumer:
-                try:
-                    consumer.close()
-                except:
-                    pass
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({"error": "since must be an ISO 8601 timestamp"}), 400
+    limit = max(1, min(request.args.get('limit', DEFAULT_LATEST_LIMIT, type=int), topic_buffers.capacity))
+    
+    try:
+        topics_param = request.args.get('topics', 'wastewater,pharmacy')
+        topics_list = [t.strip() for t in topics_param.split(',') if t.strip()]
+        
+        snapshot = topic_buffers.snapshot([f'fever-oracle-{t}' for t in topics_list], limit, since)
+        latest_data = {topic.replace('fever-oracle-', ''): messages for topic, messages in snapshot.items()}
         
         return jsonify({
             'data': latest_data,
-            'count': message_count,
+            'count': sum(len(messages) for messages in latest_data.values()),
+            'limit': limit,
+            'since': since.isoformat() if since else None,
             'timestamp': datetime.now().isoformat(),
-            'kafka_available': True
+            'kafka_available': True,
+            'mode': 'live'
         })
     except Exception as e:
         import traceback
@@ -331,6 +604,55 @@ def get_latest_kafka_data():
         # On final error, return mock data
         return _get_mock_kafka_data()
 
+@kafka_bp.route('/api/stream/events', methods=['GET'])
+def stream_events():
+    """Server-Sent Events of new Kafka messages and stats deltas; ?topics=wastewater,alerts,stats filters
+
+    A stats client first gets every topic's stats, then deltas. A client that
+    reconnects with Last-Event-ID, on this worker or another, gets the buffered
+    messages it missed. Past STREAM_MAX_CLIENTS open streams a worker answers 503.
+    """
+    topics_param = request.args.get('topics')
+    topics = {t.strip() for t in topics_param.split(',') if t.strip()} if topics_param else None
+    # EventSource resends the last id it saw as a header; the query form helps manual reconnects
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    subscribed = event_broker.subscribe(topics, last_event_id)
+    if subscribed is None:
+        return Response(
+            f"retry: {STREAM_FULL_RETRY_SECONDS * 1000}\n\n",
+            status=503,
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'Retry-After': str(STREAM_FULL_RETRY_SECONDS)}
+        )
+    response = Response(
+        event_broker.stream(subscribed, _initial_stream_events),  # reads nothing from the request once started
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Frees the slot even if the client is gone before the body starts
+    response.call_on_close(lambda: event_broker.unsubscribe(subscribed[0]))
+    return response
+
+@kafka_bp.route('/api/kafka/aggregates', methods=['GET'])
+def get_kafka_aggregates():
+    """Closed window aggregates, newest first; filter by window, topic and region"""
+    limit = max(1, min(request.args.get('limit', 100, type=int), stream_aggregator.results.maxlen))
+    windows = stream_aggregator.query(
+        window=request.args.get('window'),
+        topic=request.args.get('topic'),
+        region=request.args.get('region'),
+        limit=limit
+    )
+    metrics = stream_aggregator.get_metrics() if kafka_stats['role'] != 'follower' else kafka_stats.get('aggregation')
+    return jsonify({
+        'windows': windows,
+        'count': len(windows),
+        'window_specs': [{'name': spec.name, 'size_seconds': spec.size, 'hop_seconds': spec.hop}
+                         for spec in stream_aggregator.specs],
+        'metrics': metrics,
+        'kafka_available': KAFKA_AVAILABLE
+    })
+
 def _get_mock_kafka_data():
     """Generate mock Kafka data for demonstration - always returns JSON"""
     try:
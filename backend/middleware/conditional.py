@@ -0,0 +1,102 @@
+"""
+Conditional GET support for file-backed API responses
+Answers If-None-Match / If-Modified-Since with 304 before the data file is read
+"""
+
+from functools import wraps
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+import hashlib
+import os
+
+from flask import Response, g, make_response, request
+
+
+def file_validators(*paths: Path) -> Optional[Tuple[str, int]]:
+    """Strong ETag and the newest mtime in ns, derived from the files' identity, size and mtime"""
+    digest = hashlib.sha1()
+    latest_ns = 0
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # Missing files mean mock data, which is never cacheable
+            return None
+        digest.update(f"{path}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        latest_ns = max(latest_ns, stat.st_mtime_ns)
+    # Responses vary by query string (filters, points= budget)
+    digest.update(request.query_string)
+    return digest.hexdigest()[:32], latest_ns
+
+
+def version_validator(version: str) -> str:
+    """Strong ETag for data without a backing file, from a version string its store reports"""
+    digest = hashlib.sha1(version.encode())
+    digest.update(request.query_string)
+    return digest.hexdigest()[:32]
+
+
+def mark_uncacheable():
+    """Keep validators off a response, e.g. a mock fallback served after an error"""
+    g.uncacheable = True
+
+
+def _etag_matches(etag: str) -> bool:
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return True
+    # Flask-Compress suffixes the ETag of encoded bodies, e.g. "abc:gzip"
+    return any(tag == etag or tag.startswith(etag + ':') for tag in if_none_match)
+
+
+def conditional_get(*paths: Path, version: Optional[Callable[[], Optional[str]]] = None):
+    """
+    Decorator that serves 304 Not Modified while the backing files are unchanged
+
+    With version, validators come from that callable instead (None means not
+    cacheable), and only an ETag is sent since there is no modification time.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Only the routed view is conditional; internal calls from other endpoints are not
+            endpoint = (request.endpoint or '').rsplit('.', 1)[-1]
+            if request.method != 'GET' or endpoint != f.__name__:
+                return f(*args, **kwargs)
+
+            if version is not None:
+                current = version()
+                if current is None:
+                    return f(*args, **kwargs)
+                etag, modified_ns = version_validator(current), None
+            else:
+                validators = file_validators(*paths)
+                if validators is None:
+                    return f(*args, **kwargs)
+                etag, modified_ns = validators
+            last_modified = None if modified_ns is None else \
+                datetime.fromtimestamp(modified_ns // 1_000_000_000, tz=timezone.utc)
+
+            not_modified = False
+            if request.if_none_match:
+                not_modified = _etag_matches(etag)
+            elif request.if_modified_since and modified_ns is not None:
+                # Last-Modified has whole-second resolution: compare the exact mtime, so a second
+                # write within the same second as the client's copy is not mistaken for it
+                not_modified = modified_ns <= request.if_modified_since.timestamp() * 1_000_000_000
+
+            if not_modified:
+                response = Response(status=304, mimetype='application/json')
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or g.get('uncacheable'):
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,158 @@
+"""
+Secondary indexes over blockchain audit entries
+Postings lists by user, resource, event type and hour, intersected to answer audit-trail queries
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# A location packs (block index, position in block) into one sortable int
+POSITION_BITS = 20
+POSITION_MASK = (1 << POSITION_BITS) - 1
+INDEXED_FIELDS = ('user_id', 'resource', 'event_type')
+BUCKET_FORMAT = '%Y-%m-%dT%H'
+
+
+def pack_location(block_index: int, position: int) -> int:
+    return (block_index << POSITION_BITS) | position
+
+
+def unpack_location(location: int) -> Tuple[int, int]:
+    return location >> POSITION_BITS, location & POSITION_MASK
+
+
+def time_bucket(timestamp: str) -> Optional[str]:
+    """Hour bucket key of an ISO timestamp"""
+    try:
+        return datetime.fromisoformat(timestamp).strftime(BUCKET_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+class AuditIndex:
+    """
+    Append-only postings lists of audit entry locations
+
+    Blocks are indexed in chain order, so every list is already sorted and a
+    query can seek into it with bisect instead of scanning.
+    """
+
+    def __init__(self):
+        self.entries: List[int] = []  # every audit_log entry
+        self.postings: Dict[str, Dict[str, List[int]]] = {field: {} for field in INDEXED_FIELDS}
+        self.buckets: Dict[str, List[int]] = {}
+        self._bucket_keys: List[str] = []  # sorted keys of buckets
+
+    def add(self, block_index: int, position: int, tx: Dict) -> Optional[List]:
+        """Index one transaction; only audit log entries are searchable. Returns what was indexed"""
+        if tx.get('type') != 'audit_log':
+            return None
+        record = [pack_location(block_index, position)]
+        for field in INDEXED_FIELDS:
+            value = tx.get(field)
+            record.append(None if value is None else str(value))
+        record.append(time_bucket(tx.get('timestamp')))
+        self.add_record(record)
+        return record
+
+    def add_record(self, record: List):
+        """Index [location, one value per indexed field, hour bucket], as returned by add"""
+        location, *values, bucket = record
+        self.entries.append(location)
+        for field, value in zip(INDEXED_FIELDS, values):
+            if value is not None:
+                self.postings[field].setdefault(value, []).append(location)
+        if bucket is not None:
+            if bucket not in self.buckets:
+                self.buckets[bucket] = []
+                if self._bucket_keys and bucket < self._bucket_keys[-1]:
+                    self._bucket_keys.insert(bisect_left(self._bucket_keys, bucket), bucket)
+                else:
+                    self._bucket_keys.append(bucket)
+            self.buckets[bucket].append(location)
+
+    def _location_range(self, since: Optional[datetime], until: Optional[datetime]) -> Tuple[int, int]:
+        """Smallest location span covering every bucket that overlaps [since, until]"""
+        lo_key = since.strftime(BUCKET_FORMAT) if since else None
+        hi_key = until.strftime(BUCKET_FORMAT) if until else None
+        start = bisect_left(self._bucket_keys, lo_key) if lo_key else 0
+        end = bisect_right(self._bucket_keys, hi_key) if hi_key else len(self._bucket_keys)
+        keys = self._bucket_keys[start:end]
+        if not keys:
+            return 0, -1
+        return (min(self.buckets[k][0] for k in keys),
+                max(self.buckets[k][-1] for k in keys))
+
+    def search(self, filters: Dict[str, str], since: Optional[datetime] = None,
+               until: Optional[datetime] = None, after: Optional[int] = None,
+               before: Optional[int] = None, descending: bool = False) -> Iterator[int]:
+        """
+        Locations matching every filter, strictly between the after and before cursors
+
+        Walks the shortest postings list, ascending or newest first, and checks
+        membership in the others by bisection; the caller applies the exact
+        since/until check per entry.
+        """
+        lists = []
+        for field, value in filters.items():
+            if value is None:
+                continue
+            postings = self.postings.get(field, {}).get(str(value))
+            if not postings:
+                return
+            lists.append(postings)
+        if not lists:
+            lists.append(self.entries)
+
+        lo, hi = 0, float('inf')
+        if since or until:
+            lo, hi = self._location_range(since, until)
+        if after is not None:
+            lo = max(lo, after + 1)
+        if before is not None:
+            hi = min(hi, before - 1)
+
+        spans = [(postings, bisect_left(postings, lo), bisect_right(postings, hi)) for postings in lists]
+        spans.sort(key=lambda span: span[2] - span[1])
+        driver, start, end = spans[0]
+        others = [postings for postings, _, _ in spans[1:]]
+        for i in (range(end - 1, start - 1, -1) if descending else range(start, end)):
+            location = driver[i]
+            if all(self._contains(postings, location) for postings in others):
+                yield location
+
+    @staticmethod
+    def _contains(postings: List[int], location: int) -> bool:
+        i = bisect_left(postings, location)
+        return i < len(postings) and postings[i] == location
+
+    def prune_before(self, location: int) -> int:
+        """Forget every entry located before location; returns how many were dropped"""
+        dropped = bisect_left(self.entries, location)
+        del self.entries[:dropped]
+        for values in self.postings.values():
+            for value in list(values):
+                postings = values[value]
+                del postings[:bisect_left(postings, location)]
+                if not postings:
+                    del values[value]
+        for key in list(self.buckets):
+            postings = self.buckets[key]
+            del postings[:bisect_left(postings, location)]
+            if not postings:
+                del self.buckets[key]
+        self._bucket_keys = sorted(self.buckets)
+        return dropped
+
+    def to_dict(self) -> Dict:
+        return {'entries': self.entries, 'postings': self.postings, 'buckets': self.buckets}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AuditIndex':
+        index = cls()
+        index.entries = data.get('entries', [])
+        index.postings.update(data.get('postings', {}))
+        index.buckets = data.get('buckets', {})
+        index._bucket_keys = sorted(index.buckets)
+        return index
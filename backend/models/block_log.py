@@ -0,0 +1,411 @@
+"""
+Append-only on-disk block log
+Segmented files of length-prefixed, checksummed records with an mmap-read height -> offset index
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+RECORD_HEADER = struct.Struct('>II')  # payload length, crc32
+INDEX_ENTRY = struct.Struct('<Q')     # byte offset of a record in its segment
+SEGMENT_PREFIX = 'segment-'
+CHECKPOINT_FILE = 'checkpoint.json'
+JOURNAL_FILE = 'index.journal'  # append-only deltas of derived indexes, committed by the checkpoint
+LOCK_FILE = 'LOCK'
+GENERATION_FILE = 'GENERATION'  # replaced whenever segments are rewritten
+COMPACTING_FILE = 'COMPACTING'  # names the segment being swapped in, for roll-forward after a crash
+COMPACT_SUFFIX = '.compact'
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+class Segment:
+    """One log file holding consecutive heights, plus its .idx sidecar"""
+
+    def __init__(self, directory: Path, first_height: int):
+        self.first_height = first_height
+        name = f"{SEGMENT_PREFIX}{first_height:012d}"
+        self.path = directory / f"{name}.log"
+        self.index_path = directory / f"{name}.idx"
+        self._log_map: Optional[mmap.mmap] = None
+        self._index_map: Optional[mmap.mmap] = None
+
+    @property
+    def count(self) -> int:
+        try:
+            return os.path.getsize(self.index_path) // INDEX_ENTRY.size
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _map(path: Path, current: Optional[mmap.mmap], needed: int) -> mmap.mmap:
+        # The active segment keeps growing, so remap once a read goes past the mapped end
+        if current is not None and len(current) >= needed:
+            return current
+        if current is not None:
+            current.close()
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def offset(self, position: int) -> int:
+        end = (position + 1) * INDEX_ENTRY.size
+        self._index_map = self._map(self.index_path, self._index_map, end)
+        return INDEX_ENTRY.unpack_from(self._index_map, end - INDEX_ENTRY.size)[0]
+
+    def read(self, position: int) -> bytes:
+        offset = self.offset(position)
+        self._log_map = self._map(self.path, self._log_map, offset + RECORD_HEADER.size)
+        length, crc = RECORD_HEADER.unpack_from(self._log_map, offset)
+        start = offset + RECORD_HEADER.size
+        self._log_map = self._map(self.path, self._log_map, start + length)
+        payload = self._log_map[start:start + length]
+        if zlib.crc32(payload) != crc:
+            raise ValueError(f"Checksum mismatch at height {self.first_height + position}")
+        return payload
+
+    def close(self):
+        for m in (self._log_map, self._index_map):
+            if m is not None:
+                m.close()
+        self._log_map = self._index_map = None
+
+
+class BlockLog:
+    """
+    Durable storage for serialized blocks, addressed by height
+
+    Writers hold an exclusive flock on the directory so several worker processes
+    can share one log; each picks up the others' records through refresh().
+    A read_only log never locks or repairs, and only sees fully indexed records.
+    Rewritten segments are swapped in whole, and readers remap when the
+    generation file changes.
+    """
+
+    def __init__(self, directory: Path, segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 fsync_interval_ms: int = 0, read_only: bool = False):
+        self.directory = Path(directory)
+        self.read_only = read_only
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval_ms / 1000.0
+        self.segments: List[Segment] = []
+        self._length = 0
+        self._log_file = None
+        self._index_file = None
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+        self._read_lock = threading.Lock()  # Remapping must not race a reader on the old map
+        self.generation = self._generation_stamp()
+        if read_only:
+            self._open_segments()
+            self.refresh()
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_fd = os.open(self.directory / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        with self.locked():
+            self._finish_compaction()
+            self._open_segments()
+            self._recover_tail()
+
+    def __len__(self) -> int:
+        return self._length
+
+    @contextmanager
+    def locked(self):
+        """Exclusive cross-process lock for appends"""
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _open_segments(self):
+        heights = sorted(
+            int(p.stem[len(SEGMENT_PREFIX):])
+            for p in self.directory.glob(f"{SEGMENT_PREFIX}*.log")
+        )
+        self.segments = [Segment(self.directory, h) for h in heights]
+
+    def _recover_tail(self):
+        """Repair the active segment after a crash; only the unindexed tail is scanned"""
+        if not self.segments:
+            self._length = 0
+            return
+        segment = self.segments[-1]
+        size = segment.size
+        count = segment.count
+
+        # Drop index entries whose records never fully reached the log
+        end = 0
+        while count:
+            try:
+                payload = segment.read(count - 1)
+                end = segment.offset(count - 1) + RECORD_HEADER.size + len(payload)
+                break
+            except (ValueError, struct.error):
+                count -= 1
+        segment.close()
+
+        # Index records that were written after the last index update, stop at a torn record
+        offsets = []
+        with open(segment.path, 'rb') as f:
+            f.seek(end)
+            while end + RECORD_HEADER.size <= size:
+                length, crc = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+                payload = f.read(length)
+                if len(payload) != length or zlib.crc32(payload) != crc:
+                    break
+                offsets.append(end)
+                end += RECORD_HEADER.size + length
+
+        if end != size:
+            os.truncate(segment.path, end)
+        with open(segment.index_path, 'r+b' if segment.index_path.exists() else 'wb') as f:
+            f.truncate(count * INDEX_ENTRY.size)
+            f.seek(0, os.SEEK_END)
+            f.write(b''.join(INDEX_ENTRY.pack(o) for o in offsets))
+            f.flush()
+            os.fsync(f.fileno())
+        self._length = segment.first_height + count + len(offsets)
+
+    def _generation_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.directory / GENERATION_FILE)
+            return stat.st_ino, stat.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self) -> int:
+        """Pick up records appended by other processes; returns the new length"""
+        generation = self._generation_stamp()
+        if generation != self.generation:
+            # Another process rewrote segments: drop maps and handles onto the replaced files
+            with self._read_lock:
+                for segment in self.segments:
+                    segment.close()
+            self._close_files()
+            self.generation = generation
+        if not self.segments:
+            self._open_segments()
+        while self.segments:
+            active = self.segments[-1]
+            self._length = active.first_height + active.count
+            successor = Segment(self.directory, self._length)
+            if not successor.path.exists():
+                break
+            self._close_files()
+            self.segments.append(successor)
+        return self._length
+
+    def _segment_for(self, height: int) -> Segment:
+        lo, hi = 0, len(self.segments) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.segments[mid].first_height <= height:
+                lo = mid
+            else:
+                hi = mid - 1
+        return self.segments[lo]
+
+    def read(self, height: int) -> bytes:
+        """Payload stored at a height"""
+        if not 0 <= height < self._length:
+            raise IndexError(height)
+        segment = self._segment_for(height)
+        with self._read_lock:
+            try:
+                return segment.read(height - segment.first_height)
+            except ValueError:
+                # A map may predate a rewrite of this segment; retry once on fresh maps
+                segment.close()
+                return segment.read(height - segment.first_height)
+
+    def iter_from(self, height: int = 0) -> Iterator[bytes]:
+        """Payloads from a height to the current end"""
+        for h in range(height, self._length):
+            yield self.read(h)
+
+    def _close_files(self):
+        for f in (self._log_file, self._index_file):
+            if f is not None:
+                f.close()
+        self._log_file = self._index_file = None
+
+    def _active_files(self):
+        if self._log_file is None:
+            if not self.segments or self.segments[-1].size >= self.segment_bytes:
+                if self.segments:
+                    self.segments[-1].close()
+                self.segments.append(Segment(self.directory, self._length))
+            segment = self.segments[-1]
+            self._log_file = open(segment.path, 'ab')
+            self._index_file = open(segment.index_path, 'ab')
+        return self._log_file, self._index_file
+
+    def append(self, payloads: List[bytes]) -> int:
+        """Append records under locked(); returns the height of the first one"""
+        if self.read_only:
+            raise IOError("Block log opened read-only")
+        first = self._length
+        for payload in payloads:
+            if self._log_file is not None and self._log_file.seek(0, os.SEEK_END) >= self.segment_bytes:
+                self.sync()
+                self._close_files()
+            log_file, index_file = self._active_files()
+            # Other processes append through their own handles, so ask for the real end
+            offset = log_file.seek(0, os.SEEK_END)
+            log_file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+            log_file.write(payload)
+            # The record must reach the file before the index entry that points to it
+            log_file.flush()
+            index_file.write(INDEX_ENTRY.pack(offset))
+            index_file.flush()
+            self._length += 1
+        self._unsynced = True
+        if time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+        return first
+
+    def sync(self):
+        """fsync the active segment and its index"""
+        if self._unsynced and self._log_file is not None:
+            os.fsync(self._log_file.fileno())
+            os.fsync(self._index_file.fileno())
+        self._unsynced = False
+        self._last_sync = time.monotonic()
+
+    def rewrite(self, payloads: Dict[int, bytes]):
+        """
+        Replace the records at some heights, under locked()
+
+        Each affected segment is copied with the new records to .compact files,
+        which are then renamed over the originals; a crash in between is rolled
+        forward on the next open.
+        """
+        if self.read_only:
+            raise IOError("Block log opened read-only")
+        self.sync()
+        self._close_files()
+        affected: Dict[int, Segment] = {}
+        for height in payloads:
+            segment = self._segment_for(height)
+            affected[segment.first_height] = segment
+
+        for segment in affected.values():
+            log_tmp = segment.path.with_name(segment.path.name + COMPACT_SUFFIX)
+            index_tmp = segment.index_path.with_name(segment.index_path.name + COMPACT_SUFFIX)
+            with open(log_tmp, 'wb') as log_file, open(index_tmp, 'wb') as index_file:
+                offset = 0
+                for position in range(segment.count):
+                    payload = payloads.get(segment.first_height + position)
+                    if payload is None:
+                        with self._read_lock:
+                            payload = segment.read(position)
+                    log_file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+                    log_file.write(payload)
+                    index_file.write(INDEX_ENTRY.pack(offset))
+                    offset += RECORD_HEADER.size + len(payload)
+                for f in (log_file, index_file):
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._write_durably(self.directory / COMPACTING_FILE, str(segment.first_height))
+            with self._read_lock:
+                segment.close()
+                self._finish_compaction()
+
+        self._write_durably(self.directory / GENERATION_FILE, str(time.time_ns()))
+        self.generation = self._generation_stamp()
+
+    def _finish_compaction(self):
+        marker = self.directory / COMPACTING_FILE
+        if marker.exists():
+            segment = Segment(self.directory, int(marker.read_text()))
+            for target in (segment.index_path, segment.path):
+                compacted = target.with_name(target.name + COMPACT_SUFFIX)
+                if compacted.exists():
+                    os.replace(compacted, target)
+            marker.unlink()
+        # Leftovers of a rewrite that never reached the swap
+        for stale in self.directory.glob(f"{SEGMENT_PREFIX}*{COMPACT_SUFFIX}"):
+            stale.unlink()
+
+    @staticmethod
+    def _write_durably(path: Path, content: str):
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def read_checkpoint(self) -> Optional[Dict]:
+        try:
+            with open(self.directory / CHECKPOINT_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_checkpoint(self, state: Dict):
+        """Atomically replace the checkpoint"""
+        path = self.directory / CHECKPOINT_FILE
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def read_journal(self, end: int) -> Optional[List[Dict]]:
+        """Journal records up to byte offset end, or None if the journal is shorter or unreadable"""
+        try:
+            with open(self.directory / JOURNAL_FILE, 'rb') as f:
+                data = f.read(end)
+        except OSError:
+            return None
+        if len(data) < end:
+            return None
+        try:
+            return [json.loads(line) for line in data.splitlines() if line]
+        except ValueError:
+            return None
+
+    def append_journal(self, record: Dict, at: Optional[int] = None) -> int:
+        """
+        Append one record after byte offset at, dropping anything past it; returns the new end
+
+        Bytes past the last committed offset belong to a writer that crashed
+        before its checkpoint, so they are cut off rather than trusted. With
+        at=None the journal is started over with this record.
+        """
+        path = self.directory / JOURNAL_FILE
+        line = json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'
+        if at is None:
+            self._write_durably(path, line.decode('utf-8'))
+            return len(line)
+        with open(path, 'r+b') as f:
+            f.truncate(at)
+            f.seek(at)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        return at + len(line)
+
+    def close(self):
+        self.sync()
+        self._close_files()
+        for segment in self.segments:
+            segment.close()
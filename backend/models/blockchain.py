@@ -3,62 +3,509 @@ Blockchain service for enhanced data security and privacy
 Provides immutable audit logging, data integrity verification, and privacy-preserving features
 """
 
-from datetime import datetime
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional
+import atexit
 import hashlib
 import json
+import threading
+import time
 from functools import lru_cache
 from pathlib import Path
 import os
+import uuid
+
+from models.audit_index import AuditIndex, pack_location, unpack_location
+from models.block_log import BlockLog
+from models.merkle import anchor_leaf, hash_header, hash_leaf, merkle_path, merkle_root
+from models.mining import DifficultyTuner, MiningEngine
+from models.parallel_verify import DEFAULT_PARALLEL_MIN_BLOCKS, verify_parallel
+from models.retention import ColdStorage, checkpoint_key, sign_checkpoint, verify_checkpoint
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+BLOCKCHAIN_CONFIG_FILE = CONFIG_DIR / "blockchain_config.json"
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+PRUNE_CHUNK_BLOCKS = 1000  # in-memory chains archive this many blocks per cold storage file
+EPOCH = datetime(1970, 1, 1)
+RECORD_BODY_MARKER = b',"transactions":'
+# Every block at a multiple of this height is a proof anchor: inclusion proofs carry headers only up
+# to the next anchor, and a Merkle path from that anchor to the root over all anchors
+PROOF_ANCHOR_INTERVAL = 64
+
+@lru_cache(maxsize=1)
+def load_blockchain_config() -> Dict:
+    """Load blockchain configuration"""
+    try:
+        if BLOCKCHAIN_CONFIG_FILE.exists():
+            with open(BLOCKCHAIN_CONFIG_FILE, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        try:
+            from utils.logger import logger
+            logger.warning("Could not load blockchain config", extra={"error": str(e)})
+        except:
+            pass
+    return {
+        "difficulty": 2,
+        "mining_enabled": True,
+        "performance": {"batch_size": 500, "batch_interval_ms": 250, "async_processing": True}
+    }
+
+def _pack_timestamp(value: str):
+    """Naive ISO timestamp as int64 microseconds, or the string itself if it would not round-trip"""
+    try:
+        delta = datetime.fromisoformat(value) - EPOCH
+    except (TypeError, ValueError):
+        return value
+    packed = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    return packed if (EPOCH + timedelta(microseconds=packed)).isoformat() == value else value
+
+
+def _digest(value: Optional[str]) -> Optional[bytes]:
+    return bytes.fromhex(value) if value is not None else None
+
+
+def _hex(value: Optional[bytes]) -> Optional[str]:
+    return value.hex() if value is not None else None
+
 
 class BlockchainNode:
-    """Represents a single block in the blockchain"""
+    """
+    Represents a single block in the blockchain
+
+    Blocks are kept compact: the timestamp is int64 microseconds, hashes are raw
+    32-byte digests and the transactions stay as their serialized JSON until read.
+    The public attributes still present ISO timestamps, hex hashes and dicts.
+    """
+    
+    __slots__ = ('index', 'tx_count', 'pruned', 'nonce', '_timestamp', '_previous_hash',
+                 '_merkle_root', '_hash', '_body')
     
-    def __init__(self, data: Dict, previous_hash: str = None):
+    def __init__(self, data: Optional[Dict] = None, previous_hash: str = None,
+                 transactions: Optional[List[Dict]] = None, index: int = 0):
+        self.index = index
         self.timestamp = datetime.now().isoformat()
-        self.data = data
+        self.transactions = transactions if transactions is not None else [data]
+        self.pruned = False  # body moved to cold storage, header kept
         self.previous_hash = previous_hash
+        self.merkle_root = self.calculate_merkle_root()
         self.nonce = 0  # Initialize nonce before calculating hash
         self.hash = self.calculate_hash()
     
-    def calculate_hash(self) -> str:
-        """Calculate SHA-256 hash of the block"""
-        block_string = json.dumps({
+    @property
+    def timestamp(self) -> str:
+        if isinstance(self._timestamp, str):
+            return self._timestamp
+        return (EPOCH + timedelta(microseconds=self._timestamp)).isoformat()
+    
+    @timestamp.setter
+    def timestamp(self, value: str):
+        self._timestamp = _pack_timestamp(value)
+    
+    @property
+    def timestamp_us(self) -> Optional[int]:
+        """Microseconds since 1970-01-01 in the node's local time, None for foreign formats"""
+        return None if isinstance(self._timestamp, str) else self._timestamp
+    
+    previous_hash = property(lambda self: _hex(self._previous_hash),
+                             lambda self, value: setattr(self, '_previous_hash', _digest(value)))
+    merkle_root = property(lambda self: _hex(self._merkle_root),
+                           lambda self, value: setattr(self, '_merkle_root', _digest(value)))
+    hash = property(lambda self: _hex(self._hash),
+                    lambda self, value: setattr(self, '_hash', _digest(value)))
+    
+    @property
+    def transactions(self) -> List[Dict]:
+        """Decoded on every access; hold on to the result when reading more than once"""
+        return json.loads(self._body)
+    
+    @transactions.setter
+    def transactions(self, transactions: List[Dict]):
+        self._body = json.dumps(transactions, separators=(',', ':')).encode()
+        self.tx_count = len(transactions)
+    
+    @property
+    def data(self) -> Dict:
+        """Single-entry view kept for callers that predate batched blocks"""
+        if self.pruned:
+            return {'type': 'pruned', 'count': self.tx_count}
+        if self.tx_count == 1:
+            return self.transactions[0]
+        return {'type': 'batch', 'count': self.tx_count}
+    
+    def calculate_merkle_root(self) -> str:
+        """Merkle root committing to every transaction in the block"""
+        return merkle_root([hash_leaf(tx) for tx in self.transactions])
+    
+    def header(self) -> Dict:
+        """Block header; the nonce is last so the serialized prefix is fixed while mining"""
+        return {
+            'index': self.index,
             'timestamp': self.timestamp,
-            'data': self.data,
             'previous_hash': self.previous_hash,
+            'merkle_root': self.merkle_root,
+            'tx_count': self.tx_count,
             'nonce': self.nonce
-        }, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        }
     
-    def mine_block(self, difficulty: int = 2):
+    def calculate_hash(self) -> str:
+        """Calculate SHA-256 hash of the block header"""
+        return hash_header(self.header())
+    
+    def mine_block(self, difficulty: int = 2, engine: Optional[MiningEngine] = None):
         """Proof of Work - mine the block"""
-        target = "0" * difficulty
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
+        self.nonce, self.hash = (engine or MiningEngine()).mine(self.header(), difficulty)
+    
+    def to_record(self) -> bytes:
+        """Serialized form stored in the block log; the body bytes are written as they are"""
+        header = json.dumps({
+            'index': self.index,
+            'timestamp': self.timestamp,
+            'previous_hash': self.previous_hash,
+            'merkle_root': self.merkle_root,
+            'nonce': self.nonce,
+            'hash': self.hash,
+            'tx_count': self.tx_count,
+            'pruned': self.pruned
+        }, separators=(',', ':')).encode()
+        return header[:-1] + RECORD_BODY_MARKER + self._body + b'}'
+    
+    @classmethod
+    def from_record(cls, payload: bytes) -> 'BlockchainNode':
+        """Rebuild a block from the log as stored, without recomputing its hashes or parsing its body"""
+        # to_record always writes the body last, so the header can be parsed on its own
+        split = payload.find(RECORD_BODY_MARKER)
+        if split < 0:
+            record = json.loads(payload)
+            body = json.dumps(record['transactions'], separators=(',', ':')).encode()
+        else:
+            record = json.loads(payload[:split] + b'}')
+            body = payload[split + len(RECORD_BODY_MARKER):-1]
+        node = cls.__new__(cls)
+        node.index = record['index']
+        node.timestamp = record['timestamp']
+        node._body = body
+        node.tx_count = record['tx_count'] if 'tx_count' in record else len(json.loads(body))
+        node.pruned = record.get('pruned', False)
+        node.previous_hash = record['previous_hash']
+        node.merkle_root = record['merkle_root']
+        node.nonce = record['nonce']
+        node.hash = record['hash']
+        return node
+    
+    def pruned_copy(self) -> 'BlockchainNode':
+        """The same block with its body dropped; the header and hash are unchanged"""
+        node = BlockchainNode.__new__(BlockchainNode)
+        for slot in BlockchainNode.__slots__:
+            setattr(node, slot, getattr(self, slot))
+        node._body = b'[]'
+        node.pruned = True
+        return node
     
     def to_dict(self) -> Dict:
         """Convert block to dictionary"""
+        transactions = self.transactions
         return {
+            'index': self.index,
             'timestamp': self.timestamp,
-            'data': self.data,
+            'data': self.data if self.pruned or len(transactions) != 1 else transactions[0],
+            'transactions': transactions,
+            'merkle_root': self.merkle_root,
             'previous_hash': self.previous_hash,
             'hash': self.hash,
             'nonce': self.nonce
         }
 
 
+class PersistentChain:
+    """List-like view over the blocks in a BlockLog, keeping recently used blocks decoded"""
+    
+    def __init__(self, log: BlockLog, cache_size: int = 1000):
+        self.log = log
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[int, BlockchainNode]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.log)
+    
+    def _remember(self, node: BlockchainNode):
+        with self._cache_lock:
+            self._cache[node.index] = node
+            self._cache.move_to_end(node.index)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        with self._cache_lock:
+            node = self._cache.get(index)
+            if node is not None:
+                self._cache.move_to_end(index)
+                return node
+        node = BlockchainNode.from_record(self.log.read(index))
+        self._remember(node)
+        return node
+    
+    def __iter__(self) -> Iterator[BlockchainNode]:
+        return self.iter_range(0, len(self))
+    
+    def iter_range(self, start: int, stop: int) -> Iterator[BlockchainNode]:
+        # Scans decode blocks without evicting the hot ones from the cache
+        for index in range(start, stop):
+            node = self._cache.get(index)
+            yield node if node is not None else BlockchainNode.from_record(self.log.read(index))
+    
+    def forget(self, start: int, stop: int):
+        """Drop cached blocks in [start, stop), e.g. after their records were rewritten"""
+        with self._cache_lock:
+            for index in [i for i in self._cache if start <= i < stop]:
+                del self._cache[index]
+    
+    def append(self, node: BlockchainNode):
+        self.extend([node])
+    
+    def extend(self, nodes: List[BlockchainNode]):
+        """Write blocks to the log, one fsync for the whole batch"""
+        self.log.append([node.to_record() for node in nodes])
+        for node in nodes:
+            self._remember(node)
+
+
 class Blockchain:
     """Blockchain implementation for audit logging and data integrity"""
     
-    def __init__(self, difficulty: int = 2):
-        self.chain: List[BlockchainNode] = [self.create_genesis_block()]
+    def __init__(self, difficulty: int = 2, batch_size: int = 500, log: Optional[BlockLog] = None,
+                 cache_size: int = 1000, checkpoint_interval: int = 1000,
+                 miner: Optional[MiningEngine] = None, checkpoint_key: Optional[bytes] = None,
+                 mining_enabled: bool = True, tuner: Optional[DifficultyTuner] = None):
+        self.log = log
+        self.miner = miner or MiningEngine()
+        self.mining_enabled = mining_enabled  # False hash-links blocks without proof of work
+        self.tuner = tuner  # retunes difficulty after every block to meet a latency budget
+        self.mining_stats = {'blocks': 0, 'hashes': 0, 'seconds': 0.0, 'last_block_ms': None}
+        self.checkpoint_key = checkpoint_key  # signs checkpoint blocks written when pruning
+        self.pruned_height = 0  # bodies of blocks 1..pruned_height are in cold storage
+        self.latest_checkpoint: Optional[Dict] = None
+        # entry_id -> (block index, position in block)
+        self.entry_locations: Dict[str, tuple] = {}
+        self.audit_index = AuditIndex()
         self.difficulty = difficulty
+        self.batch_size = batch_size  # Maximum transactions per block
+        self.transaction_count = 0
         self.pending_transactions: List[Dict] = []
-        self._cache_valid = False  # Cache for chain validity (start as False to force initial verify)
+        self.checkpoint_interval = checkpoint_interval
+        self._checkpoint_height = 0
+        self._applied_height = -1  # Last block folded into entry_locations and transaction_count
+        # Index additions since the journal was last known complete, for the next checkpoint's delta
+        self._journal_pending = {'entries': [], 'audit': []}
+        self._journal_trusted = False  # the on-disk journal matches our indexes up to its height
+        self._cache_valid = True  # Cleared on the first failed check and by a failed deep verification
         self._last_verify_time = None
-        self._cached_length = 0  # Track chain length for cache invalidation
+        # Highest block index whose hash, Merkle root and link have been checked, and its hash
+        self._verified_height = 0
+        self._verified_hash = None
+        self._invalid_height: Optional[int] = None
+        self._lock = threading.RLock()  # Serializes appends from request and writer threads
+        self._verify_lock = threading.Lock()  # Guards the verified height, separately so checks never wait on mining
+        self._anchor_leaves: List[bytes] = []  # anchor_leaf of blocks PROOF_ANCHOR_INTERVAL, 2x, ...
+        self._anchor_lock = threading.Lock()
+        
+        if log is None:
+            self.chain: List[BlockchainNode] = [self.create_genesis_block()]
+            self._apply_new_blocks()
+        else:
+            self.chain = PersistentChain(log, cache_size)
+            with log.locked():
+                log.refresh()
+                if not len(log):
+                    self.chain.append(self.create_genesis_block())
+                self._recover()
+        self._verified_hash = self.chain[self._verified_height].hash
+    
+    def _recover(self):
+        """Restore indexes from the latest checkpoint, then replay only the log tail"""
+        checkpoint = self.log.read_checkpoint()
+        if checkpoint and checkpoint.get('height', -1) < len(self.chain) \
+                and self.chain[checkpoint['height']].hash == checkpoint.get('hash'):
+            self._applied_height = self._checkpoint_height = checkpoint['height']
+            self.transaction_count = checkpoint['transaction_count']
+            if self._load_journal(checkpoint.get('journal')):
+                self._journal_trusted = True
+            elif 'audit_index' in checkpoint:
+                # Older checkpoints carried the indexes inline; the next checkpoint starts a journal
+                self.entry_locations = {k: tuple(v) for k, v in checkpoint['entry_locations'].items()}
+                self.audit_index = AuditIndex.from_dict(checkpoint['audit_index'])
+            else:
+                # No usable index state; rebuild it from the log once
+                self._applied_height = -1
+                self.transaction_count = 0
+            self._verified_height = min(checkpoint.get('verified_height', 0), checkpoint['height'])
+            self.pruned_height = checkpoint.get('pruned_height', 0)
+            self.latest_checkpoint = checkpoint.get('latest_checkpoint')
+        
+        replayed = self._apply_new_blocks()
+        # Replayed blocks are checked here so the incremental verifier starts at the tip
+        for index in range(self._verified_height + 1, len(self.chain)):
+            if not self.verify_block(index):
+                self._mark_invalid(index)
+                break
+            self._verified_height = index
+        try:
+            from utils.logger import logger
+            logger.info("Blockchain recovered from block log", extra={
+                "height": len(self.chain) - 1, "checkpoint_height": self._checkpoint_height,
+                "replayed_blocks": replayed
+            })
+        except:
+            pass
+    
+    def _load_journal(self, state: Optional[Dict]) -> bool:
+        """Rebuild the indexes from the index journal up to the committed offset"""
+        if not state:
+            return False
+        records = self.log.read_journal(state['offset'])
+        if not records or 'snapshot' not in records[0] or records[-1].get('height') != state['height']:
+            return False
+        self.entry_locations = {}
+        self.audit_index = AuditIndex()
+        for record in records:
+            if 'snapshot' in record:
+                self.entry_locations = {k: tuple(v) for k, v in record['entry_locations'].items()}
+                self.audit_index = AuditIndex.from_dict(record['snapshot'])
+                continue
+            for entry_id, block_index, position in record['entries']:
+                self.entry_locations[entry_id] = (block_index, position)
+            for item in record['audit']:
+                self.audit_index.add_record(item)
+        return True
+    
+    def _apply_new_blocks(self) -> int:
+        """Index blocks past the last applied height"""
+        start = self._applied_height + 1
+        pending = self._journal_pending if self._journal_trusted else None
+        for index in range(start, len(self.chain)):
+            block = self.chain[index]
+            for position, tx in enumerate(block.transactions):
+                if 'entry_id' in tx:
+                    self.entry_locations[tx['entry_id']] = (block.index, position)
+                    if pending is not None:
+                        pending['entries'].append([tx['entry_id'], block.index, position])
+                record = self.audit_index.add(block.index, position, tx)
+                if record is not None and pending is not None:
+                    pending['audit'].append(record)
+                if tx.get('type') == 'checkpoint':
+                    self._apply_checkpoint(block.index, tx)
+            self.transaction_count += block.tx_count
+            self._applied_height = block.index
+        return self._applied_height + 1 - start
+    
+    def _apply_checkpoint(self, block_index: int, checkpoint: Dict):
+        """Forget index entries for blocks a checkpoint pruned, here or in another process"""
+        self.latest_checkpoint = dict(checkpoint, block_index=block_index)
+        pruned_height = checkpoint.get('pruned_height', 0)
+        if pruned_height <= self.pruned_height:
+            return
+        self.pruned_height = pruned_height
+        self._journal_trusted = False  # the next checkpoint snapshots the pruned indexes
+        self.audit_index.prune_before(pack_location(pruned_height + 1, 0))
+        self.entry_locations = {
+            entry_id: location for entry_id, location in self.entry_locations.items()
+            if location[0] > pruned_height
+        }
+        if isinstance(self.chain, PersistentChain):
+            self.chain.forget(0, pruned_height + 1)
+    
+    def refresh(self):
+        """Pick up blocks that other processes appended to the shared log"""
+        if self.log is None:
+            return
+        with self._lock:
+            if self.log.refresh() - 1 > self._applied_height:
+                self._apply_new_blocks()
+                self._trim_journal_pending()
+    
+    def _trim_journal_pending(self):
+        """Drop buffered index additions another process's checkpoint has already journaled"""
+        pending = self._journal_pending
+        if len(pending['entries']) < self.checkpoint_interval:
+            return
+        state = (self.log.read_checkpoint() or {}).get('journal')
+        if state:
+            since = state['height']
+            pending['entries'] = [item for item in pending['entries'] if item[1] > since]
+            pending['audit'] = [item for item in pending['audit'] if unpack_location(item[0])[0] > since]
+    
+    def _write_journal(self, height: int, saved: Optional[Dict]) -> Optional[Dict]:
+        """
+        Extend the index journal to height; returns its committed state, or None if it is already past it
+
+        Normally only the blocks after the journal's height are appended, so a
+        checkpoint costs the new entries rather than the whole history. A full
+        snapshot starts the journal over when there is no journal we can trust
+        to match our indexes: first run, older checkpoint format, or pruning.
+        """
+        state = (saved or {}).get('journal')
+        if self._journal_trusted and state and state.get('pruned_height', 0) == self.pruned_height:
+            if state['height'] > height:
+                return None
+            since = state['height']
+            pending = self._journal_pending
+            offset = self.log.append_journal({
+                'height': height,
+                'entries': [item for item in pending['entries'] if item[1] > since],
+                'audit': [item for item in pending['audit'] if unpack_location(item[0])[0] > since],
+            }, at=state['offset'])
+        else:
+            offset = self.log.append_journal({
+                'height': height,
+                'snapshot': self.audit_index.to_dict(),
+                'entry_locations': self.entry_locations,
+            })
+            self._journal_trusted = True
+        self._journal_pending = {'entries': [], 'audit': []}
+        return {'height': height, 'offset': offset, 'pruned_height': self.pruned_height}
+    
+    def checkpoint(self):
+        """Persist derived state so a restart only replays blocks after this point"""
+        if self.log is None:
+            return
+        with self._lock:
+            height = self._applied_height
+            journal = self._write_journal(height, self.log.read_checkpoint())
+            if journal is None:
+                return  # another process already checkpointed further than we have applied
+            verified_height = min(self._verified_height, height)
+            self.log.write_checkpoint({
+                'height': height,
+                'hash': self.chain[height].hash,
+                'transaction_count': self.transaction_count,
+                'verified_height': verified_height if self._cache_valid else 0,
+                'journal': journal,
+                'pruned_height': self.pruned_height,
+                'latest_checkpoint': self.latest_checkpoint,
+                'written_at': datetime.now().isoformat()
+            })
+            self._checkpoint_height = height
+    
+    def close(self):
+        """Checkpoint and flush the block log, stop mining workers"""
+        self.miner.close()
+        if self.log is None:
+            return
+        with self._lock:
+            try:
+                with self.log.locked():
+                    self.refresh()
+                    self.checkpoint()
+            finally:
+                self.log.close()
     
     def create_genesis_block(self) -> BlockchainNode:
         """Create the first block in the chain"""
@@ -66,82 +513,174 @@ class Blockchain:
             'type': 'genesis',
             'message': 'Fever Oracle Blockchain Initialized',
             'version': '1.0.0'
-        }, "0")
+        }, "0" * 64)
     
     def get_latest_block(self) -> BlockchainNode:
         """Get the most recent block"""
         return self.chain[-1]
     
     def add_block(self, data: Dict) -> BlockchainNode:
-        """Add a new block to the chain"""
-        previous_hash = self.get_latest_block().hash
-        new_block = BlockchainNode(data, previous_hash)
-        new_block.mine_block(self.difficulty)
-        self.chain.append(new_block)
-        # Invalidate cache when chain changes
-        self._cache_valid = False
-        return new_block
+        """Add a new single-entry block to the chain"""
+        blocks = self.add_transactions([data])
+        if blocks:
+            return blocks[0]
+        return self.chain[self.entry_locations[data['entry_id']][0]]  # already committed
     
-    def add_audit_log(self, event_type: str, user_id: str, action: str, 
-                     resource: str, metadata: Optional[Dict] = None) -> BlockchainNode:
-        """Add an audit log entry to the blockchain"""
-        audit_data = {
+    def add_transactions(self, transactions: List[Dict]) -> List[BlockchainNode]:
+        """
+        Commit transactions in blocks of up to batch_size, one proof of work per block
+        
+        Idempotent on entry_id: entries already on the chain, e.g. a batch retried
+        locally after the chain writer timed out having taken it, are skipped.
+        """
+        blocks = []
+        with self._lock, (self.log.locked() if self.log else nullcontext()):
+            # Build on blocks other processes may have appended since we last looked
+            self.refresh()
+            entries, seen = [], set()
+            for tx in transactions:
+                if 'entry_id' not in tx:
+                    tx = dict(tx, entry_id=uuid.uuid4().hex)
+                elif tx['entry_id'] in self.entry_locations or tx['entry_id'] in seen:
+                    continue
+                seen.add(tx['entry_id'])
+                entries.append(tx)
+            if not entries:
+                return blocks
+            previous = self.get_latest_block()
+            step = max(1, self.batch_size)
+            for start in range(0, len(entries), step):
+                new_block = BlockchainNode(
+                    previous_hash=previous.hash,
+                    transactions=entries[start:start + step],
+                    index=previous.index + 1
+                )
+                if self.mining_enabled:
+                    self._mine(new_block)
+                blocks.append(new_block)
+                previous = new_block
+            self.chain.extend(blocks)
+            self._apply_new_blocks()
+            if self.log and self._applied_height - self._checkpoint_height >= self.checkpoint_interval:
+                self.checkpoint()
+        return blocks
+    
+    def _mine(self, block: BlockchainNode):
+        """Proof of work for one block, timed for the hash rate and the difficulty tuner"""
+        hashes = self.miner.hashes
+        started = time.perf_counter()
+        block.mine_block(self.difficulty, self.miner)
+        elapsed = time.perf_counter() - started
+        hashes = self.miner.hashes - hashes
+        self.mining_stats['blocks'] += 1
+        self.mining_stats['hashes'] += hashes
+        self.mining_stats['seconds'] += elapsed
+        self.mining_stats['last_block_ms'] = round(elapsed * 1000, 3)
+        if self.tuner:
+            self.tuner.record(hashes, elapsed)
+            self.difficulty = self.tuner.next_difficulty(self.difficulty)
+    
+    def get_mining_stats(self) -> Dict:
+        """Difficulty mode and the hash rate achieved by this process"""
+        stats = self.mining_stats
+        return {
+            'enabled': self.mining_enabled,
+            'difficulty': self.difficulty,
+            'adaptive': self.tuner is not None,
+            'target_block_ms': self.tuner.target_ms if self.tuner else None,
+            'blocks_mined': stats['blocks'],
+            'last_block_ms': stats['last_block_ms'],
+            'avg_block_ms': round(stats['seconds'] * 1000 / stats['blocks'], 3) if stats['blocks'] else None,
+            'hash_rate': round(stats['hashes'] / stats['seconds'], 1) if stats['seconds'] else None,
+            'recent_hash_rate': round(self.tuner.hash_rate, 1) if self.tuner and self.tuner.hash_rate else None,
+        }
+    
+    @staticmethod
+    def build_audit_entry(event_type: str, user_id: str, action: str, resource: str,
+                          metadata: Optional[Dict] = None,
+                          timestamp: Optional[str] = None) -> Dict:
+        """Audit log transaction as stored in a block"""
+        return {
             'type': 'audit_log',
+            'entry_id': uuid.uuid4().hex,
             'event_type': event_type,
             'user_id': user_id,
             'action': action,
             'resource': resource,
             'metadata': metadata or {},
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp or datetime.now().isoformat()
         }
+    
+    def add_audit_log(self, event_type: str, user_id: str, action: str, 
+                     resource: str, metadata: Optional[Dict] = None,
+                     timestamp: Optional[str] = None) -> BlockchainNode:
+        """Add an audit log entry to the blockchain"""
+        audit_data = self.build_audit_entry(event_type, user_id, action, resource,
+                                            metadata, timestamp)
         return self.add_block(audit_data)
     
-    def add_data_hash(self, data_id: str, data_hash: str, data_type: str) -> BlockchainNode:
-        """Store data integrity hash on blockchain"""
-        integrity_data = {
+    @staticmethod
+    def build_data_hash_entry(data_id: str, data_hash: str, data_type: str) -> Dict:
+        """Data integrity transaction as stored in a block"""
+        return {
             'type': 'data_integrity',
+            'entry_id': uuid.uuid4().hex,
             'data_id': data_id,
             'data_hash': data_hash,
             'data_type': data_type,
             'timestamp': datetime.now().isoformat()
         }
-        return self.add_block(integrity_data)
+    
+    def add_data_hash(self, data_id: str, data_hash: str, data_type: str) -> BlockchainNode:
+        """Store data integrity hash on blockchain"""
+        return self.add_block(self.build_data_hash_entry(data_id, data_hash, data_type))
+    
+    @staticmethod
+    def _check_block(block: BlockchainNode, previous_hash: Optional[str]) -> bool:
+        # A pruned block's body is in cold storage; its header still hashes and links
+        if not block.pruned and block.merkle_root != block.calculate_merkle_root():
+            return False
+        if block.hash != block.calculate_hash():
+            return False
+        return previous_hash is None or block.previous_hash == previous_hash
+    
+    def verify_block(self, index: int) -> bool:
+        """Check one block's Merkle root, hash and link to its predecessor"""
+        previous_hash = self.chain[index - 1].hash if index else None
+        return self._check_block(self.chain[index], previous_hash)
+    
+    def _mark_invalid(self, index: int):
+        self._cache_valid = False
+        if self._invalid_height is None or index < self._invalid_height:
+            self._invalid_height = index
     
     def verify_chain(self, use_cache: bool = True) -> bool:
-        """Verify the integrity of the blockchain with caching for performance"""
-        # Store current chain length for cache invalidation
-        current_length = len(self.chain)
+        """
+        Verify the integrity of the blockchain
         
-        # Use cache if chain hasn't changed and cache is valid
-        if use_cache and self._cache_valid and self._last_verify_time:
-            # Check if chain length changed (simple cache invalidation)
-            if hasattr(self, '_cached_length') and self._cached_length == current_length:
-                return True
+        With use_cache only blocks appended since the last call are checked, so the
+        cost is proportional to new blocks; the full re-hash is left to deep_verify.
+        """
+        if not use_cache:
+            return self.deep_verify()
+        if not self._cache_valid:
+            return False
+        self.refresh()
         
         try:
-            # Verify genesis block
-            if len(self.chain) == 0:
-                return False
-            
-            # Verify all blocks
-            for i in range(1, len(self.chain)):
-                current_block = self.chain[i]
-                previous_block = self.chain[i - 1]
-                
-                # Verify current block hash
-                if current_block.hash != current_block.calculate_hash():
-                    self._cache_valid = False
-                    return False
-                
-                # Verify previous hash link
-                if current_block.previous_hash != previous_block.hash:
-                    self._cache_valid = False
+            with self._verify_lock:
+                height = len(self.chain) - 1
+                # The verified tip must still be the block we checked
+                if self.chain[self._verified_height].hash != self._verified_hash:
+                    self._mark_invalid(self._verified_height)
                     return False
-            
-            # Cache is valid
-            self._cache_valid = True
-            self._last_verify_time = datetime.now()
-            self._cached_length = current_length
+                for i in range(self._verified_height + 1, height + 1):
+                    if not self.verify_block(i):
+                        self._mark_invalid(i)
+                        return False
+                self._verified_height = height
+                self._verified_hash = self.chain[height].hash
+                self._last_verify_time = datetime.now()
             return True
         except Exception as e:
             try:
@@ -152,19 +691,301 @@ class Blockchain:
             self._cache_valid = False
             return False
     
+    def deep_verify(self, progress: Optional[Callable[[int, int], None]] = None) -> bool:
+        """Re-hash every block from genesis, reporting (checked, total) to progress"""
+        return self.deep_verify_report(progress)['valid']
+    
+    def deep_verify_report(self, progress: Optional[Callable[[int, int], None]] = None,
+                           workers: int = 0, parallel_min_blocks: int = DEFAULT_PARALLEL_MIN_BLOCKS) -> Dict:
+        """
+        Full verification with the first failing height and throughput; workers > 1 uses
+        a process pool once at least parallel_min_blocks need checking
+        """
+        # Blocks are append-only, so a snapshot of the length is a consistent range
+        total = len(self.chain)
+        start = self._trusted_start()
+        started = time.monotonic()
+        try:
+            if workers > 1 and total - start >= parallel_min_blocks:
+                report = verify_parallel(
+                    total, workers,
+                    directory=self.log.directory if self.log else None,
+                    read_payload=lambda height: self.chain[height].to_record(),
+                    progress=progress,
+                    start=start
+                )
+            else:
+                report = self._verify_sequential(start, total, progress)
+                elapsed = time.monotonic() - started
+                report.update(
+                    start_height=start,
+                    workers=1,
+                    seconds=round(elapsed, 3),
+                    blocks_per_second=round((total - start) / elapsed, 1) if elapsed else None
+                )
+        except Exception as e:
+            try:
+                from utils.logger import logger
+                logger.error("Error during deep chain verification", extra={"error": str(e)}, exc_info=True)
+            except:
+                pass
+            self._cache_valid = False
+            return {'valid': False, 'first_invalid_height': None, 'blocks': total, 'error': str(e)}
+        
+        if not report['valid']:
+            self._mark_invalid(report['first_invalid_height'])
+            return report
+        with self._verify_lock:
+            # A clean full pass clears an earlier failure and vouches for everything it covered
+            self._cache_valid = True
+            self._invalid_height = None
+            if total - 1 > self._verified_height:
+                self._verified_height = total - 1
+                self._verified_hash = self.chain[total - 1].hash
+            self._last_verify_time = datetime.now()
+        return report
+    
+    def _trusted_start(self) -> int:
+        """Height verification can start from: the pruned prefix if a signed checkpoint vouches for it"""
+        checkpoint = self.latest_checkpoint
+        if not checkpoint:
+            return 0
+        signed = {k: v for k, v in checkpoint.items() if k != 'block_index'}
+        height = checkpoint.get('pruned_height', 0)
+        if not verify_checkpoint(signed, self.checkpoint_key) or height >= len(self.chain):
+            return 0
+        return height if self.chain[height].hash == checkpoint.get('pruned_hash') else 0
+    
+    def _iter_blocks(self, start: int, stop: int) -> Iterator[BlockchainNode]:
+        if isinstance(self.chain, PersistentChain):
+            return self.chain.iter_range(start, stop)
+        return islice(self.chain, start, stop)
+    
+    def _verify_sequential(self, start: int, total: int,
+                           progress: Optional[Callable[[int, int], None]]) -> Dict:
+        previous_hash = None
+        for i, block in enumerate(self._iter_blocks(start, total), start):
+            if not self._check_block(block, previous_hash):
+                return {'valid': False, 'first_invalid_height': i, 'blocks': total}
+            previous_hash = block.hash
+            if progress and (i % 1000 == 0 or i == total - 1):
+                progress(i + 1, total)
+        return {'valid': True, 'first_invalid_height': None, 'blocks': total}
+    
     def get_audit_trail(self, user_id: Optional[str] = None, 
-                       resource: Optional[str] = None) -> List[Dict]:
-        """Get audit trail from blockchain"""
+                       resource: Optional[str] = None, event_type: Optional[str] = None,
+                       since: Optional[datetime] = None, until: Optional[datetime] = None,
+                       limit: Optional[int] = None, cursor: Optional[int] = None,
+                       newest_first: bool = True) -> List[Dict]:
+        """Get audit trail from blockchain, newest first by default, continuing past cursor"""
+        self.refresh()
         audit_logs = []
-        for block in self.chain:
-            if block.data.get('type') == 'audit_log':
-                if user_id and block.data.get('user_id') != user_id:
+        filters = {'user_id': user_id, 'resource': resource, 'event_type': event_type}
+        bodies = {}  # block bodies decode lazily, so decode each one once per query
+        page = {'before': cursor} if newest_first else {'after': cursor}
+        for location in self.audit_index.search(filters, since, until, descending=newest_first, **page):
+            block_index, position = unpack_location(location)
+            block = self.chain[block_index]
+            if block.pruned:
+                continue
+            if block_index not in bodies:
+                bodies[block_index] = block.transactions
+            tx = bodies[block_index][position]
+            if since or until:
+                try:
+                    timestamp = datetime.fromisoformat(tx['timestamp'])
+                except (KeyError, TypeError, ValueError):
                     continue
-                if resource and block.data.get('resource') != resource:
+                if (since and timestamp < since) or (until and timestamp > until):
                     continue
-                audit_logs.append(block.to_dict())
+            audit_logs.append({
+                'entry_id': tx.get('entry_id'),
+                'cursor': location,
+                'block_index': block.index,
+                'timestamp': block.timestamp,
+                'data': tx,
+                'merkle_root': block.merkle_root,
+                'previous_hash': block.previous_hash,
+                'hash': block.hash,
+                'nonce': block.nonce
+            })
+            if limit and len(audit_logs) >= limit:
+                break
         return audit_logs
     
+    def _anchors(self, count: int) -> List[bytes]:
+        """Leaves of the first count anchors, read from block headers as the chain reaches them"""
+        with self._anchor_lock:
+            while len(self._anchor_leaves) < count:
+                height = (len(self._anchor_leaves) + 1) * PROOF_ANCHOR_INTERVAL
+                self._anchor_leaves.append(anchor_leaf(self.chain[height].hash))
+            return self._anchor_leaves[:count]
+    
+    def get_anchors_root(self) -> Dict:
+        """Root over every anchor so far; clients pin it to check proofs without headers to the tip"""
+        count = self.get_latest_block().index // PROOF_ANCHOR_INTERVAL
+        return {
+            'interval': PROOF_ANCHOR_INTERVAL,
+            'count': count,
+            'root': merkle_root(self._anchors(count)) if count else None
+        }
+    
+    def get_inclusion_proof(self, entry_id: str, checkpoint: Optional[int] = None,
+                            anchor_count: Optional[int] = None) -> Optional[Dict]:
+        """
+        Merkle path for one entry plus the header chain from its block to a checkpoint
+        
+        The checkpoint defaults to the next anchor block, so a proof holds at most
+        PROOF_ANCHOR_INTERVAL headers however long the chain is, plus an O(log n)
+        path from that anchor to the anchors root. anchor_count builds the path
+        against an earlier, smaller anchors root that a client already pinned.
+        An entry newer than the last anchor is proved against the tip instead.
+        """
+        self.refresh()
+        location = self.entry_locations.get(entry_id)
+        if location is None:
+            return None
+        block_index, position = location
+        if self.chain[block_index].pruned:
+            return None
+        tip = self.get_latest_block().index
+        if checkpoint is None:
+            anchor = max(1, -(-block_index // PROOF_ANCHOR_INTERVAL)) * PROOF_ANCHOR_INTERVAL
+            checkpoint = min(anchor, tip)
+        else:
+            checkpoint = max(block_index, min(checkpoint, tip))
+            if checkpoint - block_index > PROOF_ANCHOR_INTERVAL:
+                raise ValueError(f"checkpoint must be within {PROOF_ANCHOR_INTERVAL} blocks of the entry's block "
+                                 f"{block_index}; omit it to use the next anchor")
+        
+        transactions = self.chain[block_index].transactions
+        leaves = [hash_leaf(tx) for tx in transactions]
+        proof = {
+            'entry_id': entry_id,
+            'entry': transactions[position],
+            'block_index': block_index,
+            'leaf_index': position,
+            'merkle_path': merkle_path(leaves, position),
+            'headers': [self.chain[i].header() for i in range(block_index, checkpoint + 1)],
+            'checkpoint': {
+                'index': checkpoint,
+                'hash': self.chain[checkpoint].hash
+            }
+        }
+        if checkpoint and checkpoint % PROOF_ANCHOR_INTERVAL == 0:
+            position = checkpoint // PROOF_ANCHOR_INTERVAL - 1
+            available = tip // PROOF_ANCHOR_INTERVAL
+            count = available if anchor_count is None else max(position + 1, min(anchor_count, available))
+            anchors = self._anchors(count)
+            proof['anchor'] = {
+                'interval': PROOF_ANCHOR_INTERVAL,
+                'position': position,
+                'count': count,
+                'path': merkle_path(anchors, position),
+                'root': merkle_root(anchors)
+            }
+        return proof
+    
+    def _last_height_before(self, cutoff: datetime, lo: int, hi: int) -> int:
+        """Highest height in [lo, hi] mined before cutoff (block timestamps only grow), or lo - 1"""
+        found = lo - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if datetime.fromisoformat(self.chain[mid].timestamp) < cutoff:
+                found, lo = mid, mid + 1
+            else:
+                hi = mid - 1
+        return found
+    
+    def _prune_ranges(self, start: int, stop: int) -> Iterator[tuple]:
+        # One archive and one rewrite per log segment, so each segment is rewritten once
+        if self.log is None:
+            for lo in range(start, stop + 1, PRUNE_CHUNK_BLOCKS):
+                yield lo, min(stop, lo + PRUNE_CHUNK_BLOCKS - 1)
+            return
+        for segment in list(self.log.segments):
+            lo = max(start, segment.first_height)
+            hi = min(stop, segment.first_height + segment.count - 1)
+            if lo <= hi:
+                yield lo, hi
+    
+    def prune(self, retention_days: int, cold_storage: Optional[ColdStorage] = None,
+              now: Optional[datetime] = None) -> Dict:
+        """
+        Move bodies of blocks older than the retention window to cold storage
+        
+        Only verified blocks are pruned. Their headers stay in the chain so links and
+        hashes still verify, and a signed checkpoint block records the pruned range and
+        archive digests so later full verifications can start from it. Bodies are
+        dropped outright when no cold storage is configured.
+        """
+        if not self.checkpoint_key:
+            # An unsigned checkpoint is never trusted, so pruning would save storage but no verification
+            raise ValueError("Pruning requires a checkpoint key (BLOCKCHAIN_CHECKPOINT_KEY or the key file)")
+        cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+        archives = []
+        with self._lock:
+            with (self.log.locked() if self.log else nullcontext()):
+                self.refresh()
+                start = self.pruned_height + 1
+                target = self._last_height_before(cutoff, start, min(self._verified_height, len(self.chain) - 1))
+                if target < start:
+                    return {'pruned_blocks': 0, 'pruned_height': self.pruned_height}
+                
+                for lo, hi in self._prune_ranges(start, target):
+                    pruned = []
+                    
+                    def bodies():
+                        for block in self._iter_blocks(lo, hi + 1):
+                            if block.pruned:
+                                continue
+                            pruned.append(block.pruned_copy())
+                            yield block.index, block.transactions
+                    
+                    if cold_storage:
+                        manifest = cold_storage.write(lo, hi, bodies())
+                        if manifest:
+                            archives.append(manifest)
+                    else:
+                        for _ in bodies():
+                            pass
+                    
+                    if self.log:
+                        self.log.rewrite({block.index: block.to_record() for block in pruned})
+                        self.chain.forget(lo, hi + 1)
+                    else:
+                        for block in pruned:
+                            self.chain[block.index] = block
+            
+            checkpoint = sign_checkpoint({
+                'type': 'checkpoint',
+                'entry_id': uuid.uuid4().hex,
+                'timestamp': datetime.now().isoformat(),
+                'pruned_from': start,
+                'pruned_height': target,
+                'pruned_hash': self.chain[target].hash,
+                'retention_days': retention_days,
+                'archives': archives
+            }, self.checkpoint_key)
+            # Appending applies the checkpoint, which drops the pruned entries from the indexes
+            block = self.add_transactions([checkpoint])[0]
+        
+        try:
+            from utils.logger import logger
+            logger.info("Pruned audit chain", extra={
+                "pruned_from": start, "pruned_height": target, "checkpoint_block": block.index,
+                "archives": len(archives), "signed": checkpoint['signature'] is not None
+            })
+        except:
+            pass
+        return {
+            'pruned_blocks': target - start + 1,
+            'pruned_height': target,
+            'checkpoint_block': block.index,
+            'archives': archives,
+            'signed': checkpoint['signature'] is not None
+        }
+    
     def get_chain_info(self) -> Dict:
         """Get blockchain information with optimized verification"""
         # Use cached verification for better performance
@@ -174,8 +995,16 @@ class Blockchain:
             'is_valid': is_valid,
             'latest_hash': self.get_latest_block().hash,
             'difficulty': self.difficulty,
+            'batch_size': self.batch_size,
+            'transaction_count': self.transaction_count,
             'genesis_hash': self.chain[0].hash if self.chain else None,
-            'last_verified': self._last_verify_time.isoformat() if self._last_verify_time else None
+            'verified_height': self._verified_height,
+            'invalid_height': self._invalid_height,
+            'pruned_height': self.pruned_height,
+            'checkpoint_block': self.latest_checkpoint.get('block_index') if self.latest_checkpoint else None,
+            'mining': self.get_mining_stats(),
+            'last_verified': self._last_verify_time.isoformat() if self._last_verify_time else None,
+            'proof_anchors': self.get_anchors_root()
         }
 
 
@@ -199,18 +1028,100 @@ class PrivacyBlockchain:
         """Verify a zero-knowledge proof"""
         return proof.get('proof_hash') == expected_hash
     
-    def add_encrypted_audit(self, encrypted_data: str, user_id: str) -> BlockchainNode:
-        """Add encrypted audit log to blockchain"""
-        audit_data = {
+    @staticmethod
+    def build_encrypted_audit_entry(encrypted_data: str, user_id: str) -> Dict:
+        """Encrypted audit transaction as stored in a block"""
+        return {
             'type': 'encrypted_audit',
+            'entry_id': uuid.uuid4().hex,
             'encrypted_data': encrypted_data,
             'user_id': user_id,
             'timestamp': datetime.now().isoformat()
         }
-        return self.blockchain.add_block(audit_data)
+    
+    def add_encrypted_audit(self, encrypted_data: str, user_id: str) -> BlockchainNode:
+        """Add encrypted audit log to blockchain"""
+        return self.blockchain.add_block(self.build_encrypted_audit_entry(encrypted_data, user_id))
+
+
+def create_cold_storage() -> Optional[ColdStorage]:
+    """Archive for pruned block bodies, or None to drop them"""
+    directory = load_blockchain_config().get('storage', {}).get('cold_directory')
+    return ColdStorage(DATA_DIR / directory) if directory else None
+
+
+def create_blockchain() -> Blockchain:
+    """Blockchain backed by the on-disk block log when storage is enabled"""
+    config = load_blockchain_config()
+    performance = config.get('performance', {})
+    storage = config.get('storage', {})
+    log = None
+    if storage.get('enabled', False):
+        try:
+            log = BlockLog(
+                DATA_DIR / storage.get('directory', 'blockchain'),
+                segment_bytes=storage.get('segment_size_mb', 64) * 1024 * 1024,
+                fsync_interval_ms=storage.get('fsync_interval_ms', 0)
+            )
+        except OSError as e:
+            try:
+                from utils.logger import logger
+                logger.warning("Block log unavailable, keeping the chain in memory", extra={"error": str(e)})
+            except:
+                pass
+    key = checkpoint_key(DATA_DIR / storage.get('checkpoint_key_file', 'blockchain_checkpoint.key'))
+    if key is None and config.get('audit_retention_days'):
+        try:
+            from utils.logger import logger
+            logger.error("No checkpoint key: set BLOCKCHAIN_CHECKPOINT_KEY or make the key file writable; "
+                         "audit retention will not prune until one is available")
+        except:
+            pass
+    adaptive = config.get('adaptive_difficulty', {})
+    tuner = None
+    if adaptive.get('enabled', False):
+        tuner = DifficultyTuner(
+            target_ms=adaptive.get('target_block_ms', 200),
+            min_difficulty=adaptive.get('min_difficulty', 0),
+            max_difficulty=adaptive.get('max_difficulty', 6)
+        )
+    return Blockchain(
+        difficulty=config.get('difficulty', 2),
+        batch_size=performance.get('batch_size', 500),
+        log=log,
+        cache_size=performance.get('cache_size', 1000),
+        checkpoint_interval=storage.get('checkpoint_interval_blocks', 1000),
+        miner=MiningEngine(
+            workers=performance.get('mining_workers', 0),
+            parallel_min_difficulty=performance.get('parallel_mining_min_difficulty', 5)
+        ),
+        checkpoint_key=key,
+        mining_enabled=config.get('mining_enabled', True),
+        tuner=tuner
+    )
+
+
+# Global blockchain instance, opened on first use so importing the classes never touches data/blockchain
+_globals: Dict[str, object] = {}
+_globals_lock = threading.Lock()
+
+
+def get_blockchain() -> Blockchain:
+    """The process-wide chain, created and recovered from the block log on first call"""
+    if 'blockchain' not in _globals:
+        with _globals_lock:
+            if 'blockchain' not in _globals:
+                chain = create_blockchain()
+                atexit.register(chain.close)
+                _globals['privacy_blockchain'] = PrivacyBlockchain(chain)
+                _globals['blockchain'] = chain
+    return _globals['blockchain']
 
 
-# Global blockchain instance
-blockchain = Blockchain(difficulty=2)
-privacy_blockchain = PrivacyBlockchain(blockchain)
+def __getattr__(name: str):
+    # `from models.blockchain import blockchain` keeps working and opens the chain at that point
+    if name in ('blockchain', 'privacy_blockchain'):
+        get_blockchain()
+        return _globals[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
@@ -0,0 +1,116 @@
+"""
+Merkle tree and inclusion proof helpers for blockchain transactions
+Leaves and interior nodes are domain-separated (RFC 6962 style) so a leaf can never pass as a node
+"""
+
+from typing import Dict, List, Optional
+import hashlib
+import json
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+# Serialized header field order; the nonce is last so the prefix is fixed while mining
+HEADER_FIELDS = ('index', 'timestamp', 'previous_hash', 'merkle_root', 'tx_count', 'nonce')
+
+
+def canonical_bytes(data: Dict) -> bytes:
+    """Deterministic serialization used for transaction hashing"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':')).encode()
+
+
+def hash_leaf(data: Dict) -> bytes:
+    """Leaf digest for a single transaction"""
+    return hashlib.sha256(LEAF_PREFIX + canonical_bytes(data)).digest()
+
+
+def anchor_leaf(block_hash: str) -> bytes:
+    """Leaf digest of an anchor block's hash in the tree over all anchors"""
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(block_hash)).digest()
+
+
+def hash_node(left: bytes, right: bytes) -> bytes:
+    """Interior node digest"""
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def merkle_root(leaves: List[bytes]) -> str:
+    """Hex Merkle root over leaf digests; an odd node is paired with itself"""
+    if not leaves:
+        return hashlib.sha256(b'').hexdigest()
+    level = leaves
+    while len(level) > 1:
+        if len(level) % 2:
+            level = level + [level[-1]]
+        level = [hash_node(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def merkle_path(leaves: List[bytes], index: int) -> List[Dict]:
+    """Sibling hashes from a leaf up to the root"""
+    path = []
+    level = leaves
+    while len(level) > 1:
+        if len(level) % 2:
+            level = level + [level[-1]]
+        sibling = index ^ 1
+        path.append({
+            'hash': level[sibling].hex(),
+            'position': 'left' if sibling < index else 'right'
+        })
+        level = [hash_node(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+        index //= 2
+    return path
+
+
+def root_from_path(leaf: bytes, path: List[Dict]) -> str:
+    """Fold a Merkle path over a leaf digest, O(log n) hashes"""
+    current = leaf
+    for step in path:
+        sibling = bytes.fromhex(step['hash'])
+        if step['position'] == 'left':
+            current = hash_node(sibling, current)
+        else:
+            current = hash_node(current, sibling)
+    return current.hex()
+
+
+def hash_header(header: Dict) -> str:
+    """SHA-256 of a serialized block header in HEADER_FIELDS order"""
+    # Re-ordered explicitly so headers that went through a key-sorting JSON encoder still verify
+    ordered = {field: header[field] for field in HEADER_FIELDS}
+    return hashlib.sha256(json.dumps(ordered, separators=(',', ':')).encode()).hexdigest()
+
+
+def verify_inclusion_proof(proof: Dict, trusted_hash: Optional[str] = None,
+                           trusted_anchors_root: Optional[str] = None) -> bool:
+    """
+    Check that an entry is committed to by the chain, without the rest of the chain
+
+    Recomputes the entry's leaf, folds the Merkle path into the block's root,
+    then re-hashes each header up to the checkpoint and checks the links.
+    Pass trusted_hash (e.g. a tip hash obtained independently) to pin the
+    checkpoint instead of trusting the one inside the proof, or
+    trusted_anchors_root (the anchors root from /api/blockchain/info) to check
+    that the checkpoint is an anchor block in O(log n) hashes.
+    """
+    try:
+        headers = proof['headers']
+        if not headers:
+            return False
+        leaf = hash_leaf(proof['entry'])
+        if root_from_path(leaf, proof['merkle_path']) != headers[0]['merkle_root']:
+            return False
+
+        previous_hash = None
+        for header in headers:
+            if previous_hash is not None and header['previous_hash'] != previous_hash:
+                return False
+            previous_hash = hash_header(header)
+
+        if trusted_anchors_root is not None:
+            anchor = proof['anchor']
+            return root_from_path(anchor_leaf(previous_hash), anchor['path']) == trusted_anchors_root
+        checkpoint_hash = trusted_hash or proof['checkpoint']['hash']
+        return previous_hash == checkpoint_hash
+    except (KeyError, TypeError, ValueError):
+        return False
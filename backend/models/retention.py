@@ -0,0 +1,112 @@
+"""
+Retention support for the audit chain
+Signed checkpoint transactions and gzip cold storage for the bodies of pruned blocks
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import secrets
+
+from models.merkle import canonical_bytes
+
+CHECKPOINT_KEY_ENV = 'BLOCKCHAIN_CHECKPOINT_KEY'
+
+
+def checkpoint_key(path: Optional[Path] = None) -> Optional[bytes]:
+    """
+    HMAC key for checkpoint signatures: BLOCKCHAIN_CHECKPOINT_KEY, else the key file at path
+
+    A missing key file is created with a random key, readable by its owner only,
+    so checkpoints are signed by default and stay verifiable across restarts.
+    None only if neither is available, e.g. on a read-only data directory.
+    """
+    key = os.getenv(CHECKPOINT_KEY_ENV)
+    if key:
+        return key.encode()
+    if path is None:
+        return None
+    path = Path(path)
+    try:
+        return path.read_bytes().strip() or None
+    except FileNotFoundError:
+        pass
+    except OSError:
+        return None
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secrets.token_hex(32).encode())
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp, path)  # creates the key only if no other process got there first
+        except FileExistsError:
+            pass
+        return path.read_bytes().strip() or None
+    except OSError:
+        return None
+    finally:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def sign_checkpoint(checkpoint: Dict, key: Optional[bytes]) -> Dict:
+    """Checkpoint transaction with an HMAC-SHA256 signature over its other fields"""
+    unsigned = {k: v for k, v in checkpoint.items() if k != 'signature'}
+    signature = hmac.new(key, canonical_bytes(unsigned), hashlib.sha256).hexdigest() if key else None
+    return dict(unsigned, signature=signature)
+
+
+def verify_checkpoint(checkpoint: Dict, key: Optional[bytes]) -> bool:
+    """True if the checkpoint was signed with key"""
+    signature = checkpoint.get('signature')
+    if not key or not signature:
+        return False
+    expected = sign_checkpoint(checkpoint, key)['signature']
+    return hmac.compare_digest(signature, expected)
+
+
+class ColdStorage:
+    """Append-only gzip JSON Lines archives of pruned block bodies"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def write(self, first_height: int, last_height: int,
+              bodies: Iterable[Tuple[int, List[Dict]]]) -> Optional[Dict]:
+        """Stream (height, transactions) pairs into one archive; returns its manifest, or None if empty"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"bodies-{first_height:012d}-{last_height:012d}.jsonl.gz"
+        tmp = path.with_suffix('.tmp')
+        blocks = entries = 0
+        with gzip.open(tmp, 'wb') as f:
+            for height, transactions in bodies:
+                f.write(json.dumps({'height': height, 'transactions': transactions},
+                                   separators=(',', ':')).encode() + b'\n')
+                blocks += 1
+                entries += len(transactions)
+        if not blocks:
+            tmp.unlink()
+            return None
+        digest = hashlib.sha256()
+        with open(tmp, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return {'file': path.name, 'sha256': digest.hexdigest(), 'blocks': blocks, 'entries': entries}
+
+    def read(self, name: str) -> Iterator[Dict]:
+        """Archived bodies, one {'height', 'transactions'} record per block"""
+        with gzip.open(self.directory / name, 'rb') as f:
+            for line in f:
+                yield json.loads(line)
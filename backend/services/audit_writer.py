@@ -0,0 +1,230 @@
+"""
+Asynchronous audit writer
+Queues audit events from request handlers and mines them into the blockchain in the background,
+or forwards them to the chain writer process when one owns the chain
+"""
+
+from typing import Dict, List, Optional, Tuple
+import atexit
+import queue
+import threading
+import time
+
+from models.blockchain import Blockchain, PrivacyBlockchain, blockchain, load_blockchain_config
+from services.chain_writer import ChainWriterClient
+from utils.logger import logger
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_INTERVAL_MS = 250
+
+
+class AuditWriter:
+    """
+    Bounded in-memory queue drained by a single background mining thread
+
+    Events are grouped into one block per batch_size events or batch_interval_ms,
+    whichever comes first, so one proof of work covers many audit entries.
+    """
+
+    def __init__(self, chain: Blockchain, max_queue_size: int = DEFAULT_QUEUE_SIZE,
+                 enabled: bool = True, batch_interval_ms: int = DEFAULT_BATCH_INTERVAL_MS,
+                 remote: Optional[ChainWriterClient] = None):
+        self.chain = chain
+        self.remote = remote  # batches go to the chain writer first, the local chain if it is down
+        self.enabled = enabled
+        self.max_queue_size = max_queue_size
+        self.batch_interval = batch_interval_ms / 1000.0
+        self.queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._pending_ids = set()  # entry ids queued and not yet written, so a retried submit is not queued twice
+        self._pending_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'forwarded': 0,
+            'blocks': 0,
+            'dropped': 0,
+            'failed': 0,
+            'high_watermark': 0,
+            'last_write_ms': 0.0,
+            'total_write_ms': 0.0,
+            'last_queue_delay_ms': 0.0,
+        }
+
+    def _ensure_started(self):
+        # Started lazily so each forked gunicorn worker gets its own live thread
+        if self._thread and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, event_type: str, user_id: str, action: str, resource: str,
+               metadata: Optional[Dict] = None) -> Optional[str]:
+        """Enqueue an audit event without waiting for it to be mined; returns its entry id"""
+        event = self.chain.build_audit_entry(event_type, user_id, action, resource, metadata)
+        return event['entry_id'] if self.enqueue(event) else None
+
+    def submit_encrypted(self, encrypted_data: str, user_id: str) -> Optional[str]:
+        """Queue an encrypted audit entry, as PrivacyBlockchain.add_encrypted_audit would mine it inline"""
+        event = PrivacyBlockchain.build_encrypted_audit_entry(encrypted_data, user_id)
+        return event['entry_id'] if self.enqueue(event) else None
+
+    def enqueue(self, event: Dict) -> bool:
+        """Queue an already built audit entry; False if it was shed. Idempotent on entry_id"""
+        if not self.enabled:
+            self._write([(time.monotonic(), event)])
+            return True
+
+        self._ensure_started()
+        entry_id = event.get('entry_id')
+        with self._pending_lock:
+            if entry_id in self._pending_ids:
+                return True  # a retry of an event still waiting in the queue
+            try:
+                self.queue.put_nowait((time.monotonic(), event))
+                if entry_id is not None:
+                    self._pending_ids.add(entry_id)
+                full = False
+            except queue.Full:
+                full = True
+        if full:
+            # Backpressure: shed the event rather than stall the request
+            with self._metrics_lock:
+                self.metrics['dropped'] += 1
+            logger.warning("Audit queue full, dropping event", extra={
+                "event_type": event.get('event_type'), "queue_size": self.max_queue_size
+            })
+            return False
+        depth = self.queue.qsize()
+        with self._metrics_lock:
+            self.metrics['enqueued'] += 1
+            if depth > self.metrics['high_watermark']:
+                self.metrics['high_watermark'] = depth
+        return True
+
+    def _write(self, batch: List[Tuple[float, Dict]]):
+        started = time.monotonic()
+        events = [event for _, event in batch]
+        counts = {'forwarded': 0, 'written': 0, 'failed': 0}
+        blocks = []
+        try:
+            local = events
+            if self.remote is not None:
+                rejected = self.remote.send(events)
+                if rejected is not None:
+                    local = rejected
+                counts['forwarded'] = len(events) - len(local)
+            if local:
+                # Only what the writer did not take. After a timeout that may include events it
+                # did take; add_transactions skips entry ids already on the chain, whoever mines first
+                blocks = self.chain.add_transactions(local)
+                counts['written'] = len(local)
+        except Exception as e:
+            counts['failed'] = len(events) - counts['forwarded']
+            logger.warning("Could not write audit events to blockchain", extra={
+                "error": str(e), "events": len(batch)
+            })
+        finally:
+            with self._pending_lock:
+                self._pending_ids.difference_update(event.get('entry_id') for event in events)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._metrics_lock:
+            for outcome, count in counts.items():
+                self.metrics[outcome] += count
+            self.metrics['blocks'] += len(blocks)
+            self.metrics['last_queue_delay_ms'] = round((started - batch[0][0]) * 1000, 3)
+            self.metrics['last_write_ms'] = round(elapsed_ms, 3)
+            self.metrics['total_write_ms'] += elapsed_ms
+
+    def _next_batch(self) -> List[Tuple[float, Dict]]:
+        """Wait for one event, then gather more until the block is full or the interval ends"""
+        batch = [self.queue.get(timeout=0.5)]
+        deadline = time.monotonic() + self.batch_interval
+        while len(batch) < self.chain.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0 or self._stopping.is_set():
+                    batch.append(self.queue.get_nowait())
+                else:
+                    batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued event has been mined; returns False on timeout"""
+        if self.queue.unfinished_tasks and not (self._thread and self._thread.is_alive()):
+            self._ensure_started()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Flush pending events and stop the writer thread"""
+        flushed = self.flush(timeout)
+        if not flushed:
+            logger.warning("Audit queue not fully flushed on shutdown", extra={
+                "pending": self.queue.qsize()
+            })
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def get_metrics(self) -> Dict:
+        """Queue depth, throughput and backpressure counters"""
+        written = self.metrics['written']
+        blocks = self.metrics['blocks']
+        return {
+            'async': self.enabled,
+            'queue_depth': self.queue.qsize(),
+            'queue_capacity': self.max_queue_size,
+            'enqueued': self.metrics['enqueued'],
+            'written': written,
+            'forwarded': self.metrics['forwarded'],
+            'chain_writer': self.remote.path if self.remote else None,
+            'blocks': blocks,
+            'avg_entries_per_block': round(written / blocks, 2) if blocks else 0.0,
+            'dropped': self.metrics['dropped'],
+            'failed': self.metrics['failed'],
+            'high_watermark': self.metrics['high_watermark'],
+            'last_write_ms': self.metrics['last_write_ms'],
+            'avg_block_write_ms': round(self.metrics['total_write_ms'] / blocks, 3) if blocks else 0.0,
+            'last_queue_delay_ms': self.metrics['last_queue_delay_ms'],
+        }
+
+
+_performance = load_blockchain_config().get('performance', {})
+audit_writer = AuditWriter(
+    blockchain,
+    max_queue_size=_performance.get('queue_size', DEFAULT_QUEUE_SIZE),
+    enabled=_performance.get('async_processing', True),
+    batch_interval_ms=_performance.get('batch_interval_ms', DEFAULT_BATCH_INTERVAL_MS),
+    remote=ChainWriterClient.from_env()
+)
+atexit.register(audit_writer.stop)
@@ -0,0 +1,201 @@
+"""
+Scheduled deep verification of the blockchain
+Re-hashes the whole chain in the background so request paths only check newly appended blocks,
+then prunes block bodies that fell out of the audit retention window
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+import threading
+import time
+
+from models.blockchain import Blockchain, blockchain, create_cold_storage, load_blockchain_config
+from models.parallel_verify import DEFAULT_PARALLEL_MIN_BLOCKS
+from models.retention import ColdStorage
+from services.chain_writer import ChainWriterClient
+from utils.logger import logger
+
+DEFAULT_VERIFY_INTERVAL_SECONDS = 3600
+REMOTE_STATUS_TTL_SECONDS = 2.0  # how stale the chain writer's status may be on /info and /verify
+
+
+class ChainVerifier:
+    """Background thread that periodically runs a full chain verification and tracks its progress"""
+
+    def __init__(self, chain: Blockchain, interval_seconds: int = DEFAULT_VERIFY_INTERVAL_SECONDS,
+                 enabled: bool = True, workers: int = 0, retention_days: Optional[int] = None,
+                 cold_storage: Optional[ColdStorage] = None, remote: Optional[ChainWriterClient] = None,
+                 parallel_min_blocks: int = DEFAULT_PARALLEL_MIN_BLOCKS):
+        self.chain = chain
+        self.interval = interval_seconds
+        self.remote = remote  # the chain writer process verifies and prunes for every worker
+        self.enabled = enabled and remote is None
+        self.workers = workers  # > 1 re-hashes ranges of the chain in a process pool
+        self.parallel_min_blocks = parallel_min_blocks  # shorter chains are verified in this process
+        self.retention_days = retention_days
+        self.cold_storage = cold_storage
+        self._thread: Optional[threading.Thread] = None
+        self._oneshot: Optional[threading.Thread] = None  # a triggered run while scheduling is off
+        self._thread_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._status_lock = threading.Lock()
+        # The chain writer's status as last fetched, shared by every request thread in this worker
+        self._remote_status: Optional[Dict] = None
+        self._remote_status_at = 0.0
+        self._remote_refresh = threading.Lock()
+        self.status = {
+            'state': 'idle',
+            'checked': 0,
+            'total': 0,
+            'runs': 0,
+            'started_at': None,
+            'finished_at': None,
+            'duration_ms': None,
+            'last_result': None,
+            'invalid_height': None,
+            'blocks_per_second': None,
+            'last_prune': None,
+        }
+
+    def _ensure_started(self):
+        # Started lazily so each forked gunicorn worker gets its own live thread
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='chain-verifier', daemon=True)
+            self._thread.start()
+
+    def _progress(self, checked: int, total: int):
+        with self._status_lock:
+            self.status['checked'] = checked
+            self.status['total'] = total
+
+    def run_once(self) -> bool:
+        """Verify every block from genesis and record the outcome"""
+        with self._status_lock:
+            self.status.update(state='running', checked=0, total=len(self.chain.chain),
+                               started_at=datetime.now().isoformat())
+        started = time.monotonic()
+        report = self.chain.deep_verify_report(progress=self._progress, workers=self.workers,
+                                               parallel_min_blocks=self.parallel_min_blocks)
+        valid = report['valid']
+        with self._status_lock:
+            self.status.update(
+                state='idle',
+                runs=self.status['runs'] + 1,
+                finished_at=datetime.now().isoformat(),
+                duration_ms=round((time.monotonic() - started) * 1000, 3),
+                last_result='valid' if valid else 'invalid',
+                invalid_height=report.get('first_invalid_height'),
+                blocks_per_second=report.get('blocks_per_second'),
+            )
+        if not valid:
+            logger.error("Deep chain verification failed", extra={
+                "invalid_height": report.get('first_invalid_height'), "error": report.get('error')
+            })
+        return valid
+
+    def prune(self) -> Optional[Dict]:
+        """Archive block bodies older than the retention window"""
+        if not self.retention_days:
+            return None
+        try:
+            report = self.chain.prune(self.retention_days, self.cold_storage)
+        except ValueError as e:
+            logger.error("Audit retention cannot prune", extra={"error": str(e)})
+            report = {'error': str(e), 'pruned_blocks': 0}
+        report['at'] = datetime.now().isoformat()
+        with self._status_lock:
+            self.status['last_prune'] = report
+        return report
+
+    def _run(self):
+        while True:
+            try:
+                # Only a chain that just verified clean is pruned
+                if self.run_once():
+                    self.prune()
+            except Exception as e:
+                logger.warning("Deep chain verification errored", extra={"error": str(e)})
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _run_triggered(self):
+        try:
+            self.run_once()
+        except Exception as e:
+            logger.warning("Deep chain verification errored", extra={"error": str(e)})
+
+    def trigger(self):
+        """Start a deep verification in the background now; returns at once, see get_status()"""
+        if self.remote is not None:
+            reply = self.remote.call({'op': 'verify'})
+            if reply is not None:
+                self._cache_remote_status(reply.get('deep_verification'))
+                return
+        if self.enabled:
+            self._ensure_started()
+            self._wake.set()
+            return
+        with self._thread_lock:
+            if self._oneshot and self._oneshot.is_alive():
+                return  # one run at a time; the current one already covers this request
+            self._oneshot = threading.Thread(target=self._run_triggered, name='chain-verifier-once', daemon=True)
+            self._oneshot.start()
+
+    def _cache_remote_status(self, status: Optional[Dict]):
+        if status is not None:
+            self._remote_status, self._remote_status_at = status, time.monotonic()
+
+    def _get_remote_status(self) -> Optional[Dict]:
+        """
+        The chain writer's status, fetched at most once per TTL
+
+        Only one thread makes the round trip; the others keep serving the
+        cached copy meanwhile instead of queueing on the client's socket lock.
+        """
+        if self._remote_status is not None and time.monotonic() - self._remote_status_at < REMOTE_STATUS_TTL_SECONDS:
+            return self._remote_status
+        if not self._remote_refresh.acquire(blocking=False):
+            return self._remote_status
+        try:
+            reply = self.remote.call({'op': 'stats'})
+            if reply and 'deep_verification' in reply:
+                self._cache_remote_status(reply['deep_verification'])
+            elif reply is None:
+                self._remote_status = None  # writer unreachable: fall back to this worker's view
+            return self._remote_status
+        finally:
+            self._remote_refresh.release()
+
+    def get_status(self) -> Dict:
+        """Progress of the current run, or the outcome of the last one"""
+        if self.remote is not None:
+            status = self._get_remote_status()
+            if status is not None:
+                return status
+        self._ensure_started()
+        with self._status_lock:
+            status = dict(self.status)
+        status['scheduled'] = self.enabled
+        status['workers'] = self.workers
+        status['interval_seconds'] = self.interval
+        if status['total']:
+            status['progress'] = round(status['checked'] / status['total'], 4)
+        return status
+
+
+_config = load_blockchain_config()
+_performance = _config.get('performance', {})
+chain_verifier = ChainVerifier(
+    blockchain,
+    interval_seconds=_performance.get('verify_interval_seconds', DEFAULT_VERIFY_INTERVAL_SECONDS),
+    enabled=_config.get('auto_verify', True),
+    workers=_performance.get('verify_workers', 0),
+    parallel_min_blocks=_performance.get('parallel_verify_min_blocks', DEFAULT_PARALLEL_MIN_BLOCKS),
+    retention_days=_config.get('audit_retention_days'),
+    cold_storage=create_cold_storage(),
+    remote=ChainWriterClient.from_env()
+)
@@ -0,0 +1,143 @@
+"""
+Single-writer chain service
+One process owns the blockchain and mines every audit event; gunicorn workers forward
+events to it over a unix socket and read the chain from the shared block log
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import os
+import socket
+import socketserver
+import threading
+
+CHAIN_WRITER_SOCKET_ENV = 'CHAIN_WRITER_SOCKET'
+CONNECT_TIMEOUT = 5.0
+
+
+class ChainWriterClient:
+    """Forwards batches of audit entries to the chain writer, one JSON line per request"""
+
+    def __init__(self, path: str, timeout: float = CONNECT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional['ChainWriterClient']:
+        path = os.getenv(CHAIN_WRITER_SOCKET_ENV)
+        return cls(path) if path else None
+
+    def _request(self, message: Dict) -> Dict:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._sock, self._reader = sock, sock.makefile('rb')
+        self._sock.sendall(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Chain writer closed the connection")
+        return json.loads(line)
+
+    def call(self, message: Dict) -> Optional[Dict]:
+        """Send one request; None if the writer is unreachable"""
+        with self._lock:
+            try:
+                return self._request(message)
+            except (OSError, ValueError):
+                self.close()
+                return None
+
+    def send(self, events: List[Dict]) -> Optional[List[Dict]]:
+        """Hand events to the writer's queue; returns those it did not take, or None if it was unreachable"""
+        reply = self.call({'op': 'submit', 'events': events})
+        if not reply or 'accepted_ids' not in reply:
+            return None
+        accepted = set(reply['accepted_ids'])
+        return [event for event in events if event['entry_id'] not in accepted]
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        writer = self.server.audit_writer
+        verifier = self.server.chain_verifier
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+                op = message.get('op')
+                if op == 'submit':
+                    accepted = [event['entry_id'] for event in message.get('events', []) if writer.enqueue(event)]
+                    reply = {'accepted': len(accepted), 'accepted_ids': accepted}
+                elif op == 'flush':
+                    reply = {'flushed': writer.flush(message.get('timeout'))}
+                elif op == 'verify':
+                    verifier.trigger()
+                    reply = {'deep_verification': verifier.get_status()}
+                elif op == 'stats':
+                    reply = {'audit_queue': writer.get_metrics(),
+                             'deep_verification': verifier.get_status(),
+                             'chain_length': len(writer.chain.chain)}
+                else:
+                    reply = {'error': f"unknown op {op!r}"}
+            except (ValueError, AttributeError) as e:
+                reply = {'error': str(e)}
+            self.wfile.write(json.dumps(reply, separators=(',', ':')).encode() + b'\n')
+
+
+class ChainWriterServer(socketserver.ThreadingUnixStreamServer):
+    """Unix socket front end to the writer process's audit queue and chain verifier"""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, audit_writer, chain_verifier):
+        if os.path.exists(path):
+            os.unlink(path)  # left behind by a previous run
+        self.audit_writer = audit_writer
+        self.chain_verifier = chain_verifier
+        super().__init__(path, _Handler)
+
+
+def main(path: str):
+    # The writer mines locally, so it must not forward to itself
+    os.environ.pop(CHAIN_WRITER_SOCKET_ENV, None)
+    import signal
+    from models.blockchain import blockchain
+    from services.audit_writer import audit_writer
+    from services.chain_verifier import chain_verifier
+    from utils.logger import logger
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    server = ChainWriterServer(path, audit_writer, chain_verifier)
+
+    def shutdown(sig, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    chain_verifier.get_status()  # starts scheduled verification and pruning here only
+    logger.info("Chain writer listening", extra={"socket": path, "chain_length": len(blockchain.chain)})
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(path)
+        audit_writer.stop()
+        blockchain.close()
+
+
+if __name__ == '__main__':
+    # Started by gunicorn.conf.py: python -m services.chain_writer <socket path>
+    import sys
+    main(sys.argv[1] if len(sys.argv) > 1 else os.getenv(CHAIN_WRITER_SOCKET_ENV))
@@ -0,0 +1,153 @@
+"""
+Kafka consumer group lag
+Periodically compares committed offsets with log end offsets for every monitored partition
+and estimates how long each group needs to catch up
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+try:
+    from kafka import KafkaAdminClient, KafkaConsumer, TopicPartition
+    KAFKA_AVAILABLE = True
+except ImportError:
+    KAFKA_AVAILABLE = False
+
+DEFAULT_LAG_INTERVAL_SECONDS = 15
+
+
+class ConsumerLagMonitor:
+    """
+    Background sampler of per-partition lag for a set of consumer groups
+
+    Time to drain is the current lag over the net drain rate, the committed-offset
+    rate minus the produce rate over the last interval; it is None while the
+    group is not gaining on the producers.
+
+    A consumer that reads without a group never commits, so the broker knows
+    nothing of its progress. For those, positions maps a report name to a
+    callable returning the next offset per (topic, partition), read in place of
+    committed offsets.
+    """
+
+    def __init__(self, bootstrap_servers: str, groups: List[str], topics: List[str],
+                 interval_seconds: int = DEFAULT_LAG_INTERVAL_SECONDS,
+                 positions: Optional[Dict[str, Callable[[], Dict[Tuple[str, int], int]]]] = None):
+        self.bootstrap_servers = bootstrap_servers
+        self.positions = positions or {}
+        self.groups = groups + [name for name in self.positions if name not in groups]
+        self.topics = topics
+        self.interval = interval_seconds
+        self.report: Dict = {'groups': {}, 'total_lag': 0, 'sampled_at': None, 'error': None}
+        self._previous: Optional[Dict] = None  # last sample, for rates
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _partitions(self, consumer) -> List:
+        return [TopicPartition(topic, partition)
+                for topic in self.topics
+                for partition in sorted(consumer.partitions_for_topic(topic) or ())]
+
+    def sample(self, admin, consumer) -> Dict:
+        """One lag measurement across every group and partition"""
+        partitions = self._partitions(consumer)
+        now = time.monotonic()
+        end = consumer.end_offsets(partitions) if partitions else {}
+        beginning = consumer.beginning_offsets(partitions) if partitions else {}
+        committed = {}
+        for group in self.groups:
+            if group in self.positions:
+                current = self.positions[group]()
+                committed[group] = {tp: current[(tp.topic, tp.partition)] for tp in partitions
+                                    if (tp.topic, tp.partition) in current}
+                continue
+            offsets = admin.list_consumer_group_offsets(group, partitions=partitions)
+            committed[group] = {tp: meta.offset for tp, meta in offsets.items() if meta.offset >= 0}
+        sample = {'at': now, 'end': end, 'committed': committed}
+
+        previous = self._previous
+        elapsed = now - previous['at'] if previous else 0
+        produced = sum(end.values()) - sum(previous['end'].get(tp, end[tp]) for tp in end) if previous else 0
+        produce_rate = produced / elapsed if elapsed else None
+
+        groups = {}
+        for group in self.groups:
+            rows = []
+            for tp in partitions:
+                offset = committed[group].get(tp)
+                # Without a commit the group would start from the earliest retained message
+                lag = end[tp] - (offset if offset is not None else beginning[tp])
+                rows.append({'topic': tp.topic, 'partition': tp.partition, 'end_offset': end[tp],
+                             'committed': offset, 'lag': max(0, lag)})
+            total = sum(row['lag'] for row in rows)
+            consume_rate = drain_seconds = None
+            if previous and elapsed:
+                before = previous['committed'].get(group, {})
+                consumed = sum(offset - before[tp] for tp, offset in committed[group].items() if tp in before)
+                consume_rate = consumed / elapsed
+                net_rate = consume_rate - (produce_rate or 0)
+                if total == 0:
+                    drain_seconds = 0.0
+                elif net_rate > 0:
+                    drain_seconds = round(total / net_rate, 1)
+            groups[group] = {
+                'total_lag': total,
+                'consume_rate': round(consume_rate, 2) if consume_rate is not None else None,
+                'time_to_drain_seconds': drain_seconds,
+                'active': bool(committed[group]),
+                'partitions': rows,
+            }
+
+        self._previous = sample
+        return {
+            'groups': groups,
+            # Groups with no commits yet (or any more) would count the whole retained backlog
+            'total_lag': sum(g['total_lag'] for g in groups.values() if g['active']),
+            'produce_rate': round(produce_rate, 2) if produce_rate is not None else None,
+            'sampled_at': datetime.now().isoformat(),
+            'error': None,
+        }
+
+    def _run(self):
+        from utils.logger import logger
+        while True:
+            admin = consumer = None
+            try:
+                admin = KafkaAdminClient(bootstrap_servers=self.bootstrap_servers)
+                consumer = KafkaConsumer(bootstrap_servers=self.bootstrap_servers, group_id=None,
+                                         enable_auto_commit=False)
+                while True:
+                    report = self.sample(admin, consumer)
+                    with self._lock:
+                        self.report = report
+                    time.sleep(self.interval)
+            except Exception as e:
+                with self._lock:
+                    self.report = dict(self.report, error=str(e))
+                self._previous = None  # rates across a reconnect would be meaningless
+                logger.warning("Consumer lag sampling failed", extra={"error": str(e)})
+            finally:
+                for client in (consumer, admin):
+                    if client:
+                        try:
+                            client.close()
+                        except:
+                            pass
+            time.sleep(self.interval)
+
+    def start(self):
+        if not KAFKA_AVAILABLE or (self._thread and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name='kafka-lag', daemon=True)
+        self._thread.start()
+
+    def load_report(self, report: Dict):
+        """Adopt a report sampled by another process"""
+        with self._lock:
+            self.report = report
+
+    def get_report(self) -> Dict:
+        with self._lock:
+            return self.report
@@ -0,0 +1,198 @@
+"""
+Multi-resolution downsampling for surveillance time series
+Maintains hourly, daily and weekly aggregate tiers that are updated incrementally
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import os
+import threading
+
+
+def _hour_start(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _day_start(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _week_start(ts: datetime) -> datetime:
+    return _day_start(ts) - timedelta(days=ts.weekday())
+
+
+# Ordered from finest to coarsest
+TIERS = [
+    ('hourly', _hour_start),
+    ('daily', _day_start),
+    ('weekly', _week_start),
+]
+TIER_WIDTHS = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+
+class TierBucket:
+    """Running min/max/mean/count for one bucket"""
+
+    __slots__ = ('count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class DownsampledSeries:
+    """Tiered aggregates for a CSV-backed data source, kept current by tailing the file"""
+
+    def __init__(self, path: Path, value_field: str, time_field: str = 'date',
+                 region_field: str = 'region'):
+        self.path = Path(path)
+        self.value_field = value_field
+        self.time_field = time_field
+        self.region_field = region_field
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # tier -> region -> bucket start -> TierBucket
+        self._tiers: Dict[str, Dict[str, Dict[datetime, TierBucket]]] = {
+            name: defaultdict(dict) for name, _ in TIERS
+        }
+        self._headers: Optional[List[str]] = None
+        self._offset = 0
+        self._inode = None
+        self.samples = 0
+
+    def ingest(self, timestamp: datetime, region: str, value: float):
+        """Fold a single sample into every tier"""
+        for name, bucket_start in TIERS:
+            buckets = self._tiers[name][region]
+            key = bucket_start(timestamp)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = TierBucket()
+            bucket.add(value)
+        self.samples += 1
+
+    def _ingest_line(self, line: str):
+        values = line.strip().split(',')
+        if len(values) != len(self._headers):
+            return
+        row = dict(zip(self._headers, values))
+        try:
+            timestamp = datetime.fromisoformat(row[self.time_field])
+            value = float(row[self.value_field])
+        except (KeyError, ValueError):
+            return
+        self.ingest(timestamp, row.get(self.region_field) or 'Unknown', value)
+
+    def refresh(self) -> bool:
+        """Fold rows appended since the last refresh; rebuild only if the file was replaced"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset()
+                return False
+
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                self._reset()
+                self._inode = stat.st_ino
+
+            if stat.st_size == self._offset:
+                return True
+
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                chunk = f.read(stat.st_size - self._offset)
+
+            # Leave a trailing partial line for the next refresh
+            end = chunk.rfind(b'\n')
+            if end < 0:
+                return True
+            self._offset += end + 1
+
+            for raw in chunk[:end].decode('utf-8').splitlines():
+                if not raw.strip():
+                    continue
+                if self._headers is None:
+                    self._headers = raw.strip().split(',')
+                    continue
+                self._ingest_line(raw)
+            return True
+
+    def _select_buckets(self, tier: str, region: Optional[str], since: Optional[datetime],
+                        until: Optional[datetime]) -> List[tuple]:
+        regions = self._tiers[tier]
+        names = [region] if region else list(regions.keys())
+        width = TIER_WIDTHS[tier]
+        selected = []
+        for name in names:
+            for start, bucket in regions.get(name, {}).items():
+                if since and start + width <= since:
+                    continue  # ends before the window; a bucket straddling since is kept
+                if until and start > until:
+                    continue
+                selected.append((start, name, bucket))
+        return selected
+
+    def query(self, points: int, region: Optional[str] = None, since: Optional[datetime] = None,
+              until: Optional[datetime] = None) -> Dict:
+        """Return the finest tier whose bucket count fits within the points budget"""
+        self.refresh()
+        points = max(1, points)
+        with self._lock:
+            tier, selected = None, []
+            for name, _ in TIERS:
+                tier = name
+                selected = self._select_buckets(name, region, since, until)
+                if len(selected) <= points:
+                    break
+
+            selected.sort(key=lambda item: (item[0], item[1]))
+            truncated = len(selected) > points
+            if truncated:
+                # Even the coarsest tier is over budget; keep the most recent buckets
+                selected = selected[-points:]
+
+            data = [
+                {
+                    'timestamp': start.isoformat(),
+                    'date': start.date().isoformat(),
+                    'region': name,
+                    self.value_field: round(bucket.mean, 2),
+                    'min': bucket.min,
+                    'max': bucket.max,
+                    'mean': round(bucket.mean, 2),
+                    'count': bucket.count,
+                }
+                for start, name, bucket in selected
+            ]
+
+        return {
+            'data': data,
+            'count': len(data),
+            'tier': tier,
+            'points': points,
+            'truncated': truncated,
+            'samples': self.samples,
+        }
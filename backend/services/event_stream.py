@@ -0,0 +1,150 @@
+"""
+Server-Sent Events fan-out
+Each event is framed once and copied into bounded per-client queues, so one Kafka consumer feeds any
+number of browsers; reconnecting clients resume from Last-Event-ID out of the topic buffers
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import json
+import queue
+import threading
+
+DEFAULT_CLIENT_QUEUE_SIZE = 256
+DEFAULT_HEARTBEAT_SECONDS = 15
+DEFAULT_MAX_CLIENTS = 8
+
+# Message events newer than a buffer sequence, as (sequence, topic, data), oldest first
+ReplaySource = Callable[[int], Iterable[Tuple[int, str, Dict]]]
+
+
+class Subscription:
+    """One connected client: its topic filter and its bounded queue of framed events"""
+
+    def __init__(self, topics: Optional[Set[str]], queue_size: int):
+        self.topics = topics  # None means every topic
+        # (epoch, sequence, frame); sequence is None for events that cannot be replayed
+        self.queue: "queue.Queue[Tuple[Optional[str], Optional[int], bytes]]" = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def wants(self, topic: str) -> bool:
+        return self.topics is None or topic in self.topics
+
+
+# A registered client, the frames it missed and the (epoch, sequence) they run up to
+Subscribed = Tuple[Subscription, List[bytes], Optional[Tuple[str, int]]]
+
+
+class EventBroker:
+    """
+    Publishes events to every matching subscriber without blocking the publisher
+
+    A client whose queue fills is cut off rather than slowing everyone else down;
+    the browser reconnects with Last-Event-ID and catches up from the replay source.
+    Message ids are "<epoch>-<sequence>", where the epoch names the monitor leader
+    and the sequence is the one it gave the message in its topic buffers. Every
+    worker mirrors both, so an id from one worker resumes on any other; an id from
+    an earlier leader is not recognised and the client starts from live events.
+
+    Each open stream holds a server thread for as long as the client stays, so at
+    most max_clients are admitted; past that subscribe() turns clients away.
+    """
+
+    def __init__(self, client_queue_size: int = DEFAULT_CLIENT_QUEUE_SIZE,
+                 heartbeat_seconds: float = DEFAULT_HEARTBEAT_SECONDS,
+                 replay: Optional[ReplaySource] = None,
+                 max_clients: Optional[int] = DEFAULT_MAX_CLIENTS):
+        self.client_queue_size = client_queue_size
+        self.max_clients = max_clients  # None for no limit
+        self.heartbeat_seconds = heartbeat_seconds
+        self.replay = replay
+        self.epoch: Optional[str] = None  # set by the coordinator once the leader is known
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self.metrics = {'published': 0, 'delivered': 0, 'replayed': 0, 'disconnected_slow': 0, 'rejected_full': 0}
+
+    @staticmethod
+    def _frame(event: str, topic: str, data: Dict, epoch: Optional[str] = None,
+               sequence: Optional[int] = None) -> bytes:
+        payload = json.dumps({'topic': topic, 'data': data}, separators=(',', ':'), default=str)
+        event_id = f"id: {epoch}-{sequence}\n" if epoch is not None and sequence is not None else ''
+        return f"{event_id}event: {event}\ndata: {payload}\n\n".encode()
+
+    def publish(self, event: str, topic: str, data: Dict, sequence: Optional[int] = None):
+        """Frame an event once and queue it for every client following its topic; sequence makes it resumable"""
+        epoch = self.epoch
+        frame = self._frame(event, topic, data, epoch, sequence)
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.wants(topic) and not s.overflowed]
+            self.metrics['published'] += 1
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait((epoch, sequence, frame))
+                self.metrics['delivered'] += 1
+            except queue.Full:
+                subscription.overflowed = True
+                self.metrics['disconnected_slow'] += 1
+
+    def _parse_last_event_id(self, last_event_id: Optional[str]) -> Optional[int]:
+        epoch, _, sequence = (last_event_id or '').rpartition('-')
+        if self.epoch is None or epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def subscribe(self, topics: Optional[Set[str]] = None,
+                  last_event_id: Optional[str] = None) -> Optional[Subscribed]:
+        """
+        Register a client; also returns the frames it missed, oldest first, and the
+        (epoch, sequence) they run up to, so stream() can drop live copies of them.
+        None if max_clients streams are already open
+        """
+        subscription = Subscription(topics, self.client_queue_size)
+        with self._lock:
+            if self.max_clients is not None and len(self._subscribers) >= self.max_clients:
+                self.metrics['rejected_full'] += 1
+                return None
+            self._subscribers.add(subscription)
+        # Registered before the backlog is read, so nothing falls between replay and live
+        epoch, after = self.epoch, self._parse_last_event_id(last_event_id)
+        if after is None or self.replay is None:
+            return subscription, [], None
+        backlog, replayed_to = [], after
+        for sequence, topic, data in self.replay(after):
+            replayed_to = sequence
+            if subscription.wants(topic):
+                backlog.append(self._frame('message', topic, data, epoch, sequence))
+        self.metrics['replayed'] += len(backlog)
+        return subscription, backlog, (epoch, replayed_to)
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stream(self, subscribed: Subscribed,
+               initial: Optional[Callable[[], Iterable[Tuple[str, str, Dict]]]] = None) -> Iterator[bytes]:
+        """
+        SSE body for a subscribe() result: initial events such as a full stats
+        snapshot, the backlog, then live events with periodic keep-alives
+        """
+        subscription, backlog, replayed = subscribed
+        try:
+            yield b"retry: 3000\n\n"
+            for event, topic, data in (initial() if initial else ()):
+                if subscription.wants(topic):
+                    yield self._frame(event, topic, data)
+            for frame in backlog:
+                yield frame
+            while not subscription.overflowed:
+                try:
+                    epoch, sequence, frame = subscription.queue.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    yield b": keep-alive\n\n"
+                    continue
+                if replayed and sequence is not None and epoch == replayed[0] and sequence <= replayed[1]:
+                    continue  # already sent from the backlog
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            return dict(self.metrics, clients=len(self._subscribers), epoch=self.epoch)
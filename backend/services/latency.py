@@ -0,0 +1,184 @@
+"""
+End-to-end pipeline latency
+Log-bucketed histograms per topic and stage (produce, broker, consumer, disk, API), so p50/p95/p99
+show where freshness is lost between a producer's send and the dashboard's read
+"""
+
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import math
+import os
+import threading
+import time
+
+SENT_AT_HEADER = 'sent_at_ms'
+TIMESTAMP_TYPE_LOG_APPEND = 1  # broker stamped the record when it was appended
+DEFAULT_WINDOW_SECONDS = 300
+
+# Stages in pipeline order; broker_to_monitor is the backend's own live consumer
+STAGES = ('produce_to_broker', 'broker_to_consumer', 'consumer_to_disk', 'disk_to_api', 'broker_to_monitor')
+
+# Bucket upper bounds in ms: 0.1 ms to ~1 day, 10% apart, so a percentile is within 10%
+_BUCKET_GROWTH = 1.1
+BUCKET_BOUNDS = [0.1 * _BUCKET_GROWTH ** i
+                 for i in range(int(math.log(86_400_000 / 0.1, _BUCKET_GROWTH)) + 2)]
+
+
+def header_ms(headers: Optional[List], name: str = SENT_AT_HEADER) -> Optional[float]:
+    """A millisecond timestamp carried in Kafka record headers, if present"""
+    for key, value in headers or ():
+        if key == name:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets: O(log buckets) to record, and memory that does not grow with traffic"""
+
+    __slots__ = ('counts', 'count', 'total', 'maximum')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKET_BOUNDS)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, ms: float):
+        ms = max(ms, 0.0)  # small clock skew between hosts must not go negative
+        self.counts[min(bisect_left(BUCKET_BOUNDS, ms), len(BUCKET_BOUNDS) - 1)] += 1
+        self.count += 1
+        self.total += ms
+        self.maximum = max(self.maximum, ms)
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = math.ceil(q / 100 * self.count)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKET_BOUNDS[i], self.maximum)
+        return self.maximum
+
+    def summary(self) -> Dict:
+        def rounded(value):
+            return None if value is None else round(value, 1)
+        return {
+            'count': self.count,
+            'mean_ms': rounded(self.total / self.count) if self.count else None,
+            'p50_ms': rounded(self.percentile(50)),
+            'p95_ms': rounded(self.percentile(95)),
+            'p99_ms': rounded(self.percentile(99)),
+            'max_ms': rounded(self.maximum) if self.count else None,
+        }
+
+
+class LatencyRecorder:
+    """
+    Per topic and stage histograms over a rolling window
+
+    Two generations are kept and the older one is dropped every window, so
+    summaries cover between one and two windows of recent traffic rather than
+    everything since startup.
+    """
+
+    def __init__(self, window_seconds: int = DEFAULT_WINDOW_SECONDS, clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self._current: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self._previous: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self._rotated_at = clock()
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        if self.clock() - self._rotated_at >= self.window_seconds:
+            self._previous, self._current = self._current, {}
+            self._rotated_at = self.clock()
+
+    def observe(self, topic: str, stage: str, ms: float):
+        with self._lock:
+            self._rotate()
+            stages = self._current.setdefault(topic, {})
+            histogram = stages.get(stage)
+            if histogram is None:
+                histogram = stages[stage] = LatencyHistogram()
+            histogram.observe(ms)
+
+    def summary(self) -> Dict[str, Dict[str, Dict]]:
+        """{topic: {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}}"""
+        with self._lock:
+            self._rotate()
+            merged: Dict[str, Dict[str, LatencyHistogram]] = {}
+            for generation in (self._previous, self._current):
+                for topic, stages in generation.items():
+                    for stage, histogram in stages.items():
+                        merged.setdefault(topic, {}).setdefault(stage, LatencyHistogram()).merge(histogram)
+        return {topic: {stage: histogram.summary() for stage, histogram in stages.items()}
+                for topic, stages in merged.items()}
+
+    def write(self, path: Path, **extra):
+        """Publish the summary as JSON for another process; replaced atomically"""
+        data = dict(extra, written_at=time.time(), window_seconds=self.window_seconds, topics=self.summary())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp, path)
+
+
+class FileFreshness:
+    """
+    disk_to_api: how long after a data file was written the API first served it
+
+    Each new modification time is measured once, on the first read that sees it,
+    so repeated polling of an unchanged file does not skew the histogram.
+    """
+
+    def __init__(self, recorder: LatencyRecorder):
+        self.recorder = recorder
+        self._served_mtime: Dict[str, float] = {}
+
+    def observe_read(self, topic: str, path: Path):
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return
+        key = str(path)
+        if self._served_mtime.get(key) == mtime:
+            return
+        # A file already on disk at startup was not written while we watched; only time later writes
+        watched = key in self._served_mtime
+        self._served_mtime[key] = mtime
+        if watched:
+            self.recorder.observe(topic, 'disk_to_api', (time.time() - mtime) * 1000)
+
+
+def load_summary(path: Path) -> Optional[Dict]:
+    """A summary written by LatencyRecorder.write, or None if there is none yet"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def merge_summaries(*summaries: Optional[Dict[str, Dict[str, Dict]]]) -> Dict[str, Dict[str, Dict]]:
+    """Combine per-process summaries; each stage is measured by exactly one process"""
+    merged: Dict[str, Dict[str, Dict]] = {}
+    for summary in summaries:
+        for topic, stages in (summary or {}).items():
+            merged.setdefault(topic, {}).update(stages)
+    return {topic: {stage: stages[stage] for stage in STAGES if stage in stages}
+            for topic, stages in sorted(merged.items())}
@@ -0,0 +1,245 @@
+"""
+Lead-lag analysis between surveillance signals
+Measures how many days wastewater viral load leads pharmacy OTC demand and patient fevers
+using FFT-based cross-correlation vectorized across regions
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import threading
+
+import numpy as np
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+CACHE_FILE = DATA_DIR / "lead_lag.json"
+CACHE_TTL = timedelta(days=1)
+DEFAULT_MAX_LAG = 14
+MIN_CORRELATION = 0.3
+MIN_OVERLAP_DAYS = 14  # no peak is reported from fewer overlapping days than this
+ESTIMATOR = 'biased'  # cached results computed any other way are recomputed
+FEVER_TEMPERATURE = 38.0
+
+
+def load_csv_daily(path: Path, value_field: str) -> Dict[str, Dict[date, float]]:
+    """Average a CSV series per region and day"""
+    sums: Dict[str, Dict[date, List[float]]] = defaultdict(lambda: defaultdict(list))
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        headers = f.readline().strip().split(',')
+        for line in f:
+            values = line.strip().split(',')
+            if len(values) != len(headers):
+                continue
+            row = dict(zip(headers, values))
+            try:
+                day = datetime.fromisoformat(row['date']).date()
+                sums[row.get('region') or 'Unknown'][day].append(float(row[value_field]))
+            except (KeyError, ValueError):
+                continue
+    return {
+        region: {day: sum(v) / len(v) for day, v in days.items()}
+        for region, days in sums.items()
+    }
+
+
+def load_fever_counts(path: Path) -> Dict[str, Dict[date, float]]:
+    """Count febrile patient records per region and day"""
+    counts: Dict[str, Dict[date, float]] = defaultdict(lambda: defaultdict(float))
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                patient = json.loads(line)
+                region = patient.get('region')
+                if not region:
+                    continue
+                day = datetime.fromisoformat(patient['lastUpdate']).date()
+                fever = float(patient.get('lastTemperature', 0)) >= FEVER_TEMPERATURE
+            except (KeyError, ValueError, TypeError):
+                continue
+            counts[region][day] += 1.0 if fever else 0.0
+    return {region: dict(days) for region, days in counts.items()}
+
+
+def align_series(leader: Dict[str, Dict[date, float]], follower: Dict[str, Dict[date, float]]
+                 ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Put every shared region on one daily grid, filling gaps with the last known value"""
+    regions = sorted(set(leader) & set(follower))
+    if not regions:
+        return [], np.empty((0, 0)), np.empty((0, 0))
+
+    days = [d for region in regions for d in list(leader[region]) + list(follower[region])]
+    start, end = min(days), max(days)
+    n = (end - start).days + 1
+
+    def grid(series: Dict[date, float]) -> np.ndarray:
+        row = np.full(n, np.nan)
+        for day, value in series.items():
+            row[(day - start).days] = value
+        # Forward fill, then back fill the leading gap
+        valid = ~np.isnan(row)
+        idx = np.where(valid, np.arange(n), 0)
+        np.maximum.accumulate(idx, out=idx)
+        row = row[idx]
+        first = np.argmax(valid)
+        row[:first] = row[first]
+        return row
+
+    x = np.vstack([grid(leader[region]) for region in regions])
+    y = np.vstack([grid(follower[region]) for region in regions])
+    return regions, x, y
+
+
+def cross_correlation(x: np.ndarray, y: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    Correlation of x[t] with y[t + lag] for lag in 0..max_lag, one row per series
+
+    Rows are z-normalized and correlated in a single batched FFT. Every lag is
+    divided by n (the biased estimator): dividing by the shrinking overlap would
+    inflate the noisy high lags past the real peak. Lags are capped at n/3.
+    """
+    n = x.shape[1]
+    max_lag = effective_max_lag(n, max_lag)
+
+    def zscore(a: np.ndarray) -> np.ndarray:
+        std = a.std(axis=1, keepdims=True)
+        std[std == 0] = 1.0
+        return (a - a.mean(axis=1, keepdims=True)) / std
+
+    nfft = 1 << (2 * n - 1).bit_length()
+    fx = np.fft.rfft(zscore(x), nfft, axis=1)
+    fy = np.fft.rfft(zscore(y), nfft, axis=1)
+    cc = np.fft.irfft(np.conj(fx) * fy, nfft, axis=1)[:, :max_lag + 1]
+    return cc / n
+
+
+def effective_max_lag(n: int, max_lag: int) -> int:
+    """Largest lag tested on n days: at most a third of the series, and never below 0"""
+    return max(0, min(max_lag, n // 3, n - 1))
+
+
+def analyze_pair(leader: Dict[str, Dict[date, float]], follower: Dict[str, Dict[date, float]],
+                 max_lag: int) -> Dict[str, Dict]:
+    """Best lag per region for one leader/follower pair"""
+    regions, x, y = align_series(leader, follower)
+    if not regions or x.shape[1] < 3:
+        return {}
+    corr = cross_correlation(x, y, max_lag)
+    best = corr.argmax(axis=1)
+    # Too short a series to tell a lead from noise: correlations are shown, no lag is claimed
+    tested = effective_max_lag(x.shape[1], max_lag)
+    enough = x.shape[1] - tested >= MIN_OVERLAP_DAYS
+    results = {}
+    for i, region in enumerate(regions):
+        peak = float(corr[i, best[i]])
+        results[region] = {
+            # A peak on the last lag tested may really lie beyond it, so it is not reported as a lead
+            'lag_days': int(best[i]) if peak >= MIN_CORRELATION and enough and (best[i] < tested or tested == 0) else None,
+            'peak_correlation': round(peak, 3),
+            'correlations': [round(float(c), 3) for c in corr[i]],
+            'days': int(x.shape[1]),
+        }
+    return results
+
+
+def compute_lead_lag(data_dir: Path = DATA_DIR, max_lag: int = DEFAULT_MAX_LAG) -> Dict:
+    """Run the full lead-lag analysis over the file-backed datasets"""
+    wastewater = load_csv_daily(data_dir / "wastewater_demo.csv", "viral_load")
+    pharmacy = load_csv_daily(data_dir / "otc_demo.csv", "sales_index")
+    fevers = load_fever_counts(data_dir / "patients_demo.jsonl")
+    return {
+        'computed_at': datetime.now().isoformat(),
+        'max_lag': max_lag,
+        'min_correlation': MIN_CORRELATION,
+        'min_overlap_days': MIN_OVERLAP_DAYS,
+        'estimator': ESTIMATOR,
+        'pairs': {
+            'wastewater_to_pharmacy': analyze_pair(wastewater, pharmacy, max_lag),
+            'wastewater_to_fevers': analyze_pair(wastewater, fevers, max_lag),
+        }
+    }
+
+
+class LeadLagCache:
+    """Daily-refreshed lead-lag results shared through a JSON file in the data directory"""
+
+    def __init__(self, cache_file: Path = CACHE_FILE, ttl: timedelta = CACHE_TTL):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._result: Optional[Dict] = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, result: Optional[Dict], max_lag: int) -> bool:
+        if not result or result.get('max_lag') != max_lag or result.get('estimator') != ESTIMATOR:
+            return False
+        computed_at = datetime.fromisoformat(result['computed_at'])
+        return datetime.now() - computed_at < self.ttl
+
+    def _load(self) -> Optional[Dict]:
+        try:
+            mtime = os.stat(self.cache_file).st_mtime_ns
+        except FileNotFoundError:
+            return self._result
+        if mtime != self._mtime:
+            try:
+                with open(self.cache_file, 'r') as f:
+                    self._result = json.load(f)
+                self._mtime = mtime
+            except (OSError, ValueError):
+                pass
+        return self._result
+
+    def refresh(self, max_lag: int = DEFAULT_MAX_LAG) -> Dict:
+        """Recompute and persist the analysis"""
+        result = compute_lead_lag(self.cache_file.parent, max_lag)
+        tmp = self.cache_file.with_suffix('.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(result, f)
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            pass
+        self._result = result
+        return result
+
+    def get(self, max_lag: int = DEFAULT_MAX_LAG, force: bool = False) -> Dict:
+        """Cached analysis, recomputed when older than a day"""
+        if max_lag != DEFAULT_MAX_LAG:
+            # Ad-hoc lag ranges are cheap to compute and not worth persisting
+            return compute_lead_lag(self.cache_file.parent, max_lag)
+        with self._lock:
+            result = self._load()
+            if force or not self._is_fresh(result, max_lag):
+                result = self.refresh(max_lag)
+            return result
+
+    def lead_time_days(self, region: str) -> Optional[int]:
+        """Measured wastewater lead over OTC demand (or fevers) for a region, if significant"""
+        pairs = self.get().get('pairs', {})
+        for pair in ('wastewater_to_pharmacy', 'wastewater_to_fevers'):
+            lag = pairs.get(pair, {}).get(region, {}).get('lag_days')
+            if lag is not None:
+                return lag
+        return None
+
+
+lead_lag_cache = LeadLagCache()
+
+
+if __name__ == '__main__':
+    # Daily batch job: python -m services.lead_lag [max_lag]
+    import sys
+    lag = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MAX_LAG
+    output = lead_lag_cache.refresh(lag)
+    for pair_name, regions in output['pairs'].items():
+        for region_name, stats in regions.items():
+            print(f"{pair_name} {region_name}: lag={stats['lag_days']} r={stats['peak_correlation']}")
@@ -0,0 +1,44 @@
+"""
+Leader election between local processes
+The leader is whichever process holds an exclusive flock on a shared file; the kernel drops
+the lock when that process exits, so another one can take over
+"""
+
+from pathlib import Path
+from typing import Optional
+import fcntl
+import os
+
+
+class FileLeaderElection:
+    """Non-blocking flock on a lock file, held for the life of the process once won"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """True if this process is (now) the leader"""
+        if self._fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,116 @@
+"""
+Monitor state shared by the leader with follower workers
+A small stats file replaced only when it changes, and an append-only spool of buffered messages
+and closed windows, so followers read what is new instead of reloading every buffer each tick
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import os
+import time
+
+DEFAULT_MAX_SPOOL_BYTES = 8 * 1024 * 1024
+SPOOL_PREFIX = 'spool-'
+
+
+class MonitorSpool:
+    """
+    Leader side: start() opens a spool generation with a base record of the full
+    state, append() adds records, publish() replaces the stats file when its
+    content changed or a heartbeat is due. Follower side: read_stats() and
+    read_new(), which returns only the spool records past its last read.
+
+    Each generation is a new file, so a follower never reads one generation at
+    another's offsets. A full spool is replaced by a new generation whose base
+    record carries the current state, which bounds both disk use and the cost
+    of a follower joining late.
+    """
+
+    def __init__(self, directory: Path, stats_path: Path, heartbeat_seconds: float,
+                 max_bytes: int = DEFAULT_MAX_SPOOL_BYTES):
+        self.directory = Path(directory)
+        self.stats_path = Path(stats_path)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_bytes = max_bytes
+        # Leader state
+        self.generation: Optional[str] = None
+        self.size = 0
+        self._file = None
+        self._published: Optional[Dict] = None
+        self._published_at = 0.0
+        # Follower state
+        self._read_generation: Optional[str] = None
+        self._read_offset = 0
+
+    def _path(self, generation: str) -> Path:
+        return self.directory / f"{SPOOL_PREFIX}{generation}.jsonl"
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.max_bytes
+
+    def start(self, generation: str, base: Dict):
+        """Begin a new spool generation whose first record holds the full current state"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._file is not None:
+            self._file.close()
+        self.generation = generation
+        self._file = open(self._path(generation), 'wb')
+        self.size = 0
+        self.append([{'base': base}])
+
+    def append(self, records: List[Dict]):
+        if not records:
+            return
+        data = b''.join(json.dumps(record, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
+                        for record in records)
+        self._file.write(data)
+        self._file.flush()
+        self.size += len(data)
+
+    def publish(self, stats: Dict) -> bool:
+        """Replace the stats file if it changed or the heartbeat is due; True if it was written"""
+        stats = dict(stats, spool={'generation': self.generation, 'size': self.size})
+        now = time.time()
+        if stats == self._published and now - self._published_at < self.heartbeat_seconds:
+            return False
+        tmp = self.stats_path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(dict(stats, written_at=now), f, separators=(',', ':'), default=str)
+        os.replace(tmp, self.stats_path)
+        if not self._published or self._published['spool']['generation'] != self.generation:
+            # Followers are now pointed at this generation; earlier spools, ours or a dead leader's, can go
+            for stale in self.directory.glob(f"{SPOOL_PREFIX}*.jsonl"):
+                if stale != self._path(self.generation):
+                    stale.unlink(missing_ok=True)
+        self._published, self._published_at = stats, now
+        return True
+
+    def read_stats(self) -> Optional[Dict]:
+        try:
+            with open(self.stats_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read_new(self, stats: Dict) -> Optional[List[Dict]]:
+        """Spool records this follower has not read yet; None if the spool could not be read"""
+        spool = stats.get('spool') or {}
+        generation, size = spool.get('generation'), spool.get('size', 0)
+        if generation is None:
+            return None
+        offset = self._read_offset if generation == self._read_generation else 0
+        if size <= offset:
+            return []
+        try:
+            with open(self._path(generation), 'rb') as f:
+                f.seek(offset)
+                data = f.read(size - offset)
+        except OSError:
+            return None  # rotated away meanwhile; the next stats file names its successor
+        if len(data) < size - offset:
+            return None
+        records = [json.loads(line) for line in data.splitlines() if line]
+        self._read_generation, self._read_offset = generation, size
+        return records
@@ -0,0 +1,35 @@
+"""
+Sliding-window event counter
+A circular array of per-second buckets: O(1) to record an event, O(buckets) to read the window total
+"""
+
+from typing import Optional
+import time
+
+
+class SlidingWindowCounter:
+    """
+    Counts events over the last `buckets` seconds
+
+    Each slot remembers which second it holds, so a slot left over from an earlier
+    lap of the ring is reset on write and ignored on read.
+    """
+
+    def __init__(self, buckets: int = 60, clock=time.monotonic):
+        self.buckets = buckets
+        self.clock = clock
+        self.counts = [0] * buckets
+        self.seconds = [-1] * buckets
+
+    def add(self, count: int = 1, now: Optional[float] = None):
+        second = int(self.clock() if now is None else now)
+        slot = second % self.buckets
+        if self.seconds[slot] != second:
+            self.seconds[slot] = second
+            self.counts[slot] = 0
+        self.counts[slot] += count
+
+    def total(self, now: Optional[float] = None) -> int:
+        """Events in the window ending at the current second"""
+        oldest = int(self.clock() if now is None else now) - self.buckets
+        return sum(count for count, second in zip(self.counts, self.seconds) if second > oldest)
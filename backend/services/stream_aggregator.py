@@ -0,0 +1,256 @@
+"""
+Windowed aggregation over the Kafka surveillance streams
+Tumbling and hopping event-time windows keyed by topic and region, closed by a watermark,
+with state and consumed offsets checkpointed together so a restart neither loses nor recounts data
+"""
+
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import json
+import os
+import threading
+import time
+
+FEVER_TEMPERATURE = 38.0
+DEFAULT_REGION = 'All Regions'
+DEFAULT_ALLOWED_LATENESS_SECONDS = 120
+DEFAULT_RESULTS_KEPT = 2000
+DEFAULT_WINDOWS = [
+    {'name': '5m', 'size_seconds': 300},
+    {'name': '15m_every_5m', 'size_seconds': 900, 'hop_seconds': 300},
+]
+
+# Which numeric field each topic contributes, and the name it is reported under
+VALUE_FIELDS = {
+    'fever-oracle-wastewater': ('viral_load', 'viral_load'),
+    'fever-oracle-pharmacy': ('sales_index', 'sales_index'),
+    'fever-oracle-vitals': ('temperature', 'temperature'),
+}
+
+
+class WindowSpec:
+    """A tumbling (hop == size) or hopping window definition"""
+
+    __slots__ = ('name', 'size', 'hop')
+
+    def __init__(self, name: str, size_seconds: int, hop_seconds: Optional[int] = None):
+        self.name = name
+        self.size = size_seconds
+        self.hop = hop_seconds or size_seconds
+
+    def starts(self, event_time: float) -> List[int]:
+        """Start times of every window containing event_time"""
+        last = int(event_time // self.hop) * self.hop
+        return list(range(last, int(event_time) - self.size, -self.hop))
+
+
+class Accumulator:
+    """Running count, sum, max and fever count for one window, topic and region"""
+
+    __slots__ = ('count', 'values', 'total', 'maximum', 'fevers')
+
+    def __init__(self, count=0, values=0, total=0.0, maximum=None, fevers=0):
+        self.count = count
+        self.values = values  # messages that carried the topic's numeric field
+        self.total = total
+        self.maximum = maximum
+        self.fevers = fevers
+
+    def add(self, value: Optional[float], fever: bool):
+        self.count += 1
+        if value is not None:
+            self.values += 1
+            self.total += value
+            self.maximum = value if self.maximum is None else max(self.maximum, value)
+        if fever:
+            self.fevers += 1
+
+    def to_state(self) -> List:
+        return [self.count, self.values, self.total, self.maximum, self.fevers]
+
+
+class StreamAggregator:
+    """
+    Incremental windowed aggregates with a watermark
+
+    The watermark trails the newest event time by the allowed lateness. A window
+    is emitted and dropped from state once the watermark passes its end; events
+    that only fall into already closed windows are counted as late and ignored.
+    """
+
+    def __init__(self, windows: List[Dict], allowed_lateness_seconds: int = DEFAULT_ALLOWED_LATENESS_SECONDS,
+                 checkpoint_path: Optional[Path] = None, results_kept: int = DEFAULT_RESULTS_KEPT,
+                 emit: Optional[Callable[[Dict], None]] = None):
+        self.specs = [WindowSpec(w['name'], w['size_seconds'], w.get('hop_seconds')) for w in windows]
+        self.allowed_lateness = allowed_lateness_seconds
+        self.checkpoint_path = checkpoint_path
+        self.emit = emit
+        self.max_event_time: Optional[float] = None
+        self.offsets: Dict[str, int] = {}  # "topic:partition" -> last offset folded into state
+        # (window name, start, topic, region) -> accumulator
+        self.state: Dict[Tuple[str, int, str, str], Accumulator] = {}
+        self.results: Deque[Dict] = deque(maxlen=results_kept)
+        self.metrics = {'processed': 0, 'late_dropped': 0, 'duplicates': 0, 'emitted': 0, 'emit_failed': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def watermark(self) -> Optional[float]:
+        return None if self.max_event_time is None else self.max_event_time - self.allowed_lateness
+
+    def next_offset(self, topic: str, partition: int) -> Optional[int]:
+        """Where a consumer must resume for this partition so nothing is skipped"""
+        offset = self.offsets.get(f"{topic}:{partition}")
+        return None if offset is None else offset + 1
+
+    @staticmethod
+    def event_time(value: Dict, timestamp_ms: int) -> float:
+        try:
+            return datetime.fromisoformat(value['timestamp']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return timestamp_ms / 1000
+
+    def process(self, topic: str, partition: int, offset: int, timestamp_ms: int, value: Dict):
+        """Fold one message into every window it belongs to"""
+        if topic not in VALUE_FIELDS:
+            return
+        key = f"{topic}:{partition}"
+        with self._lock:
+            if offset <= self.offsets.get(key, -1):
+                self.metrics['duplicates'] += 1  # replayed after a restart, already counted
+                return
+            self.offsets[key] = offset
+            event_time = self.event_time(value, timestamp_ms)
+            if self.max_event_time is None or event_time > self.max_event_time:
+                self.max_event_time = event_time
+            watermark = self.watermark
+
+            field, _ = VALUE_FIELDS[topic]
+            try:
+                number = float(value[field])
+            except (KeyError, TypeError, ValueError):
+                number = None
+            fever = topic == 'fever-oracle-vitals' and number is not None and number >= FEVER_TEMPERATURE
+            region = value.get('region') or DEFAULT_REGION
+
+            placed = False
+            for spec in self.specs:
+                for start in spec.starts(event_time):
+                    if start + spec.size <= watermark:
+                        continue  # that window already closed
+                    state_key = (spec.name, start, topic, region)
+                    accumulator = self.state.get(state_key)
+                    if accumulator is None:
+                        accumulator = self.state[state_key] = Accumulator()
+                    accumulator.add(number, fever)
+                    placed = True
+            self.metrics['processed' if placed else 'late_dropped'] += 1
+
+    def close_windows(self) -> List[Dict]:
+        """Emit every window the watermark has passed, oldest first"""
+        with self._lock:
+            watermark = self.watermark
+            if watermark is None:
+                return []
+            sizes = {spec.name: spec.size for spec in self.specs}
+            closed = sorted((key for key in self.state if key[1] + sizes.get(key[0], 0) <= watermark),
+                            key=lambda key: (key[1], key[0], key[2], key[3]))
+            results = [self._result(key, self.state.pop(key), sizes[key[0]]) for key in closed]
+            self.results.extend(results)
+        for result in results:
+            if self.emit:
+                try:
+                    self.emit(result)
+                    self.metrics['emitted'] += 1
+                except Exception:
+                    self.metrics['emit_failed'] += 1
+        return results
+
+    @staticmethod
+    def _result(key: Tuple[str, int, str, str], accumulator: Accumulator, size: int) -> Dict:
+        window, start, topic, region = key
+        _, name = VALUE_FIELDS[topic]
+        result = {
+            'type': 'window_aggregate',
+            'window': window,
+            'start': datetime.fromtimestamp(start).isoformat(),
+            'end': datetime.fromtimestamp(start + size).isoformat(),
+            'topic': topic.replace('fever-oracle-', ''),
+            'region': region,
+            'count': accumulator.count,
+            f'mean_{name}': round(accumulator.total / accumulator.values, 3) if accumulator.values else None,
+            f'max_{name}': accumulator.maximum,
+        }
+        if topic == 'fever-oracle-vitals':
+            result['fever_count'] = accumulator.fevers
+            result['fever_prevalence'] = round(accumulator.fevers / accumulator.count, 4)
+        return result
+
+    def query(self, window: Optional[str] = None, topic: Optional[str] = None,
+              region: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Most recent closed windows matching the filters, newest first"""
+        matched = []
+        for result in reversed(self.results.copy()):
+            if (window and result['window'] != window) or (topic and result['topic'] != topic) \
+                    or (region and result['region'] != region):
+                continue
+            matched.append(result)
+            if len(matched) >= limit:
+                break
+        return matched
+
+    def checkpoint(self):
+        """Persist open windows and offsets together, atomically"""
+        if self.checkpoint_path is None:
+            return
+        with self._lock:
+            data = {
+                'saved_at': time.time(),
+                'max_event_time': self.max_event_time,
+                'offsets': dict(self.offsets),
+                'state': [[*key, *accumulator.to_state()] for key, accumulator in self.state.items()],
+                'results': list(self.results),
+            }
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.checkpoint_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def restore(self) -> bool:
+        """Load the last checkpoint, if any; True if state was restored"""
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return False
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False  # unreadable checkpoint: start from the buffer warm-up instead
+        with self._lock:
+            self.max_event_time = data.get('max_event_time')
+            self.offsets = data.get('offsets', {})
+            self.state = {(w, start, topic, region): Accumulator(*values)
+                          for w, start, topic, region, *values in data.get('state', [])}
+            self.results.clear()
+            self.results.extend(data.get('results', []))
+        return True
+
+    def load_results(self, results: List[Dict]):
+        """Adopt closed windows computed by another process"""
+        with self._lock:
+            self.results.clear()
+            self.results.extend(results)
+
+    def add_results(self, results: List[Dict]):
+        """Append windows another process closed since its last load_results"""
+        with self._lock:
+            self.results.extend(results)
+
+    def get_metrics(self) -> Dict:
+        watermark = self.watermark
+        return dict(self.metrics,
+                    open_windows=len(self.state),
+                    watermark=datetime.fromtimestamp(watermark).isoformat() if watermark else None)
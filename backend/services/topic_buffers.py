@@ -0,0 +1,87 @@
+"""
+Recent Kafka messages per topic
+Fixed-size ring buffers filled by the background monitor consumer and read by /api/kafka/latest-data
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+import itertools
+import threading
+
+DEFAULT_BUFFER_SIZE = 500
+
+
+class TopicBuffers:
+    """
+    One bounded deque of (sequence, timestamp_ms, value) per topic
+
+    Appends drop the oldest message once a buffer is full, so memory stays fixed
+    no matter how far readers fall behind. Sequence numbers increase across all
+    topics, so a reader of an exported copy can tell which messages are new.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_BUFFER_SIZE):
+        self.capacity = capacity
+        self._buffers: Dict[str, Deque[Tuple[int, int, Dict]]] = {}
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def append(self, topic: str, timestamp_ms: int, value: Dict, sequence: Optional[int] = None) -> int:
+        """Buffer a message and return its sequence; a mirrored message keeps the one the leader gave it"""
+        buffer = self._buffers.get(topic)
+        if buffer is None:
+            with self._lock:
+                buffer = self._buffers.setdefault(topic, deque(maxlen=self.capacity))
+        if sequence is None:
+            sequence = next(self._sequence)
+        buffer.append((sequence, timestamp_ms, value))
+        return sequence
+
+    def latest(self, topic: str, limit: int, since: Optional[datetime] = None) -> List[Dict]:
+        """Up to limit most recent messages newer than since, oldest first"""
+        buffer = self._buffers.get(topic)
+        if not buffer or limit <= 0:
+            return []
+        since_ms = since.timestamp() * 1000 if since else None
+        # deque appends are atomic, so a shallow copy is a consistent snapshot
+        items = buffer.copy()
+        selected = []
+        # Partitions interleave, so timestamps are only roughly ordered: scan every item
+        for _, timestamp_ms, value in reversed(items):
+            if since_ms is not None and timestamp_ms <= since_ms:
+                continue
+            selected.append(value)
+            if len(selected) >= limit:
+                break
+        selected.reverse()
+        return selected
+
+    def snapshot(self, topics: Iterable[str], limit: int,
+                 since: Optional[datetime] = None) -> Dict[str, List[Dict]]:
+        return {topic: self.latest(topic, limit, since) for topic in topics}
+
+    def sizes(self) -> Dict[str, int]:
+        return {topic: len(buffer) for topic, buffer in list(self._buffers.items())}
+
+    def entries_after(self, sequence: int) -> List[Tuple[int, str, int, Dict]]:
+        """(sequence, topic, timestamp_ms, value) of every buffered message newer than sequence, in order"""
+        newer = [(seq, topic, timestamp_ms, value)
+                 for topic, buffer in list(self._buffers.items())
+                 for seq, timestamp_ms, value in buffer.copy() if seq > sequence]
+        newer.sort(key=lambda entry: entry[0])
+        return newer
+
+    def export(self) -> Dict[str, List]:
+        return {topic: [list(entry) for entry in buffer.copy()] for topic, buffer in list(self._buffers.items())}
+
+    def load(self, exported: Dict[str, List]):
+        """Replace every buffer with an exported copy, e.g. one published by another process"""
+        buffers = {topic: deque((tuple(entry) for entry in entries), maxlen=self.capacity)
+                   for topic, entries in exported.items()}
+        with self._lock:
+            self._buffers = buffers
+
+    def clear(self):
+        with self._lock:
+            self._buffers = {}
@@ -2,6 +2,7 @@ import { useState, useEffect } from "react";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Activity, TrendingUp, Database, AlertCircle } from "lucide-react";
+import { openEventStream } from "@/lib/eventStream";
 
 interface TopicStats {
   name: string;
@@ -18,6 +19,13 @@ interface KafkaStats {
   bootstrap_servers?: string;
 }
 
+// A `stats` stream event; topics holds only those that changed, keyed without the fever-oracle- prefix
+interface StatsEvent {
+  topics: Record<string, Omit<TopicStats, "name">>;
+  total_throughput: number;
+  consumer_lag: number;
+}
+
 export const KafkaMonitor = () => {
   const [stats, setStats] = useState<KafkaStats | null>(null);
   const [isLoading, setIsLoading] = useState(true);
@@ -53,10 +61,33 @@ export const KafkaMonitor = () => {
       }
     };
 
+    // Load the full stats once, then apply the deltas the stream sends as they change
     fetchStats();
-    const interval = setInterval(fetchStats, 5000); // Update every 5 seconds
+    const closeStream = openEventStream('/api/stream/events?topics=stats', { stats: (event) => {
+      const { data } = JSON.parse(event.data) as { data: StatsEvent };
+      setStats(prev => {
+        const topics = [...(prev?.topics ?? [])];
+        for (const [short, values] of Object.entries(data.topics)) {
+          const name = `fever-oracle-${short}`;
+          const index = topics.findIndex(topic => topic.name === name);
+          if (index >= 0) {
+            topics[index] = { ...topics[index], ...values };
+          } else {
+            topics.push({ name, ...values });
+          }
+        }
+        return {
+          ...prev,
+          topics,
+          total_throughput: data.total_throughput,
+          consumer_lag: data.consumer_lag,
+        };
+      });
+      setError(null);
+      setIsLoading(false);
+    } });
     
-    return () => clearInterval(interval);
+    return closeStream;
   }, []);
   
   if (isLoading) {
@@ -2,6 +2,7 @@ import { useState, useEffect } from "react";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Activity, AlertCircle } from "lucide-react";
+import { openEventStream } from "@/lib/eventStream";
 
 interface StreamMessage {
   topic: string;
@@ -9,6 +10,8 @@ interface StreamMessage {
   timestamp: Date;
 }
 
+const STREAM_TOPICS = 'wastewater,pharmacy,alerts,vitals,patients,outbreak';
+
 export const RealtimeDataStream = () => {
   const [messages, setMessages] = useState<StreamMessage[]>([]);
   const [isLoading, setIsLoading] = useState(true);
@@ -18,7 +21,7 @@ export const RealtimeDataStream = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await fetch('/api/kafka/latest-data?topics=wastewater,pharmacy,alerts,vitals,patients,outbreak');
+        const response = await fetch(`/api/kafka/latest-data?topics=${STREAM_TOPICS}`);
         if (!response.ok) {
           const errorText = await response.text();
           // Check if response is HTML (error page)
@@ -70,10 +73,17 @@ export const RealtimeDataStream = () => {
       }
     };
 
+    // Seed with buffered messages, then follow the live stream instead of polling
     fetchData();
-    const interval = setInterval(fetchData, 3000); // Update every 3 seconds
-    
-    return () => clearInterval(interval);
+    return openEventStream(`/api/stream/events?topics=${STREAM_TOPICS}`, { message: (event) => {
+      const { topic, data } = JSON.parse(event.data);
+      setIsActive(true);
+      setError(null);
+      setMessages(prev => [{ topic, data, timestamp: new Date() }, ...prev].slice(0, 50)); // Keep last 50
+    } }, () => {
+      // Reconnects on its own and resumes from the last event id
+      setIsActive(false);
+    });
   }, []);
   
   const formatMessage = (msg: StreamMessage) => {
@@ -104,7 +114,7 @@ export const RealtimeDataStream = () => {
           Real-time Data Stream
         </CardTitle>
         <CardDescription>
-          Live messages from Kafka topics (updates every 3 seconds)
+          Live messages from Kafka topics, streamed as they arrive
         </CardDescription>
       </CardHeader>
       <CardContent>
@@ -21,6 +21,7 @@ export interface AuditLog {
     resource: string;
     metadata?: Record<string, any>;
   };
+  cursor?: number;
   hash: string;
   previous_hash: string;
 }
@@ -84,12 +85,21 @@ class BlockchainClient {
     return this.fetch<BlockchainInfo>('/api/blockchain/info');
   }
 
-  async getAuditTrail(userId?: string, resource?: string): Promise<{ audit_logs: AuditLog[]; count: number }> {
+  // Newest entries first; pass the returned next_cursor to load the page of older ones
+  async getAuditTrail(
+    userId?: string,
+    resource?: string,
+    options: { limit?: number; cursor?: number } = {}
+  ): Promise<{ audit_logs: AuditLog[]; count: number; next_cursor: number | null }> {
     const params = new URLSearchParams();
     if (userId) params.append('user_id', userId);
     if (resource) params.append('resource', resource);
+    if (options.limit) params.append('limit', String(options.limit));
+    if (options.cursor !== undefined) params.append('cursor', String(options.cursor));
     const query = params.toString() ? `?${params.toString()}` : '';
-    return this.fetch<{ audit_logs: AuditLog[]; count: number }>(`/api/blockchain/audit-trail${query}`);
+    return this.fetch<{ audit_logs: AuditLog[]; count: number; next_cursor: number | null }>(
+      `/api/blockchain/audit-trail${query}`
+    );
   }
 
   async verifyBlockchain(): Promise<{ is_valid: boolean; chain_length: number }> {
@@ -0,0 +1,44 @@
+/**
+ * Server-Sent Events helper for /api/stream/events
+ */
+
+// The backend answers 503 with this retry when a worker has no stream slots left
+const STREAM_FULL_RETRY_MS = 10000;
+
+type StreamListeners = Record<string, (event: MessageEvent) => void>;
+
+/**
+ * Follow an event stream until the returned function is called.
+ * EventSource reconnects by itself after a dropped connection, but gives up for good on an
+ * error status such as that 503, so then a new one is opened after a pause, resuming from
+ * the last event id it saw.
+ */
+export const openEventStream = (url: string, listeners: StreamListeners, onError?: () => void): (() => void) => {
+  let source: EventSource | null = null;
+  let timer: ReturnType<typeof setTimeout> | undefined;
+  let lastEventId = '';
+
+  const open = () => {
+    const resume = lastEventId ? `${url.includes('?') ? '&' : '?'}last_event_id=${encodeURIComponent(lastEventId)}` : '';
+    source = new EventSource(url + resume);
+    Object.entries(listeners).forEach(([name, listener]) => {
+      source?.addEventListener(name, (event) => {
+        const message = event as MessageEvent;
+        lastEventId = message.lastEventId || lastEventId;
+        listener(message);
+      });
+    });
+    source.onerror = () => {
+      onError?.();
+      if (source?.readyState === EventSource.CLOSED) {
+        timer = setTimeout(open, STREAM_FULL_RETRY_MS);
+      }
+    };
+  };
+
+  open();
+  return () => {
+    clearTimeout(timer);
+    source?.close();
+  };
+};
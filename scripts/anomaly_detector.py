@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Streaming anomaly detection for surveillance data
+EWMA and CUSUM change-point detection per source and region (per patient for vitals) with O(1) state per series
+"""
+
+import json
+import math
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import psycopg2
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+
+# Per-source settings: which field to watch, what identifies a series besides the region,
+# and how to describe an alert
+SOURCES = {
+    'wastewater': {
+        'value_field': 'viral_load',
+        'series_field': None,
+        'threshold_field': 'threshold',
+        'label': 'Wastewater Analysis',
+        'spike_title': 'Wastewater viral load shift detected',
+        'threshold_title': 'Wastewater viral load threshold exceeded',
+    },
+    'pharmacy': {
+        'value_field': 'sales_index',
+        'series_field': None,
+        'threshold_field': None,
+        'label': 'Pharmacy Sales',
+        'spike_title': 'Pharmacy OTC sales spike detected',
+        'threshold_title': None,
+    },
+    'vitals': {
+        'value_field': 'temperature',
+        # Vitals carry no region, and one patient's fever is not another's baseline
+        'series_field': 'patient_id',
+        'threshold_field': None,
+        'label': 'Patient Monitoring',
+        'spike_title': 'Patient temperature elevation detected',
+        'threshold_title': None,
+    },
+}
+
+DEFAULT_REGION = 'All Regions'
+
+
+class SeriesDetector:
+    """EWMA control chart plus one-sided CUSUM over a single series"""
+
+    __slots__ = ('alpha', 'lam', 'k', 'h', 'L', 'warmup',
+                 'n', 'mean', 'var', 'ewma', 'cusum')
+
+    def __init__(self, alpha: float = 0.1, lam: float = 0.3, k: float = 0.5,
+                 h: float = 5.0, L: float = 3.0, warmup: int = 10):
+        self.alpha = alpha      # baseline adaptation rate
+        self.lam = lam          # EWMA smoothing
+        self.k = k              # CUSUM slack, in standard deviations
+        self.h = h              # CUSUM decision interval, in standard deviations
+        self.L = L              # EWMA control limit width
+        self.warmup = warmup
+        self.n = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.ewma = 0.0
+        self.cusum = 0.0
+
+    def update(self, value: float) -> Optional[Dict]:
+        """Fold one sample in and return a detection if the series shifted upward"""
+        self.n += 1
+        if self.n == 1:
+            self.mean = self.ewma = value
+            return None
+
+        detection = None
+        if self.n > self.warmup:
+            std = max(math.sqrt(self.var), 1e-6 + abs(self.mean) * 0.01)
+            z = (value - self.mean) / std
+            self.ewma = self.lam * value + (1 - self.lam) * self.ewma
+            self.cusum = max(0.0, self.cusum + z - self.k)
+
+            ewma_limit = self.L * std * math.sqrt(self.lam / (2 - self.lam))
+            ewma_shift = self.ewma - self.mean > ewma_limit
+            cusum_shift = self.cusum > self.h
+            if ewma_shift or cusum_shift:
+                detection = {
+                    'method': 'cusum' if cusum_shift else 'ewma',
+                    'z_score': round(z, 2),
+                    'cusum': round(self.cusum, 2),
+                    'ewma': round(self.ewma, 2),
+                    'baseline': round(self.mean, 2),
+                }
+                # Restart accumulation so a sustained shift is reported once per run
+                self.cusum = 0.0
+        else:
+            self.ewma = value
+
+        # Exponentially weighted baseline so state stays O(1); plain running
+        # mean/variance until enough samples have been seen
+        alpha = max(self.alpha, 1.0 / self.n)
+        delta = value - self.mean
+        self.mean += alpha * delta
+        self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+        return detection
+
+
+class AnomalyDetector:
+    """Routes samples to per (source, series) detectors and builds alert records; a series is a region or a patient"""
+
+    def __init__(self, cooldown_seconds: int = 3600):
+        self.series: Dict[Tuple[str, str], SeriesDetector] = {}
+        self.cooldown_seconds = cooldown_seconds
+        self._last_alert: Dict[Tuple[str, str, str], datetime] = {}
+
+    def _cooling_down(self, key: Tuple[str, str, str], now: datetime) -> bool:
+        last = self._last_alert.get(key)
+        if last and (now - last).total_seconds() < self.cooldown_seconds:
+            return True
+        self._last_alert[key] = now
+        return False
+
+    def observe(self, source: str, data: Dict) -> List[Dict]:
+        """Process one sample and return any alerts it raises"""
+        config = SOURCES.get(source)
+        if not config:
+            return []
+        try:
+            value = float(data[config['value_field']])
+        except (KeyError, TypeError, ValueError):
+            return []
+
+        region = data.get('region') or DEFAULT_REGION
+        series_field = config['series_field']
+        subject = data.get(series_field) if series_field else None
+        series = f"{region}:{subject}" if subject else region
+        where = f"in {region}"
+        if subject:
+            where = f"for {series_field.replace('_id', '')} {subject}" + (f" {where}" if region != DEFAULT_REGION else '')
+        now = datetime.now()
+        alerts = []
+
+        threshold_field = config['threshold_field']
+        if threshold_field and data.get(threshold_field) is not None:
+            threshold = float(data[threshold_field])
+            if value > threshold and not self._cooling_down((source, series, 'threshold'), now):
+                alerts.append(self._build_alert(
+                    source, region, series, 'threshold', 'high', config['threshold_title'],
+                    f"{config['threshold_title']} {where}: {value:.2f} > {threshold:.2f}",
+                    confidence=min(99, 70 + int((value - threshold) / max(threshold, 1) * 100)),
+                    metadata={'value': value, 'threshold': threshold}, now=now
+                ))
+
+        detector = self.series.get((source, series))
+        if detector is None:
+            detector = self.series[(source, series)] = SeriesDetector()
+        detection = detector.update(value)
+        if detection and not self._cooling_down((source, series, 'spike'), now):
+            severity = 'high' if detection['z_score'] >= 4 else 'medium'
+            metadata = dict(detection, value=value)
+            if subject:
+                metadata[series_field] = subject
+            alerts.append(self._build_alert(
+                source, region, series, 'spike', severity, config['spike_title'],
+                f"{config['spike_title']} {where}: {value:.2f} vs baseline {detection['baseline']:.2f}",
+                confidence=min(99, 60 + int(abs(detection['z_score']) * 8)),
+                metadata=metadata, now=now
+            ))
+        return alerts
+
+    def _build_alert(self, source: str, region: str, series: str, alert_type: str, severity: str,
+                     title: str, message: str, confidence: int, metadata: Dict,
+                     now: datetime) -> Dict:
+        return {
+            'alert_type': alert_type,
+            'severity': severity,
+            'region_name': region,
+            'title': title,
+            'message': message,
+            'source': SOURCES[source]['label'],
+            'confidence': confidence,
+            'metadata': metadata,
+            # One alert per series, kind and hour even across consumer restarts
+            'dedup_key': f"{source}:{series}:{alert_type}:{now.strftime('%Y-%m-%dT%H')}",
+        }
+
+
+class AlertSink:
+    """Writes alerts to the PostgreSQL alerts table, skipping duplicates"""
+
+    def __init__(self):
+        self.conn = None
+
+    def _connect(self):
+        if not PSYCOPG2_AVAILABLE:
+            return None
+        if self.conn is None or self.conn.closed:
+            try:
+                self.conn = psycopg2.connect(
+                    host=os.getenv('POSTGRES_HOST', 'localhost'),
+                    port=os.getenv('POSTGRES_PORT', '5432'),
+                    database=os.getenv('POSTGRES_DB', 'fever_oracle'),
+                    user=os.getenv('POSTGRES_USER', 'fever_user'),
+                    password=os.getenv('POSTGRES_PASSWORD', 'fever_password'),
+                    connect_timeout=3
+                )
+            except Exception as e:
+                print(f"Alert sink could not connect to database: {e}")
+                self.conn = None
+        return self.conn
+
+    def write(self, alert: Dict) -> bool:
+        """Insert an alert; returns False if it was a duplicate or could not be stored"""
+        conn = self._connect()
+        if conn is None:
+            print(f"Alert (not persisted): {alert['title']} - {alert['region_name']}")
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO alerts (alert_type, severity, title, message, source,
+                                    region_name, confidence, metadata, dedup_key)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (dedup_key) DO NOTHING
+            """, (
+                alert['alert_type'], alert['severity'], alert['title'], alert['message'],
+                alert['source'], alert['region_name'], alert['confidence'],
+                json.dumps(alert['metadata']), alert['dedup_key']
+            ))
+            inserted = cursor.rowcount == 1
+            conn.commit()
+            cursor.close()
+            return inserted
+        except Exception as e:
+            print(f"Error writing alert: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                self.conn = None
+            return False
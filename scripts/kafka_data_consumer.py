@@ -6,6 +6,7 @@ Consumes data from Kafka topics and stores in data files
 
 import json
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 import os
@@ -17,10 +18,19 @@ except ImportError:
     print("kafka-python not installed. Install with: pip install kafka-python")
     sys.exit(1)
 
+from anomaly_detector import AnomalyDetector, AlertSink
+
+# Latency histograms are shared with the backend, which reports them on /api/kafka/stats
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+from services.codec import MessageCodec, SchemaError
+from services.latency import LatencyRecorder, TIMESTAMP_TYPE_LOG_APPEND, header_ms
+
 # Kafka configuration
 KAFKA_BOOTSTRAP_SERVERS = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092')
 DATA_DIR = Path(__file__).parent.parent / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
+LATENCY_FILE = DATA_DIR / "pipeline_latency.json"
+LATENCY_WRITE_SECONDS = 5
 
 # Topics
 TOPICS = {
@@ -40,13 +50,41 @@ class KafkaDataConsumer:
         self.consumer = KafkaConsumer(
             *list(TOPICS.values()),
             bootstrap_servers=bootstrap_servers,
-            value_deserializer=lambda m: json.loads(m.decode('utf-8')),
             key_deserializer=lambda k: k.decode('utf-8') if k else None,
             auto_offset_reset='earliest',
             enable_auto_commit=True,
             group_id='fever-oracle-consumers'
         )
+        # Values are decoded per message so the content-type header can pick JSON or binary
+        self.codec = MessageCodec()
         self.data_dir = DATA_DIR
+        self.detector = AnomalyDetector()
+        self.alert_sink = AlertSink()
+        self.latency = LatencyRecorder()
+        self.latency_written_at = 0.0
+    
+    def record_latency(self, message, received_ms: float, persisted_ms: float):
+        """Time the produce, broker and persist stages of one message"""
+        sent_ms = header_ms(message.headers)
+        if message.timestamp_type == TIMESTAMP_TYPE_LOG_APPEND:
+            # The broker stamped the append time, so the producer's hop can be split out
+            if sent_ms is not None:
+                self.latency.observe(message.topic, 'produce_to_broker', message.timestamp - sent_ms)
+            self.latency.observe(message.topic, 'broker_to_consumer', received_ms - message.timestamp)
+        elif sent_ms is not None:
+            # CreateTime topics: the record timestamp is the producer's, so both hops are one stage
+            self.latency.observe(message.topic, 'broker_to_consumer', received_ms - sent_ms)
+        self.latency.observe(message.topic, 'consumer_to_disk', persisted_ms - received_ms)
+        
+        if time.monotonic() - self.latency_written_at >= LATENCY_WRITE_SECONDS:
+            self.latency.write(LATENCY_FILE)
+            self.latency_written_at = time.monotonic()
+    
+    def detect_anomalies(self, source: str, data: dict):
+        """Run streaming change-point detection on a new sample"""
+        for alert in self.detector.observe(source, data):
+            if self.alert_sink.write(alert):
+                print(f"Raised alert: {alert['title']} - {alert['region_name']} ({alert['severity']})")
     
     def consume_wastewater(self, message):
         """Process wastewater data"""
@@ -61,6 +99,8 @@ class KafkaDataConsumer:
             if not file_exists:
                 f.write("date,viral_load,threshold,region\n")
             f.write(f"{data['timestamp'].split('T')[0]},{data['viral_load']},{data['threshold']},{data['region']}\n")
+        
+        self.detect_anomalies('wastewater', data)
     
     def consume_pharmacy(self, message):
         """Process pharmacy data"""
@@ -73,6 +113,8 @@ class KafkaDataConsumer:
             if not file_exists:
                 f.write("date,sales_index,baseline,region\n")
             f.write(f"{data['timestamp'].split('T')[0]},{data['sales_index']},{data['baseline']},{data['region']}\n")
+        
+        self.detect_anomalies('pharmacy', data)
     
     def consume_patients(self, message):
         """Process patient data"""
@@ -89,6 +131,8 @@ class KafkaDataConsumer:
         
         with open(jsonl_file, 'a') as f:
             f.write(json.dumps(data) + '\n')
+        
+        self.detect_anomalies('vitals', data)
     
     def consume_alerts(self, message):
         """Process alert data"""
@@ -101,6 +145,8 @@ class KafkaDataConsumer:
     def consume_outbreak(self, message):
         """Process outbreak predictions"""
         data = message.value
+        if data.get('type') == 'window_aggregate':
+            return  # written to this topic by older monitors; aggregates are not predictions
         jsonl_file = self.data_dir / "outbreak_predictions.jsonl"
         
         with open(jsonl_file, 'a') as f:
@@ -122,14 +168,22 @@ class KafkaDataConsumer:
         
         try:
             for message in self.consumer:
+                received_ms = time.time() * 1000
                 topic = message.topic
                 handler = topic_handlers.get(topic)
+                try:
+                    message = message._replace(value=self.codec.decode(message.value, message.headers))
+                except (UnicodeDecodeError, ValueError, SchemaError) as e:
+                    print(f"Skipping undecodable message from {topic}: {e}")
+                    continue
                 if handler:
                     handler(message)
+                    self.record_latency(message, received_ms, time.time() * 1000)
                     print(f"Processed message from {topic}")
         except KeyboardInterrupt:
             print("\nStopping consumer...")
         finally:
+            self.latency.write(LATENCY_FILE)
             self.consumer.close()
 
 
@@ -21,8 +21,13 @@ except ImportError:
     print("kafka-python not installed. Install with: pip install kafka-python")
     sys.exit(1)
 
+# Message encoding is shared with the backend (mounted at ./services in the producer container)
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+from services.codec import FORMATS, MessageCodec
+
 # Kafka configuration
 KAFKA_BOOTSTRAP_SERVERS = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092')
+MESSAGE_FORMAT = os.getenv('KAFKA_MESSAGE_FORMAT', 'json')
 
 # Topics
 TOPICS = {
@@ -268,10 +273,10 @@ class RealisticDataGenerator:
 class KafkaDataProducer:
     """Kafka producer for realistic data streams"""
     
-    def __init__(self, bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS):
+    def __init__(self, bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS, message_format: str = MESSAGE_FORMAT):
+        self.codec = MessageCodec(message_format)
         self.producer = KafkaProducer(
             bootstrap_servers=bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
             key_serializer=lambda k: k.encode('utf-8') if k else None,
             acks='all',
             retries=3
@@ -279,6 +284,12 @@ class KafkaDataProducer:
         self.generator = RealisticDataGenerator()
         self.running = True
     
+    def send(self, topic: str, key: str, value: Dict):
+        """Send a message stamped with its send time, so consumers can measure pipeline latency"""
+        payload, headers = self.codec.encode(topic, value)
+        sent_at_ms = str(int(time.time() * 1000)).encode('utf-8')
+        return self.producer.send(topic, key=key, value=payload, headers=headers + [('sent_at_ms', sent_at_ms)])
+    
     def produce_wastewater_data(self, interval: int = 3600):
         """Produce wastewater data every interval seconds"""
         print(f"Starting wastewater data producer (interval: {interval}s)")
@@ -286,7 +297,7 @@ class KafkaDataProducer:
             try:
                 data = self.generator.generate_wastewater_data()
                 key = data['region']
-                self.producer.send(TOPICS['wastewater'], key=key, value=data)
+                self.send(TOPICS['wastewater'], key=key, value=data)
                 print(f"Produced wastewater data: {data['region']} - {data['viral_load']:.2f}")
                 time.sleep(interval)
             except Exception as e:
@@ -300,7 +311,7 @@ class KafkaDataProducer:
             try:
                 data = self.generator.generate_pharmacy_data()
                 key = data['region']
-                self.producer.send(TOPICS['pharmacy'], key=key, value=data)
+                self.send(TOPICS['pharmacy'], key=key, value=data)
                 print(f"Produced pharmacy data: {data['region']} - {data['sales_index']:.2f}")
                 time.sleep(interval)
             except Exception as e:
@@ -317,7 +328,7 @@ class KafkaDataProducer:
                 # Produce vitals for random patient
                 patient_id = random.choice(patient_ids)
                 vitals = self.generator.generate_patient_vitals(patient_id)
-                self.producer.send(TOPICS['vitals'], key=patient_id, value=vitals)
+                self.send(TOPICS['vitals'], key=patient_id, value=vitals)
                 print(f"Produced vitals for {patient_id}: {vitals['temperature']}°C")
                 time.sleep(interval)
             except Exception as e:
@@ -330,7 +341,7 @@ class KafkaDataProducer:
         while self.running:
             try:
                 patient = self.generator.generate_patient_data()
-                self.producer.send(TOPICS['patients'], key=patient['id'], value=patient)
+                self.send(TOPICS['patients'], key=patient['id'], value=patient)
                 print(f"Produced patient record: {patient['id']} - {patient['name']}")
                 time.sleep(interval)
             except Exception as e:
@@ -343,7 +354,7 @@ class KafkaDataProducer:
         while self.running:
             try:
                 alert = self.generator.generate_alert_data()
-                self.producer.send(TOPICS['alerts'], key=alert['id'], value=alert)
+                self.send(TOPICS['alerts'], key=alert['id'], value=alert)
                 print(f"Produced alert: {alert['id']} - {alert['severity']}")
                 time.sleep(interval)
             except Exception as e:
@@ -357,7 +368,7 @@ class KafkaDataProducer:
             try:
                 prediction = self.generator.generate_outbreak_prediction()
                 key = prediction['region']
-                self.producer.send(TOPICS['outbreak'], key=key, value=prediction)
+                self.send(TOPICS['outbreak'], key=key, value=prediction)
                 print(f"Produced outbreak prediction: {prediction['region']} - {prediction['predicted_cases']} cases")
                 time.sleep(interval)
             except Exception as e:
@@ -401,10 +412,12 @@ def main():
                        default='all', help='Topic to produce to')
     parser.add_argument('--interval', type=int, default=60,
                        help='Production interval in seconds')
+    parser.add_argument('--format', choices=FORMATS, default=MESSAGE_FORMAT,
+                       help='Message encoding (msgpack is compact binary with a local schema registry)')
     
     args = parser.parse_args()
     
-    producer = KafkaDataProducer(bootstrap_servers=args.bootstrap_servers)
+    producer = KafkaDataProducer(bootstrap_servers=args.bootstrap_servers, message_format=args.format)
     
     if args.topic == 'all':
         producer.run_all_producers()